@@ -0,0 +1,98 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center <amiris@dlr.de>
+#
+# SPDX-License-Identifier: Apache-2.0
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+from fameio.source.loader import load_yaml
+
+from scengen.cli import CampaignOptions, CreateOptions, GeneralOptions
+from scengen.logs import log_and_raise_critical
+from scengen.results import CampaignResults
+from scengen.retention import get_retention_settings
+from scengen.runner import get_short_run_settings, KEY_SHORT_RUN
+from scengen.screening import Screening
+
+KEY_CONFIGS = "configs"
+KEY_CONFIG = "config"
+KEY_NUMBER = "number"
+KEY_DIRECTORY = "directory"
+KEY_WEIGHT = "weight"
+
+ERR_NO_CONFIGS = f"Campaign file '{{}}' lists no GeneratorConfigs in section `{KEY_CONFIGS}`."
+ERR_MISSING_KEY = "Entry '{}' in campaign file '{}' misses mandatory key '{}'."
+ERR_INVALID_WEIGHT = "Weight of GeneratorConfig '{}' must be positive but was '{}'."
+
+
+class CampaignEntry:
+    """State of one GeneratorConfig in a campaign: its create `options`, `target` number of scenarios, and `weight`"""
+
+    def __init__(self, options: dict, target: int, weight: float):
+        self.options = options
+        self.target = target
+        self.weight = weight
+        self.accepted = 0
+        self.running = 0
+        self.candidates = deque()
+        self.results = CampaignResults(options[CreateOptions.DIRECTORY])
+        config = load_yaml(options[CreateOptions.CONFIG])
+        options[KEY_SHORT_RUN] = get_short_run_settings(config, options)
+        self.screening = Screening(options, config)
+        self.retention = get_retention_settings(config)
+
+    @property
+    def share(self) -> float:
+        """Returns number of accepted and running scenarios relative to `weight`"""
+        return (self.accepted + self.running) / self.weight
+
+    def is_open(self) -> bool:
+        """Returns True if accepted and running scenarios do not yet reach the `target`"""
+        return self.accepted + self.running < self.target
+
+    def is_done(self) -> bool:
+        """Returns True if `target` number of scenarios is accepted"""
+        return self.accepted >= self.target
+
+
+def load_campaign(options: dict) -> list[CampaignEntry]:
+    """Returns entries of all GeneratorConfigs listed in campaign file `CampaignOptions.CAMPAIGN`"""
+    campaign_path = Path(options[CampaignOptions.CAMPAIGN])
+    configs = (load_yaml(campaign_path) or {}).get(KEY_CONFIGS)
+    if not configs:
+        log_and_raise_critical(ERR_NO_CONFIGS.format(campaign_path))
+    entries = []
+    for config in configs:
+        for key in [KEY_CONFIG, KEY_NUMBER, KEY_DIRECTORY]:
+            if key not in config:
+                log_and_raise_critical(ERR_MISSING_KEY.format(config, campaign_path, key))
+        weight = config.get(KEY_WEIGHT, 1)
+        if not weight > 0:
+            log_and_raise_critical(ERR_INVALID_WEIGHT.format(config[KEY_CONFIG], weight))
+        create_options = get_create_options(
+            options,
+            Path(campaign_path.parent, config[KEY_CONFIG]).resolve(),
+            config[KEY_NUMBER],
+            Path(campaign_path.parent, config[KEY_DIRECTORY]).resolve(),
+        )
+        entries.append(CampaignEntry(create_options, config[KEY_NUMBER], weight))
+    return entries
+
+
+def get_create_options(options: dict, config: Path, number: int, directory: Path) -> dict:
+    """Returns options of command `create` for GeneratorConfig at `config` based on given campaign `options`"""
+    create_options = {option: options[option] for option in GeneralOptions}
+    create_options.update({option: None for option in CreateOptions})
+    create_options[CreateOptions.STREAM] = False
+    for option in CampaignOptions:
+        if option.name in CreateOptions.__members__:
+            create_options[CreateOptions[option.name]] = options[option]
+    create_options[CreateOptions.CONFIG] = config
+    create_options[CreateOptions.NUMBER] = number
+    create_options[CreateOptions.DIRECTORY] = directory
+    return create_options
+
+
+def select_entry(entries: list[CampaignEntry]) -> Optional[CampaignEntry]:
+    """Returns open entry with the lowest weighted share of accepted and running scenarios, or None if none is open"""
+    return min((entry for entry in entries if entry.is_open()), key=lambda entry: entry.share, default=None)
@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import argparse
+import os
 from enum import Enum, auto
 from pathlib import Path
 from typing import Any, Optional
@@ -14,6 +15,9 @@ SCENGEN_PARSER = (
 )
 SCENGEN_LOG_FILE_HELP = "Provide logging file (default: None)"
 SCENGEN_LOG_LEVEL_HELP = f"Choose logging level (default: {LogLevel.ERROR.name})"
+SCENGEN_LOG_QUEUE_HELP = (
+    "Write logs in a background thread via a queue which also collects logs of worker processes (default: False)"
+)
 SCENGEN_COMMAND_HELP = "Choose one of the following commands:"
 
 CREATE_HELP = "Creates scenarios for AMIRIS"
@@ -35,21 +39,93 @@ CREATE_OUTPUT_OPTION_HELP = (
     "https://gitlab.com/fame-framework/fame-io/-/blob/main/README.md#read-fame-results"
 )
 CREATE_NO_CHECK_HELP = "Skip checks for Java installation and correct version"
+CREATE_SCRATCH_HELP = (
+    "Optional fast local directory (e.g. on '/dev/shm') to simulate and evaluate scenarios in - "
+    "only results of accepted scenarios are moved to the output directory (default: None)"
+)
+CREATE_STREAM_HELP = (
+    "Write generated agents and contracts to disk as they are created in order to limit memory usage "
+    "for very large scenarios (default: False)"
+)
+CREATE_COMPACT_HELP = (
+    "Store accepted scenarios compactly as manifest of template hashes, seed, and drawn values instead of the full "
+    "scenario YAML - use command `materialize` to rebuild the YAML (default: False)"
+)
+CREATE_SHARD_SIZE_HELP = (
+    "Place scenarios in numbered subdirectories of the output directory holding this many scenarios each, "
+    "e.g. '1000' stores scenario 1234 in '<directory>/1/'; 0 disables subdirectories (default: 0)"
+)
+
+CREATE_BATCH_SIZE_DEFAULT = 1
+CREATE_BATCH_SIZE_HELP = (
+    "Number of candidate scenarios to generate in memory and estimate at once - only candidates passing the "
+    "estimation are written to disk and simulated; ignored with option `--stream` "
+    f"(default: {CREATE_BATCH_SIZE_DEFAULT})"
+)
+CREATE_VARY_HELP = (
+    "Create variants of one reference scenario in which only dynamic fields matching the given path pattern(s) are "
+    "sampled anew, e.g. 'Agents/*/Attributes/InstalledPowerInMW' - not available with option `--stream` (default: None)"
+)
+CREATE_SERIES_CACHE_LIMIT_HELP = (
+    "Size limit in MB of the cache of timeseries derived by `transform` - least recently used files exceeding it are "
+    "removed unless referenced by written, pending, or accepted scenarios (default: None, i.e. unlimited)"
+)
+CREATE_RETRIES_DEFAULT = 2
+CREATE_RETRIES_HELP = (
+    "Number of retries with exponential backoff of scenario runs failing transiently, e.g. due to the JVM running out "
+    f"of memory or I/O errors (default: {CREATE_RETRIES_DEFAULT})"
+)
+CREATE_MAX_FAILURES_DEFAULT = 10
+CREATE_MAX_FAILURES_HELP = (
+    "Abort once this many scenarios in a row failed to generate, estimate or run - failed scenarios are otherwise "
+    f"recorded as rejections and skipped; 0 disables the limit (default: {CREATE_MAX_FAILURES_DEFAULT})"
+)
+CREATE_PROFILE_HELP = (
+    "Profile generation, estimation, and evaluation of each scenario and write cProfile stats and top memory "
+    "allocations per stage to '<directory>/profiles/<index>/' (default: False)"
+)
+CREATE_METRICS_PORT_HELP = (
+    "Serve live progress in Prometheus text format at 'http://127.0.0.1:<port>/metrics' - progress is also written "
+    "to '<directory>/status.json' regardless (default: no endpoint)"
+)
+
+MATERIALIZE_HELP = "Rebuilds full scenario YAMLs from compact scenario manifests"
+MATERIALIZE_CONFIG_HELP = "Path to configuration YAML file the scenarios were created with"
+MATERIALIZE_MANIFEST_HELP = "Path(s) to compact scenario manifest(s) '<scenario_name>.manifest.yaml' to rebuild"
+
+CAMPAIGN_HELP = "Creates scenarios for multiple GeneratorConfigs sharing one pool of worker processes"
+CAMPAIGN_FILE_HELP = (
+    "Path to campaign YAML file listing GeneratorConfigs with their number of scenarios, output directory, and "
+    "optional weight"
+)
+CAMPAIGN_WORKERS_HELP = "Number of worker processes simulating and evaluating scenarios (default: number of CPUs)"
+
+EVALUATE_HELP = "Re-evaluates outputs of existing scenarios without simulating them again"
+EVALUATE_CONFIG_HELP = "Path to configuration YAML file whose section `evaluation` defines checks and thresholds"
+EVALUATE_DIRECTORY_HELP = "Directory holding the outputs of the scenarios to re-evaluate, e.g. `-d` of `scengen create`"
+EVALUATE_WORKERS_HELP = "Number of worker processes evaluating scenario outputs (default: number of CPUs)"
 
 
 class GeneralOptions(Enum):
     """Specifies general options for scengen"""
+
     LOG = auto()
     LOGFILE = auto()
+    LOG_QUEUE = auto()
 
 
 class Command(Enum):
     """Specifies command to execute"""
+
     CREATE = auto()
+    MATERIALIZE = auto()
+    CAMPAIGN = auto()
+    EVALUATE = auto()
 
 
 class CreateOptions(Enum):
     """Options for command `create`"""
+
     NUMBER = auto()
     CONFIG = auto()
     JAR = auto()
@@ -58,10 +134,58 @@ class CreateOptions(Enum):
     SKIP_EVALUATION = auto()
     OUTPUT_OPTIONS = auto()
     NO_CHECKS = auto()
+    STREAM = auto()
+    SCRATCH = auto()
+    SHARD_SIZE = auto()
+    COMPACT = auto()
+    BATCH_SIZE = auto()
+    VARY = auto()
+    SERIES_CACHE_LIMIT = auto()
+    RETRIES = auto()
+    MAX_FAILURES = auto()
+    PROFILE = auto()
+    METRICS_PORT = auto()
+
+
+class MaterializeOptions(Enum):
+    """Options for command `materialize`"""
+
+    CONFIG = auto()
+    MANIFEST = auto()
+
+
+class CampaignOptions(Enum):
+    """Options for command `campaign` - all options but CAMPAIGN and WORKERS are passed to each GeneratorConfig"""
+
+    CAMPAIGN = auto()
+    WORKERS = auto()
+    JAR = auto()
+    SKIP_ESTIMATION = auto()
+    SKIP_EVALUATION = auto()
+    OUTPUT_OPTIONS = auto()
+    NO_CHECKS = auto()
+    SHARD_SIZE = auto()
+    COMPACT = auto()
+    BATCH_SIZE = auto()
+    SERIES_CACHE_LIMIT = auto()
+    RETRIES = auto()
+    MAX_FAILURES = auto()
+    METRICS_PORT = auto()
+
+
+class EvaluateOptions(Enum):
+    """Options for command `evaluate`"""
+
+    CONFIG = auto()
+    DIRECTORY = auto()
+    WORKERS = auto()
 
 
 Options = {
     Command.CREATE: CreateOptions,
+    Command.MATERIALIZE: MaterializeOptions,
+    Command.CAMPAIGN: CampaignOptions,
+    Command.EVALUATE: EvaluateOptions,
 }
 
 
@@ -76,6 +200,7 @@ def arg_handling_run(input_args: Optional[list[str]] = None) -> tuple[Command, d
         choices=[level.name.lower() for level in LogLevel],
         help=SCENGEN_LOG_LEVEL_HELP,
     )
+    parent_parser.add_argument("-lq", "--log-queue", default=False, action="store_true", help=SCENGEN_LOG_QUEUE_HELP)
     subparsers = parent_parser.add_subparsers(dest="command", required=True, help=SCENGEN_COMMAND_HELP)
 
     create_parser = subparsers.add_parser("create", help=CREATE_HELP)
@@ -91,6 +216,60 @@ def arg_handling_run(input_args: Optional[list[str]] = None) -> tuple[Command, d
     )
     create_parser.add_argument("--output-options", "-oo", type=str, default="", help=CREATE_OUTPUT_OPTION_HELP)
     create_parser.add_argument("--no-checks", "-nc", action="store_true", default=False, help=CREATE_NO_CHECK_HELP)
+    create_parser.add_argument("--stream", "-st", action="store_true", default=False, help=CREATE_STREAM_HELP)
+    create_parser.add_argument("--scratch", "-sc", type=Path, required=False, help=CREATE_SCRATCH_HELP)
+    create_parser.add_argument("--shard-size", "-ss", type=int, default=0, help=CREATE_SHARD_SIZE_HELP)
+    create_parser.add_argument("--compact", "-cp", action="store_true", default=False, help=CREATE_COMPACT_HELP)
+    create_parser.add_argument(
+        "--batch-size", "-bs", type=int, default=CREATE_BATCH_SIZE_DEFAULT, help=CREATE_BATCH_SIZE_HELP
+    )
+    create_parser.add_argument("--vary", "-va", type=str, nargs="+", required=False, help=CREATE_VARY_HELP)
+    create_parser.add_argument(
+        "--series-cache-limit", "-scl", type=float, required=False, help=CREATE_SERIES_CACHE_LIMIT_HELP
+    )
+    create_parser.add_argument("--retries", "-rt", type=int, default=CREATE_RETRIES_DEFAULT, help=CREATE_RETRIES_HELP)
+    create_parser.add_argument(
+        "--max-failures", "-mf", type=int, default=CREATE_MAX_FAILURES_DEFAULT, help=CREATE_MAX_FAILURES_HELP
+    )
+    create_parser.add_argument("--profile", "-pr", action="store_true", default=False, help=CREATE_PROFILE_HELP)
+    create_parser.add_argument("--metrics-port", "-mp", type=int, required=False, help=CREATE_METRICS_PORT_HELP)
+
+    materialize_parser = subparsers.add_parser("materialize", help=MATERIALIZE_HELP)
+    materialize_parser.add_argument("--config", "-c", type=Path, required=True, help=MATERIALIZE_CONFIG_HELP)
+    materialize_parser.add_argument(
+        "--manifest", "-m", type=Path, nargs="+", required=True, help=MATERIALIZE_MANIFEST_HELP
+    )
+
+    campaign_parser = subparsers.add_parser("campaign", help=CAMPAIGN_HELP)
+    campaign_parser.add_argument("--campaign", "-c", type=Path, required=True, help=CAMPAIGN_FILE_HELP)
+    campaign_parser.add_argument("--workers", "-w", type=int, default=os.cpu_count(), help=CAMPAIGN_WORKERS_HELP)
+    campaign_parser.add_argument("--jar", "-j", type=Path, required=True, help=CREATE_JAR_HELP)
+    campaign_parser.add_argument(
+        "--skip_estimation", "-ses", default=False, action="store_true", help=CREATE_SKIP_ESTIMATION_HELP
+    )
+    campaign_parser.add_argument(
+        "--skip_evaluation", "-sev", default=False, action="store_true", help=CREATE_SKIP_EVALUATION_HELP
+    )
+    campaign_parser.add_argument("--output-options", "-oo", type=str, default="", help=CREATE_OUTPUT_OPTION_HELP)
+    campaign_parser.add_argument("--no-checks", "-nc", action="store_true", default=False, help=CREATE_NO_CHECK_HELP)
+    campaign_parser.add_argument("--shard-size", "-ss", type=int, default=0, help=CREATE_SHARD_SIZE_HELP)
+    campaign_parser.add_argument("--compact", "-cp", action="store_true", default=False, help=CREATE_COMPACT_HELP)
+    campaign_parser.add_argument(
+        "--batch-size", "-bs", type=int, default=CREATE_BATCH_SIZE_DEFAULT, help=CREATE_BATCH_SIZE_HELP
+    )
+    campaign_parser.add_argument(
+        "--series-cache-limit", "-scl", type=float, required=False, help=CREATE_SERIES_CACHE_LIMIT_HELP
+    )
+    campaign_parser.add_argument("--retries", "-rt", type=int, default=CREATE_RETRIES_DEFAULT, help=CREATE_RETRIES_HELP)
+    campaign_parser.add_argument(
+        "--max-failures", "-mf", type=int, default=CREATE_MAX_FAILURES_DEFAULT, help=CREATE_MAX_FAILURES_HELP
+    )
+    campaign_parser.add_argument("--metrics-port", "-mp", type=int, required=False, help=CREATE_METRICS_PORT_HELP)
+
+    evaluate_parser = subparsers.add_parser("evaluate", help=EVALUATE_HELP)
+    evaluate_parser.add_argument("--config", "-c", type=Path, required=True, help=EVALUATE_CONFIG_HELP)
+    evaluate_parser.add_argument("--directory", "-d", type=Path, required=True, help=EVALUATE_DIRECTORY_HELP)
+    evaluate_parser.add_argument("--workers", "-w", type=int, default=os.cpu_count(), help=EVALUATE_WORKERS_HELP)
 
     args = vars(parent_parser.parse_args(input_args))
     command = Command[args.pop("command").upper()]
@@ -105,6 +284,8 @@ def resolve_relative_paths(args: dict) -> dict:
     for option in args:
         if isinstance(args[option], Path):
             args[option] = args[option].resolve()
+        elif isinstance(args[option], list):
+            args[option] = [item.resolve() if isinstance(item, Path) else item for item in args[option]]
     return args
 
 
@@ -1,9 +1,23 @@
 # SPDX-FileCopyrightText: 2023 German Aerospace Center <amiris@dlr.de>
 #
 # SPDX-License-Identifier: Apache-2.0
-from fameio.source.loader import load_yaml
+import math
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Union
 
+import numpy as np
+import pandas as pd
+
+from scengen.evaluator import (
+    get_checks,
+    get_settings,
+    KEY_EVALUATION,
+    KEY_CHECKS,
+    KEY_SCARCITY_PRICE,
+    KEY_THRESHOLD_SHARE_SCARCITY_HOURS,
+)
 from scengen.logs import log_and_raise_critical, log
+from scengen.timeseries import get_series_info, get_series, to_seconds
 
 
 class Amiris:
@@ -14,29 +28,99 @@ class Amiris:
     technology_name_for_storage = "Storage"
     identifier_for_storage = "Device"
     capacitiy_name_for_storage = "InstalledPowerInMW"
+    yield_profile_name = "YieldProfile"
+    planned_availability_name = "PlannedAvailability"
+    unplanned_availability_name = "UnplannedAvailabilityFactor"
+    loads_name = "Loads"
+    demand_series_name = "DemandSeries"
+    value_of_lost_load_name = "ValueOfLostLoad"
+    plants_name = "Plants"
+
+
+COLUMN_ID = "id"
+COLUMN_TECHNOLOGY = "technology"
+COLUMN_CAPACITY = "capacity"
+COLUMN_CANDIDATE = "candidate"
+
+KEY_ESTIMATION = "estimation"
+KEY_SCARCITY_MARGIN = "scarcity_margin"
+SCARCITY_MARGIN = 1.5
+NAME_SCARCITY_CHECK = "scarcity_occurrence"
+SECONDS_PER_HOUR = 3600
+
+WARN_LOW_CAPACITY = "Accumulated installed capacities of candidate {} seems very low at '{}' MW"
+WARN_PREDICTED_SCARCITY = "Predicted share of scarcity hours of candidate {} is {:.1%} exceeding tolerated {:.1%}"
+ESTIMATION_ATTRIBUTES = (
+    Amiris.capacitiy_name,
+    Amiris.energy_carrier_name,
+    Amiris.prototype_name,
+    Amiris.identifier_for_storage,
+    Amiris.yield_profile_name,
+    Amiris.loads_name,
+    Amiris.plants_name,
+)
+
+DEBUG_NO_HORIZON = "Skipped merit order estimation of candidate %s lacking simulation start and stop time"
+
+
+def get_installed_capacity(scenario: dict, series_dir: Path = Path(".")) -> pd.DataFrame:
+    """
+    Returns columnar table of all agents and power plants in given `scenario` with columns
+    COLUMN_ID, COLUMN_TECHNOLOGY, and COLUMN_CAPACITY (installed capacity in MW);
+    capacities given as timeseries (relative to `series_dir`) are accounted for with their maximum value
+    """
+    rows = list(_get_capacity_rows(scenario, series_dir))
+    table = pd.DataFrame.from_records(rows, columns=[COLUMN_ID, COLUMN_TECHNOLOGY, COLUMN_CAPACITY])
+    return table.astype({COLUMN_ID: "int64", COLUMN_TECHNOLOGY: "category", COLUMN_CAPACITY: "float64"})
+
+
+def get_installed_capacities(scenarios: list[dict], series_dirs: list[Path]) -> pd.DataFrame:
+    """
+    Returns capacity table as in `get_installed_capacity` of all candidate `scenarios` (with timeseries relative to
+    their `series_dirs`) stacked into one table with additional column COLUMN_CANDIDATE holding the candidate's index
+    """
+    rows = [
+        (*row, candidate)
+        for candidate, (scenario, series_dir) in enumerate(zip(scenarios, series_dirs))
+        for row in _get_capacity_rows(scenario, series_dir)
+    ]
+    table = pd.DataFrame.from_records(rows, columns=[COLUMN_ID, COLUMN_TECHNOLOGY, COLUMN_CAPACITY, COLUMN_CANDIDATE])
+    return table.astype(
+        {
+            COLUMN_ID: "int64",
+            COLUMN_TECHNOLOGY: "category",
+            COLUMN_CAPACITY: "float64",
+            COLUMN_CANDIDATE: pd.CategoricalDtype(range(len(scenarios))),
+        }
+    )
 
 
-def get_installed_capacity(scenario: dict) -> dict:
-    """Returns `dict` of technologies each with list of {agent_id: installed capacity} from given `scenario`"""
-    installed_power_by_type = dict()
+def _get_capacity_rows(scenario: dict, series_dir: Path) -> Iterator[tuple[int, str, float]]:
+    """Yields Id, technology and installed capacity of all agents and power plants in given `scenario`"""
     for agent in scenario["Agents"]:
         if "Attributes" in agent:
             if Amiris.capacitiy_name in agent["Attributes"]:
                 capacity, technology = extract_conventional(agent)
-                installed_power_by_type.setdefault(technology, []).append({agent["Id"]: capacity})
+                yield agent["Id"], technology, resolve_capacity(capacity, series_dir)
             if Amiris.identifier_for_storage in agent["Attributes"]:
                 capacity, technology = extract_storage(agent)
-                installed_power_by_type.setdefault(technology, []).append({agent["Id"]: capacity})
-            if "Plants" in agent["Attributes"]:
-                for plant in agent["Attributes"]["Plants"]:
+                yield agent["Id"], technology, resolve_capacity(capacity, series_dir)
+            plants = agent["Attributes"].get(Amiris.plants_name)
+            if plants:
+                technology = agent["Attributes"]["Prototype"]["FuelType"]
+                for plant in plants:
                     capacity = plant["NetCapacityInMW"]
-                    technology = agent["Attributes"]["Prototype"]["FuelType"]
                     if "Id" in plant:
-                        plant_id = int(plant["Id"])
-                        installed_power_by_type.setdefault(technology, []).append({plant_id: capacity})
+                        yield int(plant["Id"]), technology, capacity
                     elif capacity > 0:
                         log().warning("Missing `Id` for powerplant with power of {}".format(capacity))
-    return installed_power_by_type
+
+
+def resolve_capacity(capacity: Union[float, str], series_dir: Path) -> float:
+    """Returns given `capacity` or - if it references a timeseries relative to `series_dir` - its maximum value"""
+    if isinstance(capacity, str):
+        return get_series_info(Path(series_dir, capacity)).maximum
+    return capacity
 
 
 def extract_storage(agent: dict) -> tuple[float, str]:
@@ -58,31 +142,165 @@ def extract_conventional(agent: dict) -> tuple[float, str]:
     return capacity, technology
 
 
-def accumulate_capacities(capacities: dict) -> float:
-    """Returns accumulates `installed_capacities` in MW as float"""
-    installed_capacities = 0
-    for _, technology in capacities.items():
-        for item in technology:
-            for _, MW in item.items():
-                installed_capacities += MW
-    return installed_capacities
+def accumulate_capacities(capacities: pd.DataFrame) -> float:
+    """Returns accumulated installed capacities in MW of given `capacities` table as float"""
+    return float(capacities[COLUMN_CAPACITY].sum())
 
 
-def generation_capacity_available(scenario: dict) -> bool:
-    """Returns True if there are any installed capacities in given `scenario`"""
-    capacities = get_installed_capacity(scenario)
-    accumulated_capacities = accumulate_capacities(capacities)
-    if not accumulated_capacities > 0:
-        log().warning(f"Accumulated installed capacities seems very low at '{accumulated_capacities}' MW")
-        decision = False
-    else:
-        decision = True
-    return decision
+def accumulate_capacities_by_candidate(capacities: pd.DataFrame) -> pd.Series:
+    """Returns accumulated installed capacities in MW per candidate of given stacked `capacities` table"""
+    return capacities.groupby(COLUMN_CANDIDATE, observed=False)[COLUMN_CAPACITY].sum()
+
+
+def capacities_by_technology(capacities: pd.DataFrame) -> pd.Series:
+    """Returns installed capacities in MW of given `capacities` table summed up per technology"""
+    return capacities.groupby(COLUMN_TECHNOLOGY, observed=True)[COLUMN_CAPACITY].sum()
+
+
+def generation_capacity_available(capacities: pd.DataFrame) -> pd.Series:
+    """Returns per candidate True if there are any installed capacities in given stacked `capacities` table"""
+    accumulated_capacities = accumulate_capacities_by_candidate(capacities)
+    decisions = accumulated_capacities > 0
+    for candidate, capacity in accumulated_capacities[~decisions].items():
+        log().warning(WARN_LOW_CAPACITY.format(candidate, capacity))
+    return decisions
+
+
+def get_hours(scenario: dict) -> Optional[np.ndarray]:
+    """Returns start of each simulated hour of `scenario` in seconds since epoch, or None if its horizon is unknown"""
+    simulation = (scenario.get("GeneralProperties") or {}).get("Simulation") or {}
+    start, stop = to_seconds(pd.Series([simulation.get("StartTime"), simulation.get("StopTime")], dtype=str))
+    if math.isnan(start) or math.isnan(stop):
+        return None
+    return np.arange(start, stop, SECONDS_PER_HOUR, dtype=np.float64)
+
 
+def resolve_profile(value: Union[float, str], series_dir: Path, hours: np.ndarray) -> Union[float, np.ndarray]:
+    """Returns given `value` or - if it references a timeseries relative to `series_dir` - its values at `hours`"""
+    if isinstance(value, str):
+        return np.interp(hours, *get_series(Path(series_dir, value)))
+    return float(value)
 
-def estimate_scenario(options: dict) -> bool:
-    """Returns True if scenario passes all individual checks"""
+
+def _get_supply(scenario: dict) -> Iterator[tuple[Union[float, str], list[Union[float, str]]]]:
+    """Yields capacity and availability factors (values or timeseries) of all agents and plants offering electricity"""
+    for agent in scenario["Agents"]:
+        attributes = agent.get("Attributes") or {}
+        prototype = attributes.get(Amiris.prototype_name) or {}
+        factors = [
+            item[name]
+            for item, name in [
+                (attributes, Amiris.yield_profile_name),
+                (prototype, Amiris.planned_availability_name),
+                (prototype, Amiris.unplanned_availability_name),
+            ]
+            if name in item
+        ]
+        if Amiris.capacitiy_name in attributes:
+            yield attributes[Amiris.capacitiy_name], factors
+        if Amiris.identifier_for_storage in attributes:
+            yield extract_storage(agent)[0], []
+        for plant in attributes.get(Amiris.plants_name) or []:
+            yield plant["NetCapacityInMW"], factors
+
+
+def _get_demand(scenario: dict, scarcity_price: float) -> Iterator[Union[float, str]]:
+    """Yields demand (values or timeseries) of all loads in `scenario` bidding at or above `scarcity_price`"""
+    for agent in scenario["Agents"]:
+        for load in (agent.get("Attributes") or {}).get(Amiris.loads_name) or []:
+            if load.get(Amiris.value_of_lost_load_name, math.inf) >= scarcity_price:
+                yield load[Amiris.demand_series_name]
+
+
+def predict_scarcity_share(scenario: dict, series_dir: Path, scarcity_price: float) -> float:
+    """
+    Returns share of hours of `scenario` predicted to clear at `scarcity_price` by a simplified market: available power
+    of all plants and storages (at full power) bids below, demand of loads with a value of lost load at or above the
+    scarcity price - scarcity occurs in hours in which demand exceeds the available power; NaN if horizon is unknown
+    """
+    hours = get_hours(scenario)
+    if hours is None or not len(hours):
+        return math.nan
+    supply = np.zeros(len(hours))
+    for capacity, factors in _get_supply(scenario):
+        available = resolve_profile(capacity, series_dir, hours)
+        for factor in factors:
+            available = available * resolve_profile(factor, series_dir, hours)
+        supply += available
+    demand = np.zeros(len(hours))
+    for load in _get_demand(scenario, scarcity_price):
+        demand += resolve_profile(load, series_dir, hours)
+    return float(np.count_nonzero(demand > supply) / len(hours))
+
+
+def get_scarcity_settings(config: Optional[dict]) -> Optional[tuple[float, float]]:
+    """
+    Returns scarcity price and tolerated share of scarcity hours scaled by the `scarcity_margin` of section `estimation`
+    of GeneratorConfig `config` - or None if evaluation check `scarcity_occurrence` or the margin is disabled
+    """
+    config = config or {}
+    names = (config.get(KEY_EVALUATION) or {}).get(KEY_CHECKS)
+    margin = (config.get(KEY_ESTIMATION) or {}).get(KEY_SCARCITY_MARGIN, SCARCITY_MARGIN)
+    if margin is None or (names is not None and NAME_SCARCITY_CHECK not in names):
+        return None
+    settings = get_settings(config, get_checks([NAME_SCARCITY_CHECK]))
+    return settings[KEY_SCARCITY_PRICE], settings[KEY_THRESHOLD_SHARE_SCARCITY_HOURS] * margin
+
+
+def scarcity_within_tolerance(scenarios: list[dict], series_dirs: list[Path], config: Optional[dict]) -> np.ndarray:
+    """
+    Returns per candidate of `scenarios` (with timeseries relative to `series_dirs`) True unless its predicted share of
+    scarcity hours exceeds the share tolerated by evaluation check `scarcity_occurrence` times the `scarcity_margin`
+    """
+    decisions = np.ones(len(scenarios), dtype=bool)
+    settings = get_scarcity_settings(config)
+    if settings is None:
+        return decisions
+    scarcity_price, tolerated_share = settings
+    for candidate, (scenario, series_dir) in enumerate(zip(scenarios, series_dirs)):
+        share = predict_scarcity_share(scenario, series_dir, scarcity_price)
+        if math.isnan(share):
+            log().debug(DEBUG_NO_HORIZON, candidate)
+        elif share > tolerated_share:
+            log().warning(WARN_PREDICTED_SCARCITY.format(candidate, share, tolerated_share))
+            decisions[candidate] = False
+    return decisions
+
+
+ESTIMATION_CHECKS: list[Callable[[pd.DataFrame], pd.Series]] = [generation_capacity_available]
+
+
+def reduce_agent(agent: dict) -> dict:
+    """Returns copy of `agent` holding only its Id and the attributes read by the estimation"""
+    attributes = agent.get("Attributes") or {}
+    reduced = {"Id": agent["Id"]}
+    if any(name in attributes for name in ESTIMATION_ATTRIBUTES):
+        reduced["Attributes"] = {name: attributes[name] for name in ESTIMATION_ATTRIBUTES if name in attributes}
+    return reduced
+
+
+def estimate_scenario(scenario: dict, series_dir: Path, config: Optional[dict] = None) -> bool:
+    """
+    Returns True if `scenario` (with timeseries relative to `series_dir`) passes all individual checks - capacities are
+    extracted only once for all checks; its agents may be reduced by `reduce_agent`
+    """
     log().debug("Calling estimator")
-    scenario = load_yaml(options["scenario_path"])
-    checks = [generation_capacity_available(scenario)]
-    return all(checks)
+    return estimate_scenarios([scenario], [series_dir], config)[0]
+
+
+def estimate_scenarios(scenarios: list[dict], series_dirs: list[Path], config: Optional[dict] = None) -> list[bool]:
+    """
+    Returns for each of the candidate `scenarios` (with timeseries relative to their `series_dirs`) True if it passes
+    all individual checks - all checks are evaluated at once for all candidates on one stacked capacity table;
+    candidates passing these are checked for scarcity by a merit order surrogate using settings of GeneratorConfig
+    `config`
+    """
+    capacities = get_installed_capacities(scenarios, series_dirs)
+    decisions = np.ones(len(scenarios), dtype=bool)
+    for check in ESTIMATION_CHECKS:
+        decisions &= check(capacities).to_numpy(dtype=bool)
+    passed = np.flatnonzero(decisions)
+    decisions[passed] = scarcity_within_tolerance(
+        [scenarios[i] for i in passed], [series_dirs[i] for i in passed], config
+    )
+    return decisions.tolist()
@@ -1,32 +1,204 @@
 # SPDX-FileCopyrightText: 2023 German Aerospace Center <amiris@dlr.de>
 #
 # SPDX-License-Identifier: Apache-2.0
+import hashlib
+import json
+import math
 from pathlib import Path
+from typing import Callable, NamedTuple, Optional
 
+import numpy as np
 import pandas as pd
 from amirispy.source.cli import RunOptions
+from fameio.source.loader import load_yaml
 
-from scengen.logs import log
+from scengen.cli import CreateOptions
+from scengen.logs import log, log_and_raise_critical
 
 NAME_ENERGY_EXCHANGE = "DayAheadMarketSingleZone"
 NAME_ELECTRICITY_PRICE_COLUMN = "ElectricityPriceInEURperMWH"  # noqa
 SCARCITY_PRICE = 3000
 THRESHOLD_SHARE_SCARCITY_HOURS = 0.10
 
+KEY_EVALUATION = "evaluation"
+KEY_SHORT_CIRCUIT = "short_circuit"
+KEY_CHECKS = "checks"
+KEY_SCARCITY_PRICE = "scarcity_price"
+KEY_THRESHOLD_SHARE_SCARCITY_HOURS = "threshold_share_scarcity_hours"
+PREFIX_THRESHOLD = "threshold_"
+METRIC_SCARCITY_HOURS = "scarcity_hours"
+METRIC_MEAN_PRICE = "mean_electricity_price"
+
+SUFFIX_PARQUET = ".parquet"
+OUTPUT_SUFFIXES = (".csv", ".csv.gz", ".csv.zst", SUFFIX_PARQUET)
+
+ERR_MISSING_OUTPUT = "Could not find output file '{}' in '{}' - expected one of suffixes {}"
+ERR_UNKNOWN_CHECK = "Unknown evaluation check '{}' in GeneratorConfig. Available checks are: {}"
+ERR_DUPLICATE_CHECK = "Evaluation check '{}' is already registered."
+WARN_CHECK_FAILED = "Evaluation check '{}' failed."
+
+Results = dict[str, dict[str, np.ndarray]]
+CheckFunction = Callable[[Results, dict, dict], bool]
+
+
+class Check(NamedTuple):
+    """Evaluation check with its required output `columns` per file, default `settings`, and `version` of its logic"""
+
+    name: str
+    function: CheckFunction
+    columns: dict[str, list[str]]
+    settings: dict
+    version: int = 1
+
+
+class Evaluation(NamedTuple):
+    """
+    Outcome of evaluation with names of `failed_checks` and `metrics` reported by the checks;
+    `failure` describes why the scenario could not be run or evaluated at all (if so)
+    """
+
+    passed: bool
+    failed_checks: list[str]
+    metrics: dict[str, float]
+    failure: Optional[str] = None
+
+
+_checks: dict[str, Check] = {}
+
+
+def register_check(name: str, columns: dict[str, list[str]], settings: dict = None, version: int = 1) -> Callable:
+    """
+    Returns decorator registering a check function under `name` which requires given `columns` per output file.
+    Registered functions receive loaded `results`, the evaluation `settings`, and a `metrics` dict to report
+    key figures to, and return True if passed. Increase `version` whenever the logic of the check changes to
+    invalidate cached outcomes of `scengen evaluate`.
+    """
+
+    def decorator(function: CheckFunction) -> CheckFunction:
+        if name in _checks:
+            log_and_raise_critical(ERR_DUPLICATE_CHECK.format(name))
+        _checks[name] = Check(name, function, columns, settings or {}, version)
+        return function
+
+    return decorator
+
+
+def get_checks(names: list[str] = None) -> list[Check]:
+    """Returns registered checks matching `names` in given order, or all registered checks if `names` is None"""
+    if names is None:
+        return list(_checks.values())
+    for name in names:
+        if name not in _checks:
+            log_and_raise_critical(ERR_UNKNOWN_CHECK.format(name, list(_checks.keys())))
+    return [_checks[name] for name in names]
+
+
+def get_settings(config: dict, checks: list[Check]) -> dict:
+    """Returns evaluation settings: defaults of `checks` overridden by section `evaluation` of GeneratorConfig"""
+    settings = {KEY_SHORT_CIRCUIT: True}
+    for check in checks:
+        settings.update(check.settings)
+    settings.update(config.get(KEY_EVALUATION) or {})
+    return settings
+
+
+def get_check_key(check: Check, settings: dict) -> str:
+    """Returns key identifying outcomes of `check` in its version with the values of its declared `settings`"""
+    relevant = {key: settings.get(key) for key in sorted(check.settings)}
+    digest = hashlib.sha1(json.dumps(relevant, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+    return f"{check.name}@{check.version}:{digest}"
+
+
+def scale_thresholds(settings: dict, factor: float) -> dict:
+    """Returns copy of evaluation `settings` with all numeric settings named `threshold_*` multiplied by `factor`"""
+    return {
+        key: value * factor if key.startswith(PREFIX_THRESHOLD) and isinstance(value, (int, float)) else value
+        for key, value in settings.items()
+    }
+
+
+def load_results(output_dir: Path, checks: list[Check]) -> Results:
+    """Returns required columns of all `checks` as arrays - each output file in `output_dir` is read only once"""
+    columns_by_file: dict[str, list[str]] = {}
+    for check in checks:
+        for file_name, columns in check.columns.items():
+            required = columns_by_file.setdefault(file_name, [])
+            required.extend(column for column in columns if column not in required)
+    results = {}
+    for file_name, columns in columns_by_file.items():
+        data = read_output(output_dir, file_name, columns)
+        results[file_name] = {column: data[column].to_numpy() for column in columns}
+    return results
+
+
+def get_required_files(config: dict) -> set[str]:
+    """Returns names of output files required by the evaluation checks configured in GeneratorConfig `config`"""
+    checks = get_checks((config.get(KEY_EVALUATION) or {}).get(KEY_CHECKS))
+    return {file_name for check in checks for file_name in check.columns}
+
+
+def find_output_file(output_dir: Path, file_name: str) -> Path:
+    """Returns path of output `file_name` in `output_dir` - plain, compressed CSV, or Parquet; raises if missing"""
+    for suffix in OUTPUT_SUFFIXES:
+        path = Path(output_dir, file_name + suffix)
+        if path.exists():
+            return path
+    raise FileNotFoundError(ERR_MISSING_OUTPUT.format(file_name, output_dir, OUTPUT_SUFFIXES))
+
+
+def read_output(output_dir: Path, file_name: str, columns: Optional[list[str]] = None) -> pd.DataFrame:
+    """Returns given `columns` (default: all) of output `file_name` in `output_dir` in any of the OUTPUT_SUFFIXES"""
+    path = find_output_file(output_dir, file_name)
+    if path.suffix == SUFFIX_PARQUET:
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, sep=";", usecols=columns)
+
 
 def evaluate_scenario(options: dict) -> bool:
     """Returns True if results pass all individual checks"""
+    return evaluate(options).passed
+
+
+def evaluate(options: dict, threshold_factor: float = 1.0) -> Evaluation:
+    """
+    Returns Evaluation of results in `RunOptions.OUTPUT` using checks and settings of GeneratorConfig;
+    thresholds are multiplied by given `threshold_factor`
+    """
     log().debug("Calling evaluator")
-    checks = [scarcity_occurrence(options)]
-    return all(checks)
+    config = load_yaml(options[CreateOptions.CONFIG])
+    evaluation = config.get(KEY_EVALUATION) or {}
+    checks = get_checks(evaluation.get(KEY_CHECKS))
+    settings = get_settings(config, checks)
+    if threshold_factor != 1:
+        settings = scale_thresholds(settings, threshold_factor)
+    return run_checks(load_results(options[RunOptions.OUTPUT], checks), checks, settings)
+
+
+def run_checks(results: Results, checks: list[Check], settings: dict) -> Evaluation:
+    """Returns Evaluation of given `results` by all `checks` - stops at first failed check if `short_circuit` is set"""
+    failed_checks = []
+    metrics = {}
+    for check in checks:
+        if not check.function(results, settings, metrics):
+            log().warning(WARN_CHECK_FAILED.format(check.name))
+            failed_checks.append(check.name)
+            if settings[KEY_SHORT_CIRCUIT]:
+                break
+    return Evaluation(not failed_checks, failed_checks, metrics)
 
 
-def scarcity_occurrence(options: dict) -> bool:
-    """Returns True if occurrences of SCARCITY_PRICE is within THRESHOLD_SHARE_SCARCITY_HOURS"""
-    path_to_exchange = Path(options[RunOptions.OUTPUT], f"{NAME_ENERGY_EXCHANGE}.csv")
-    energy_exchange = pd.read_csv(path_to_exchange, sep=";")
-    scarcity_hours = (energy_exchange[NAME_ELECTRICITY_PRICE_COLUMN] >= SCARCITY_PRICE).sum()
-    n_of_tolerated_hours = round(len(energy_exchange) * THRESHOLD_SHARE_SCARCITY_HOURS)
+@register_check(
+    "scarcity_occurrence",
+    columns={NAME_ENERGY_EXCHANGE: [NAME_ELECTRICITY_PRICE_COLUMN]},
+    settings={KEY_SCARCITY_PRICE: SCARCITY_PRICE, KEY_THRESHOLD_SHARE_SCARCITY_HOURS: THRESHOLD_SHARE_SCARCITY_HOURS},
+)
+def scarcity_occurrence(results: Results, settings: dict, metrics: dict) -> bool:
+    """Returns True if occurrences of `scarcity_price` is within `threshold_share_scarcity_hours`"""
+    prices = results[NAME_ENERGY_EXCHANGE][NAME_ELECTRICITY_PRICE_COLUMN]
+    scarcity_hours = int((prices >= settings[KEY_SCARCITY_PRICE]).sum())
+    metrics[METRIC_SCARCITY_HOURS] = scarcity_hours
+    metrics[METRIC_MEAN_PRICE] = float(prices.mean()) if len(prices) else math.nan
+    n_of_tolerated_hours = round(len(prices) * settings[KEY_THRESHOLD_SHARE_SCARCITY_HOURS])
     if scarcity_hours > n_of_tolerated_hours:
         decision = False
         log().warning(f"Number of scarcity hours ({scarcity_hours}) exceeds tolerance of {n_of_tolerated_hours} hours.")
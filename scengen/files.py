@@ -1,32 +1,212 @@
 # SPDX-FileCopyrightText: 2023 German Aerospace Center <amiris@dlr.de>
 #
 # SPDX-License-Identifier: Apache-2.0
+import hashlib
 import os
 import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
 from pathlib import Path
 import time
+from typing import Any, Callable, Iterator, Optional
 
 import yaml
 from fameio.source.loader import load_yaml
 
 from scengen.cli import CreateOptions
 from scengen.logs import log_and_raise_critical, log_error_and_raise, log
+from scengen.timeseries import NAME_SERIES_CACHE
 
 _ERR_NOT_A_FOLDER = "Given Path '{}' is not a directory."
-_INFO_NO_TRAC_FILE_FOUND = ("Could not find `trace_file` in path '{}' as specified in GeneratorConfig. "
-                            "Created new one instead.")
-_WARN_NO_TRACE_FILE_DEFINED = ("No mandatory `trace_file` found in given GeneratorConfig. Created new one at '{}' and "
-                               "added to GeneratorConfig instead.")
+_ERR_INVALID_SHARD_SIZE = "Shard size must not be negative but was '{}'."
+_ERR_SECTION_NOT_CONSECUTIVE = "Items of section '{}' were not written consecutively to '{}'."
+_INFO_NO_TRAC_FILE_FOUND = (
+    "Could not find `trace_file` in path '{}' as specified in GeneratorConfig. " "Created new one instead."
+)
+_WARN_NO_TRACE_FILE_DEFINED = (
+    "No mandatory `trace_file` found in given GeneratorConfig. Created new one at '{}' and "
+    "added to GeneratorConfig instead."
+)
+
+
+_PREFIX_DISCARDED = ".discarded_"
+_PREFIX_RUN = ".run_"
+NAME_MANIFEST = "manifest.csv"
+_MANIFEST_SEPARATOR = ";"
+_MANIFEST_HEADER = f"scenario_number{_MANIFEST_SEPARATOR}scenario_path\n"
+SUFFIX_SCENARIO_MANIFEST = ".manifest.yaml"
+NAME_REJECTIONS = "rejections.csv"
+_REJECTIONS_HEADER = f"index{_MANIFEST_SEPARATOR}reason\n"
+
+_background_tasks: list[Future] = []
+_executors: dict[str, ThreadPoolExecutor] = {}
 
 
 def delete_all_files(options: dict):
-    """Removes all created files of scenario stored in `CreateOptions.DIRECTORY`"""
-    dir_to_remove = Path(options[CreateOptions.DIRECTORY], options["scenario_name"])
+    """
+    Removes all created files of scenario stored next to its `scenario_path`;
+    files in `CreateOptions.SCRATCH` (if any) are removed in a background thread
+    """
+    dir_to_remove = Path(Path(options["scenario_path"]).parent, options["scenario_name"])
     shutil.rmtree(dir_to_remove, ignore_errors=True)
+    if options.get(CreateOptions.SCRATCH):
+        discard_in_background(Path(options[CreateOptions.SCRATCH], options["scenario_name"]))
     os.remove(options["scenario_path"])
     log().debug(f"Removed all files in '{dir_to_remove}'")
 
 
+def get_series_cache_dir(options: dict) -> Path:
+    """Returns directory of timeseries derived by `transform` for scenarios in `CreateOptions.DIRECTORY`"""
+    return Path(options[CreateOptions.DIRECTORY], NAME_SERIES_CACHE)
+
+
+def get_scenario_directory(options: dict, scenario_number: int) -> Path:
+    """
+    Returns directory to store scenario with given `scenario_number` in: subdirectory `scenario_number // shard_size`
+    of `CreateOptions.DIRECTORY` if `CreateOptions.SHARD_SIZE` is set, else `CreateOptions.DIRECTORY` itself
+    """
+    shard_size = options.get(CreateOptions.SHARD_SIZE)
+    if not shard_size:
+        return Path(options[CreateOptions.DIRECTORY])
+    if shard_size < 0:
+        log_and_raise_critical(_ERR_INVALID_SHARD_SIZE.format(shard_size))
+    return Path(options[CreateOptions.DIRECTORY], str(scenario_number // shard_size))
+
+
+def append_to_manifest(options: dict, scenario_number: int) -> None:
+    """
+    Appends `scenario_number` and the path of the file it is stored in relative to `CreateOptions.DIRECTORY` to the
+    manifest - its `scenario_path`, or with `CreateOptions.COMPACT` the path of its compact scenario manifest
+    """
+    manifest_path = Path(options[CreateOptions.DIRECTORY], NAME_MANIFEST)
+    scenario_path = options["scenario_path"]
+    if options.get(CreateOptions.COMPACT):
+        scenario_path = get_scenario_manifest_path(scenario_path)
+    relative_path = Path(os.path.relpath(scenario_path, options[CreateOptions.DIRECTORY])).as_posix()
+    is_new = not manifest_path.exists()
+    with open(manifest_path, "a") as file:
+        if is_new:
+            file.write(_MANIFEST_HEADER)
+        file.write(f"{scenario_number}{_MANIFEST_SEPARATOR}{relative_path}\n")
+
+
+def read_manifest(directory: Path) -> dict[int, Path]:
+    """
+    Returns paths of all scenario YAMLs or compact scenario manifests listed in the manifest of given output
+    `directory` by their scenario number
+    """
+    manifest_path = Path(directory, NAME_MANIFEST)
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path) as file:
+        next(file, None)
+        rows = (line.rstrip("\n").split(_MANIFEST_SEPARATOR, 1) for line in file if line.strip())
+        return {int(number): Path(directory, path) for number, path in rows}
+
+
+def append_to_rejections(options: dict, index: int, reason: str) -> None:
+    """Appends scenario `index` (i.e. its `generated_count`) and `reason` of its rejection to `rejections.csv`"""
+    rejections_path = Path(options[CreateOptions.DIRECTORY], NAME_REJECTIONS)
+    is_new = not rejections_path.exists()
+    reason = " ".join(str(reason).split()).replace(_MANIFEST_SEPARATOR, ",")
+    with open(rejections_path, "a") as file:
+        if is_new:
+            file.write(_REJECTIONS_HEADER)
+        file.write(f"{index}{_MANIFEST_SEPARATOR}{reason}\n")
+
+
+def move_scenario_files(source: Path, target: Path) -> None:
+    """Moves scenario YAML at `source` and its results folder (if any) to scenario YAML path `target`"""
+    if Path(source) == Path(target):
+        return
+    ensure_folder_exists(Path(target).parent)
+    os.replace(source, target)
+    results = Path(Path(source).parent, Path(source).stem)
+    if results.exists():
+        target_results = Path(Path(target).parent, Path(target).stem)
+        shutil.rmtree(target_results, ignore_errors=True)
+        shutil.move(results, target_results)
+    log().debug("Moved scenario '%s' to '%s'", source, target)
+
+
+def get_file_hash(path: Path) -> str:
+    """Returns SHA-256 hex digest of the content of file at `path`"""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def get_scenario_manifest_path(scenario_path: Path) -> Path:
+    """Returns path of the compact manifest belonging to scenario YAML at `scenario_path`"""
+    return Path(scenario_path).with_name(Path(scenario_path).stem + SUFFIX_SCENARIO_MANIFEST)
+
+
+def compact_scenario(options: dict, manifest: dict) -> None:
+    """Replaces scenario YAML at `options['scenario_path']` by given compact `manifest`"""
+    write_yaml(manifest, get_scenario_manifest_path(options["scenario_path"]))
+    os.remove(options["scenario_path"])
+    log().debug("Replaced scenario '%s' by its manifest", options["scenario_path"])
+
+
+def discard_in_background(path: Path) -> None:
+    """Renames given `path` (if existing) to free its name immediately and deletes it in a background thread"""
+    if not path.exists():
+        return
+    discarded = Path(path.parent, f"{_PREFIX_DISCARDED}{uuid.uuid4().hex}")
+    os.rename(path, discarded)
+    run_in_background("scengen_cleanup", 1, shutil.rmtree, discarded, ignore_errors=True)
+
+
+def run_in_background(name: str, workers: int, function: Callable, *args, **kwargs) -> None:
+    """
+    Calls `function` with given arguments on thread pool `name` with given number of `workers`; Path arguments are made
+    absolute, as the working directory may be changed meanwhile by `working_directory`
+    """
+    args = tuple(arg.absolute() if isinstance(arg, Path) else arg for arg in args)
+    _background_tasks[:] = [task for task in _background_tasks if not task.done() or task.exception()]
+    if name not in _executors:
+        _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+    _background_tasks.append(_executors[name].submit(function, *args, **kwargs))
+
+
+def wait_for_background_tasks() -> None:
+    """Blocks until all background tasks are completed"""
+    for task in _background_tasks:
+        task.result()
+    _background_tasks.clear()
+
+
+@contextmanager
+def working_directory(path: Path) -> Iterator[None]:
+    """
+    Changes current working directory to given `path` and restores the original one on exit.
+    Not thread-safe: the working directory is process-wide and amirispy relies on it to run AMIRIS, so other threads
+    must not use relative paths meanwhile (see `run_in_background`)
+    """
+    origin = Path.cwd()
+    ensure_folder_exists(path)
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(origin)
+
+
+@contextmanager
+def temporary_working_directory(parent: Path) -> Iterator[Path]:
+    """
+    Changes current working directory to a new unique folder in `parent` and deletes it with all its content on exit,
+    so that concurrent processes never share files written to their working directory
+    """
+    ensure_folder_exists(parent)
+    path = Path(tempfile.mkdtemp(prefix=_PREFIX_RUN, dir=parent))
+    try:
+        with working_directory(path):
+            yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
 def increase_count_in_trace_file(options: dict) -> None:
     """Increases count in trace file defined in `CreateOptions.CONFIG` by 1"""
     config = load_yaml(options[CreateOptions.CONFIG])
@@ -55,6 +235,28 @@ def save_seed_to_trace_file(options: dict, seed: int) -> None:
     log().debug(f"Stored seed '{seed}' to `trace_file`")
 
 
+def save_generated_count_to_trace_file(options: dict, generated_count: int) -> None:
+    """Saves number of all generated scenarios (including rejected ones) to trace file"""
+    config = load_yaml(options[CreateOptions.CONFIG])
+    base_path = Path(options[CreateOptions.CONFIG]).parent
+    full_path = Path(base_path, config["defaults"]["trace_file"])
+    trace_file = load_yaml(full_path)
+    trace_file["generated_count"] = generated_count
+    write_dict_to_disk(trace_file, full_path)
+    log().debug(f"Increased count of generated scenarios in trace file to '{generated_count}'")
+
+
+def save_variant_base_to_trace_file(options: dict, index: int) -> None:
+    """Saves index of the reference scenario of variants to trace file"""
+    config = load_yaml(options[CreateOptions.CONFIG])
+    base_path = Path(options[CreateOptions.CONFIG]).parent
+    full_path = Path(base_path, config["defaults"]["trace_file"])
+    trace_file = load_yaml(full_path)
+    trace_file["variant_base"] = index
+    write_dict_to_disk(trace_file, full_path)
+    log().debug(f"Stored index '{index}' of reference scenario for variants to `trace_file`")
+
+
 def write_yaml(output_file: dict, output_file_path: Path) -> None:
     """Writes given `output_file` to `output_file_path` (ending in .yaml)"""
     ensure_folder_exists(output_file_path.parent)
@@ -66,6 +268,102 @@ def write_yaml(output_file: dict, output_file_path: Path) -> None:
             log_and_raise_critical(f"Failed writing YAML to '{output_file_path}'")
 
 
+class StreamingYamlWriter:
+    """Writes YAML file incrementally: items of list sections one by one, all remaining sections when closed"""
+
+    def __init__(self, output_file_path: Path):
+        ensure_folder_exists(output_file_path.parent)
+        check_if_valid_yaml_path(output_file_path)
+        self._path = output_file_path
+        self._stream = open(output_file_path, "w")
+        self._sections: list[str] = []
+
+    def append(self, section: str, item: Any) -> None:
+        """Appends given `item` to list `section` - items of one section must be appended consecutively"""
+        if not self._sections or self._sections[-1] != section:
+            if section in self._sections:
+                log_and_raise_critical(_ERR_SECTION_NOT_CONSECUTIVE.format(section, self._path))
+            self._sections.append(section)
+            self._stream.write(f"{section}:\n")
+        try:
+            yaml.safe_dump([item], self._stream)
+        except yaml.YAMLError:
+            log_and_raise_critical(f"Failed writing YAML to '{self._path}'")
+
+    def close(self, remaining: dict) -> None:
+        """Writes all `remaining` sections not yet streamed and closes the file"""
+        remaining = {key: value for key, value in remaining.items() if key not in self._sections}
+        try:
+            if remaining:
+                yaml.safe_dump(remaining, self._stream)
+        except yaml.YAMLError:
+            log_and_raise_critical(f"Failed writing YAML to '{self._path}'")
+        finally:
+            self._stream.close()
+
+
+def _iterate_yaml_events(path: Path) -> Iterator[tuple[Optional[tuple], yaml.Event]]:
+    """
+    Yields parser events of YAML file at `path` one by one together with the key path of the node they belong to
+    (list items keyed by their index) - the path is None for scalar mapping keys
+    """
+    stack: list[list] = []  # per open collection: key of its current item and whether it is a mapping awaiting a key
+    with open(path) as file:
+        for event in yaml.parse(file, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)):
+            if isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                stack.pop()
+                yield tuple(key for key, _ in stack), event
+                _complete_item(stack)
+                continue
+            if stack and stack[-1][1] is True and isinstance(event, yaml.ScalarEvent):
+                stack[-1] = [event.value, False]
+                yield None, event
+                continue
+            if stack and stack[-1][1] is None:
+                stack[-1][0] += 1
+            yield tuple(key for key, _ in stack), event
+            if isinstance(event, yaml.MappingStartEvent):
+                stack.append([None, True])
+            elif isinstance(event, yaml.SequenceStartEvent):
+                stack.append([-1, None])
+            elif isinstance(event, (yaml.ScalarEvent, yaml.AliasEvent)):
+                _complete_item(stack)
+
+
+def _complete_item(stack: list[list]) -> None:
+    """Marks the current item of the innermost open collection on `stack` as complete"""
+    if stack and stack[-1][1] is False:
+        stack[-1][1] = True
+
+
+def read_yaml_scalars(path: Path, key_paths: list[tuple]) -> dict[tuple, str]:
+    """Returns raw scalar values found at given `key_paths` of YAML file at `path` without loading the whole file"""
+    return {
+        keys: event.value
+        for keys, event in _iterate_yaml_events(path)
+        if keys in key_paths and isinstance(event, yaml.ScalarEvent)
+    }
+
+
+def copy_yaml_replacing_scalars(source: Path, target: Path, replacements: dict[tuple, str]) -> None:
+    """
+    Copies YAML file at `source` to `target` event by event without loading the whole file, replacing scalar values
+    at the key paths of `replacements` with the associated values
+    """
+    check_if_valid_yaml_path(target)
+    events = (
+        yaml.ScalarEvent(event.anchor, event.tag, event.implicit, replacements[keys], style=event.style)
+        if keys in replacements and isinstance(event, yaml.ScalarEvent)
+        else event
+        for keys, event in _iterate_yaml_events(source)
+    )
+    try:
+        with open(target, "w") as stream:
+            yaml.emit(events, stream, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper))
+    except yaml.YAMLError:
+        log_and_raise_critical(f"Failed writing YAML to '{target}'")
+
+
 def check_if_valid_yaml_path(file_path: Path):
     """Raises Exception if provided `file_path` is not a valid YAML path"""
     if Path(file_path).suffix.lower() not in [".yaml", ".yml"]:
@@ -1,14 +1,21 @@
 import os
-import random
 from pathlib import Path
-from typing import Union, Any
+from typing import Union, Any, Optional
 
 from fameio.source.tools import keys_to_lower
 
 from scengen.cli import CreateOptions
-from scengen.generation.misc import get_all_ids_from, create_new_unique_id, cast_numeric_strings, \
-    get_relative_paths_in_dir, extract_numbers_from_string
+from scengen.generation.misc import (
+    get_all_ids_from,
+    create_new_unique_id,
+    cast_numeric_strings,
+    get_relative_paths_in_dir,
+    extract_numbers_from_string,
+)
+from scengen.generation.sampling import Sampler, KEY_SEPARATOR
 from scengen.logs import log, log_and_raise_critical
+from scengen.files import get_series_cache_dir
+from scengen.timeseries import validate_series, get_transformed_series
 
 numeric = Union[int, float]
 
@@ -19,6 +26,7 @@ RANGE_FLOAT_IDENTIFIER = "range_float"
 RANGE_IDENTIFIER_DEPRECATED = "range("
 CHOOSE_IDENTIFIER = "choose"
 PICKFILE_IDENTIFIER = "pickfile"
+TRANSFORM_IDENTIFIER = "transform"
 REPLACEMENT_IDENTIFIER = "//"
 KEY_THIS_AGENT = f"{REPLACEMENT_IDENTIFIER}THIS_AGENT"
 
@@ -31,26 +39,38 @@ ERR_INVALID_RANGE_INPUT = (
 )
 ERR_INVALID_RANGE_ORDER = "Received invalid range input in form '{}'. First value must be larger equal to second value."
 ERR_MISSING_MATCH = "Found identifier(s) '{}' in `external_ids` but could not match with given agent(s) '{}'."
-ERR_STATIC_CONTRACT = ("Expected dynamic, but found static contract template instead. Replace either `senderid` or "
-                       "`receiverid` with a dynamic replacement_identifier in contract '{}'")
-WARN_ROUNDED_NUMBER_OF_AGENTS = ("Rounded `agent_count` to '{}'. Make sure you provide a single integer or "
-                                 "'{}' instead of '{}'.")
+ERR_STATIC_CONTRACT = (
+    "Expected dynamic, but found static contract template instead. Replace either `senderid` or "
+    "`receiverid` with a dynamic replacement_identifier in contract '{}'"
+)
+WARN_ROUNDED_NUMBER_OF_AGENTS = (
+    "Rounded `agent_count` to '{}'. Make sure you provide a single integer or " "'{}' instead of '{}'."
+)
 ERR_DEPRECATED_RANGE_IDENTIFIER = "Found deprecated identifier in '{}'. Please use '{}' or '{}' instead."
 ERR_NO_INTEGER = "Expected a single integer or '{}' but received '{}' for `agent_count` instead."
-DEBUG_NO_PATH_TO_BE_REPLACED_IN = "No path to be replaced for Attribute '{}: {}'."
+DEBUG_NO_PATH_TO_BE_REPLACED_IN = "No path to be replaced for Attribute '%s: %s'."
 ERR_COULD_NOT_MAP_RANGE_VALUES = "Could not map range values '{}' to minimum, maximum values."
-ERR_FAILED_RESOLVE_ID = ("Cannot match replacement Identifier '{}' from Contract '{}' to any existing Agent. "
-                         f"Make sure to reference either '{KEY_THIS_AGENT}' "
-                         f"or any dynamically created agent.")
+ERR_INVALID_TRANSFORM = (
+    f"Received invalid transform input '{{}}'. Please provide in format "
+    f"'{TRANSFORM_IDENTIFIER}(path/to/series.csv; scale; offset)' with numeric scale and offset."
+)
+ERR_NO_TEMPLATE_DIR = "Cannot derive timeseries '{}' without the directory of the template it is defined in."
+ERR_FAILED_RESOLVE_ID = (
+    "Cannot match replacement Identifier '{}' from Contract '{}' to any existing Agent. "
+    f"Make sure to reference either '{KEY_THIS_AGENT}' "
+    f"or any dynamically created agent."
+)
 
 
-def get_number_of_agents_to_create(agent_count: Union[list[Any], Any], options: dict) -> int:
+def get_number_of_agents_to_create(
+    agent_count: Union[list[Any], Any], options: dict, sampler: Sampler, key: Optional[str] = None
+) -> int:
     """
-    Returns an integer number from field `agent_count`
+    Returns an integer number from field `agent_count` drawn from given `sampler`
     Accepts float values by rounding to integer, but raises warning to notify user about wrong type,
     for any other data type an Error is raised
     """
-    value_from_field = get_value_from_field(agent_count, options, allow_negative=False)
+    value_from_field = get_value_from_field(agent_count, options, sampler, allow_negative=False, key=key)
     if not isinstance(value_from_field, int):
         try:
             rounded_number = round(value_from_field)
@@ -61,45 +81,97 @@ def get_number_of_agents_to_create(agent_count: Union[list[Any], Any], options:
     return value_from_field
 
 
-def get_value_from_field(input_value: Union[list[Any], Any], options: dict, allow_negative: bool = True) -> Any:
+def get_value_from_field(
+    input_value: Union[list[Any], Any],
+    options: dict,
+    sampler: Sampler,
+    allow_negative: bool = True,
+    key: Optional[str] = None,
+    template_dir: Optional[Path] = None,
+) -> Any:
     """
     Returns value stored in `input_value` based on the user specification 'RANGE_INT_IDENTIFIER',
     'RANGE_INT_IDENTIFIER', 'CHOOSE_IDENTIFIER', 'PICKFILE_IDENTIFIER' or else just `input_value`.
     In range options, `allow_negative` is True as default but can limit allowed range to values >=0.
     In option `PICKFILE_IDENTIFIER`, `options[CreateOptions.DIRECTORY]` is used to get files: paths relative to scenario
+    In option `TRANSFORM_IDENTIFIER`, a derived timeseries is returned with path relative to `template_dir`
+    Random draws are taken from given `sampler` and recorded in it with given `key` (if any)
     """
     if isinstance(input_value, str):
-        if RANGE_IDENTIFIER_DEPRECATED in input_value.lower():
+        lower_value = input_value.lower()
+        if RANGE_IDENTIFIER_DEPRECATED in lower_value:
             log_and_raise_critical(
                 ERR_DEPRECATED_RANGE_IDENTIFIER.format(input_value, RANGE_INT_IDENTIFIER, RANGE_FLOAT_IDENTIFIER)
             )
-        elif RANGE_INT_IDENTIFIER in input_value.lower():
+        elif lower_value.startswith(TRANSFORM_IDENTIFIER + "("):
+            value = digest_transform(input_value, options, template_dir, sampler.index)
+            log().debug("Derived timeseries '%s' from '%s'.", value, input_value)
+            return value
+        elif RANGE_INT_IDENTIFIER in lower_value:
             input_range = digest_int_range(input_value)
             validate_input_range(input_range, allow_negative)
-            value = random.randint(*input_range)
-            log().debug(f"Chose random value '{value}' from '{input_value}'.")
-        elif RANGE_FLOAT_IDENTIFIER in input_value.lower():
+            value = sampler.randint(*input_range, key)
+            log().debug("Chose random value '%s' from '%s'.", value, input_value)
+        elif RANGE_FLOAT_IDENTIFIER in lower_value:
             input_range = digest_float_range(input_value)
             validate_input_range(input_range, allow_negative)
-            value = random.uniform(*input_range)
-            log().debug(f"Chose random value '{value}' from '{input_value}'.")
-        elif CHOOSE_IDENTIFIER in input_value.lower():
+            value = sampler.uniform(*input_range, key)
+            log().debug("Chose random value '%s' from '%s'.", value, input_value)
+        elif CHOOSE_IDENTIFIER in lower_value:
             to_choose = digest_choose(input_value)
-            value = random.choice(to_choose)
-            log().debug(f"Chose random value '{value}' from list '{input_value}'.")
-        elif PICKFILE_IDENTIFIER in input_value.lower():
+            value = sampler.choice(to_choose)
+            log().debug("Chose random value '%s' from list '%s'.", value, input_value)
+        elif PICKFILE_IDENTIFIER in lower_value:
             to_pick = digest_pickfile(input_value, options[CreateOptions.DIRECTORY])
-            value = random.choice(to_pick)
-            log().debug(f"Chose random file '{value}' from path '{input_value}'.")
+            value = sampler.choice(to_pick)
+            log().debug("Chose random file '%s' from path '%s'.", value, input_value)
         else:
             value = input_value
-            log().debug(f"Received exactly one input value '{input_value}'.")
+            log().debug("Received exactly one input value '%s'.", input_value)
+            return value
+        if key is not None:
+            sampler.record(key, input_value, value)
     else:
         value = input_value
-        log().debug(f"Received exactly one input value '{input_value}'.")
+        log().debug("Received exactly one input value '%s'.", input_value)
     return value
 
 
+def get_maximum_number_of_agents(agent_count: Union[list[Any], Any]) -> int:
+    """Returns largest number of agents to create that field `agent_count` may yield"""
+    if isinstance(agent_count, (int, float)):
+        return round(agent_count)
+    lower_value = str(agent_count).lower()
+    if RANGE_INT_IDENTIFIER in lower_value:
+        return digest_int_range(agent_count)[1]
+    if RANGE_FLOAT_IDENTIFIER in lower_value:
+        return round(digest_float_range(agent_count)[1])
+    if CHOOSE_IDENTIFIER in lower_value:
+        return max((round(value) for value in digest_choose(agent_count) if isinstance(value, (int, float))), default=0)
+    return 0
+
+
+def is_numeric_range(input_value: Any) -> bool:
+    """Returns True if `input_value` specifies a draw from an integer or float range"""
+    if not isinstance(input_value, str):
+        return False
+    lower_value = input_value.lower()
+    if lower_value.startswith(TRANSFORM_IDENTIFIER + "(") or RANGE_IDENTIFIER_DEPRECATED in lower_value:
+        return False
+    return RANGE_INT_IDENTIFIER in lower_value or RANGE_FLOAT_IDENTIFIER in lower_value
+
+
+def get_numeric_range_fields(input_value: Any, path: str = "") -> list[str]:
+    """Returns paths (starting with `path`) of all fields in nested `input_value` drawn from a numeric range in order"""
+    if isinstance(input_value, dict):
+        items = input_value.items()
+    elif isinstance(input_value, list):
+        items = enumerate(input_value)
+    else:
+        return [path] if is_numeric_range(input_value) else []
+    return [field for key, value in items for field in get_numeric_range_fields(value, join_key(path, key))]
+
+
 def get_agent_id(agent_name: str, agent_number: int, n_of_agents_to_create: int) -> str:
     """
     Returns `agent_id` with leading REPLACEMENT_IDENTIFIER for `agent_name` considering its `agent_number`
@@ -110,32 +182,52 @@ def get_agent_id(agent_name: str, agent_number: int, n_of_agents_to_create: int)
     return agent_id
 
 
-def update_series_paths(scenario: dict, options: dict, template_dir: Path) -> None:
+def update_series_paths(scenario: dict, options: dict, template_dir: Path, expected_rows: Optional[int] = None) -> None:
     """
     Appends relative paths directing to `template_dir` for CSV files defined in `scenario`s `Agents`
-    and (optional) `StringSets`
+    and (optional) `StringSets` and validates each referenced CSV file (optionally against `expected_rows`)
     """
-    config_dir = Path(options[CreateOptions.CONFIG]).parent
-    output_dir = Path(options[CreateOptions.DIRECTORY])
-    path_to_append = Path(os.path.relpath(config_dir, start=output_dir), template_dir.parent)
+    path_to_append = get_series_path_prefix(options, template_dir)
+    series_paths = []
     for agent in scenario["Agents"]:
-        agent = keys_to_lower(agent)
-        replace_timeseries_path_in(agent.get("Attributes".lower(), {}), path_to_append)
+        update_agent_series_paths(agent, path_to_append, series_paths)
+    validate_series(series_paths, Path(options["scenario_path"]).parent, expected_rows)
+
+
+def get_series_path_prefix(options: dict, template_dir: Path) -> Path:
+    """
+    Returns path to prepend to CSV files defined relative to `template_dir` so that they link from the directory
+    of the scenario at `options['scenario_path']`
+    """
+    config_dir = Path(options[CreateOptions.CONFIG]).parent
+    output_dir = Path(options["scenario_path"]).parent
+    return Path(os.path.relpath(config_dir, start=output_dir), template_dir.parent)
+
+
+def update_agent_series_paths(agent: dict, path_to_append: Path, series_paths: list) -> None:
+    """Prepends `path_to_append` to CSV files in Attributes of given `agent` and appends them to `series_paths`"""
+    agent = keys_to_lower(agent)
+    replace_timeseries_path_in(agent.get("Attributes".lower(), {}), path_to_append, series_paths)
 
 
-def replace_timeseries_path_in(attributes: dict, template_path: Path) -> None:
-    """Recursively modify timeseries path in-place in given `attributes` to link to `template_path`"""
+def replace_timeseries_path_in(attributes: dict, template_path: Path, series_paths: Optional[list] = None) -> None:
+    """
+    Recursively modify timeseries path in-place in given `attributes` to link to `template_path`;
+    replaced paths are appended to `series_paths` if given
+    """
     for attribute_name, attribute_value in attributes.items():
         if isinstance(attribute_value, str):
             if attribute_value.lower().endswith(".csv"):
                 attributes[attribute_name] = Path(template_path, attribute_value).__str__()
+                if series_paths is not None:
+                    series_paths.append(attributes[attribute_name])
         elif isinstance(attribute_value, dict):
-            replace_timeseries_path_in(attribute_value, template_path)
+            replace_timeseries_path_in(attribute_value, template_path, series_paths)
         elif isinstance(attribute_value, list):
             for item in attribute_value:
-                replace_timeseries_path_in(item, template_path)
+                replace_timeseries_path_in(item, template_path, series_paths)
         else:
-            log().debug(DEBUG_NO_PATH_TO_BE_REPLACED_IN.format(attribute_name, attribute_value))
+            log().debug(DEBUG_NO_PATH_TO_BE_REPLACED_IN, attribute_name, attribute_value)
 
 
 def validate_input_range(input_range: tuple[numeric, numeric], allow_negative: bool) -> None:
@@ -144,9 +236,9 @@ def validate_input_range(input_range: tuple[numeric, numeric], allow_negative: b
     values >= 0 (if `allow_negative` = False)
     """
     if (
-            isinstance(input_range, tuple)
-            and len(input_range) == 2
-            and all(isinstance(i, (int, float)) for i in input_range)
+        isinstance(input_range, tuple)
+        and len(input_range) == 2
+        and all(isinstance(i, (int, float)) for i in input_range)
     ):
         if not allow_negative:
             if any(i < 0 for i in input_range):
@@ -209,22 +301,74 @@ def digest_pickfile(input_value: str, scenario_path: Path) -> list[str]:
     return files_in_dir
 
 
-def resolve_identifiers(input_value: Any, options: dict) -> Any:
+def digest_transform(input_value: str, options: dict, template_dir: Optional[Path], owner: Optional[int]) -> str:
+    """
+    Returns path relative to `template_dir` of cached timeseries derived from the series given in `input_value`
+    (relative to `template_dir`) by its scale and offset; the derived series is referenced by scenario index `owner`
+    """
+    if template_dir is None:
+        log_and_raise_critical(ERR_NO_TEMPLATE_DIR.format(input_value))
+    arguments = input_value.strip()[len(TRANSFORM_IDENTIFIER) :].strip("() ").split(SEPARATOR)
+    try:
+        path, scale, offset = arguments
+        scale, offset = float(scale), float(offset)
+    except ValueError:
+        log_and_raise_critical(ERR_INVALID_TRANSFORM.format(input_value))
+    source = Path(template_dir, path.strip().strip("'\""))
+    limit = options.get(CreateOptions.SERIES_CACHE_LIMIT)
+    target = get_transformed_series(source, scale, offset, get_series_cache_dir(options), limit, owner)
+    return os.path.relpath(target, start=template_dir)
+
+
+def resolve_identifiers(
+    input_value: Any,
+    options: dict,
+    sampler: Sampler,
+    path: str = "",
+    template_dir: Optional[Path] = None,
+) -> Any:
     """
     Iterates over (potentially nested) `input_value` and returns values from fields
-    considering options in `get_value_from_field`
+    considering options in `get_value_from_field` drawing from given `sampler`, with `transform` paths relative to
+    `template_dir`; drawn values are recorded with their field path, separated by KEY_SEPARATOR and starting with `path`
     """
     for key, value in input_value.items():
+        field_path = join_key(path, key)
         if isinstance(value, dict):
-            resolve_identifiers(value, options)
+            resolve_identifiers(value, options, sampler, field_path, template_dir)
         elif isinstance(value, list):
             for index, item in enumerate(value):
                 if isinstance(item, dict):
-                    resolve_identifiers(item, options)
+                    resolve_identifiers(item, options, sampler, join_key(field_path, index), template_dir)
                 else:
-                    input_value[key][index] = get_value_from_field(item, options)
+                    input_value[key][index] = get_value_from_field(
+                        item, options, sampler=sampler, key=join_key(field_path, index), template_dir=template_dir
+                    )
         else:
-            input_value[key] = get_value_from_field(value, options)
+            input_value[key] = get_value_from_field(
+                value, options, sampler=sampler, key=field_path, template_dir=template_dir
+            )
+
+
+def join_key(path: str, key: Union[str, int]) -> str:
+    """Returns `key` appended to given field `path` using KEY_SEPARATOR"""
+    return f"{path}{KEY_SEPARATOR}{key}" if path else str(key)
+
+
+def set_value_at(input_value: Union[dict, list], key: str, value: Any) -> None:
+    """Sets `value` of field at given field path `key` (separated by KEY_SEPARATOR) in nested `input_value`"""
+    *parents, last = key.split(KEY_SEPARATOR)
+    container = input_value
+    for part in parents:
+        container = container[int(part)] if isinstance(container, list) else container[part]
+    container[int(last) if isinstance(container, list) else last] = value
+
+
+def is_series_path(key: str, value: Any) -> bool:
+    """Returns True if `value` of field at path `key` is a timeseries file in the Attributes of an agent"""
+    parts = key.split(KEY_SEPARATOR)
+    in_attributes = len(parts) > 2 and parts[0] == "Agents" and parts[2].lower() == "attributes"
+    return in_attributes and isinstance(value, str) and value.lower().endswith(".csv")
 
 
 def resolve_ids(scenario: dict) -> None:
@@ -232,17 +376,27 @@ def resolve_ids(scenario: dict) -> None:
     active_ids = get_all_ids_from(scenario)
     replacement_map: dict[str, int] = {}
     for agent in scenario["Agents"]:
-        agent_id = agent["Id"]
-        if REPLACEMENT_IDENTIFIER in str(agent_id):
-            if agent_id in replacement_map.keys():
-                agent["Id"] = replacement_map[agent_id]
-            else:
-                unique_id = create_new_unique_id(active_ids)
-                agent["Id"] = replacement_map[agent_id] = unique_id
+        resolve_agent_id(agent, active_ids, replacement_map)
     for contract in scenario["Contracts"]:
-        for key, value in contract.items():
-            if REPLACEMENT_IDENTIFIER in str(value):
-                try:
-                    contract[key] = replacement_map[value]
-                except KeyError:
-                    log_and_raise_critical(ERR_FAILED_RESOLVE_ID.format(value, contract))
+        resolve_contract_ids(contract, replacement_map)
+
+
+def resolve_agent_id(agent: dict, active_ids: list[int], replacement_map: dict[str, int]) -> None:
+    """Replaces placeholder ID of `agent` in-place with a new unique Id not in `active_ids` and stores it in map"""
+    agent_id = agent["Id"]
+    if REPLACEMENT_IDENTIFIER in str(agent_id):
+        if agent_id in replacement_map.keys():
+            agent["Id"] = replacement_map[agent_id]
+        else:
+            unique_id = create_new_unique_id(active_ids)
+            agent["Id"] = replacement_map[agent_id] = unique_id
+
+
+def resolve_contract_ids(contract: dict, replacement_map: dict[str, int]) -> None:
+    """Replaces placeholder ID references in `contract` in-place by their Ids in `replacement_map`"""
+    for key, value in contract.items():
+        if REPLACEMENT_IDENTIFIER in str(value):
+            try:
+                contract[key] = replacement_map[value]
+            except KeyError:
+                log_and_raise_critical(ERR_FAILED_RESOLVE_ID.format(value, contract))
@@ -1,69 +1,443 @@
 import copy
-import random
+import os
 import time
+from fnmatch import fnmatchcase
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterator, Optional
 
 from fameio.source.loader import load_yaml
 from fameio.source.scenario import Contract
 from fameio.source.tools import ensure_is_list
 
 from scengen.cli import CreateOptions
-from scengen.files import get_trace_file, save_seed_to_trace_file, write_yaml
-from scengen.generation.digest import get_number_of_agents_to_create, get_agent_id, \
-    update_series_paths, resolve_identifiers, resolve_ids, KEY_THIS_AGENT, REPLACEMENT_IDENTIFIER
+from scengen.estimator import reduce_agent
+from scengen.files import (
+    get_trace_file,
+    save_seed_to_trace_file,
+    write_yaml,
+    StreamingYamlWriter,
+    save_generated_count_to_trace_file,
+    get_scenario_directory,
+    ensure_folder_exists,
+    get_file_hash,
+    save_variant_base_to_trace_file,
+    move_scenario_files,
+)
+from scengen.generation.digest import (
+    get_number_of_agents_to_create,
+    get_agent_id,
+    update_series_paths,
+    resolve_identifiers,
+    resolve_ids,
+    KEY_THIS_AGENT,
+    REPLACEMENT_IDENTIFIER,
+    get_series_path_prefix,
+    update_agent_series_paths,
+    resolve_agent_id,
+    resolve_contract_ids,
+    join_key,
+    get_value_from_field,
+    set_value_at,
+    is_series_path,
+    get_numeric_range_fields,
+    get_maximum_number_of_agents,
+    is_numeric_range,
+    KEY_SEPARATOR,
+)
 from scengen.generation.check import raise_if_static_contract, raise_if_dynamic_match_missing
-from scengen.generation.misc import get_matching_ids_from
-from scengen.logs import log
+from scengen.generation.misc import get_matching_ids_from, get_all_ids_from
+from scengen.generation.sampling import (
+    Sampler,
+    get_design,
+    KEY_METHOD,
+    KEY_DIMENSIONS,
+    METHOD_SOBOL,
+    DEFAULT_SOBOL_DIMENSIONS,
+)
+from scengen.logs import log, log_and_raise_critical
+from scengen.profiling import stage, STAGE_GENERATION, STAGE_RESOLVE_IDENTIFIERS, STAGE_RESOLVE_IDS, STAGE_ADD_CONTRACTS
+from scengen.timeseries import validate_series
 
 
+KEY_SCENARIO_NAME = "scenario_name"
+KEY_SCENARIO_NUMBER = "scenario_number"
+KEY_INDEX = "index"
+KEY_SEED = "seed"
+KEY_DESIGN_SIZE = "design_size"
+KEY_DIRECTORY = "directory"
+KEY_TEMPLATES = "templates"
+KEY_VALUES = "values"
+KEY_BASE_INDEX = "base_index"
+KEY_FIELDS = "fields"
+KEY_VARIANT_BASE = "variant_base"
+
 DEBUG_NO_CREATE = "No agents to `create` found in Config '{}'"
+ERR_TEMPLATES_CHANGED = (
+    "Cannot rebuild scenario '{}': GeneratorConfig or template(s) {} changed since its creation. "
+    "Restore the original files to rebuild it."
+)
+ERR_NO_FIELD_MATCHED = "None of the fields '{}' to vary matches any dynamic field of the reference scenario: {}"
+ERR_STRUCTURAL_FIELD = (
+    "Cannot vary field(s) '{}' as they change the structure of the scenario. "
+    "Create a separate campaign for each number of agents instead."
+)
+ERR_VALUES_DIFFER = (
+    "Cannot rebuild scenario '{}': drawn values differ from those in its manifest, e.g. due to "
+    "changed timeseries directories used in `pickfile`."
+)
+
+MAX_CACHED_TEMPLATES = 256
+MAX_CACHED_DESIGN_FIELDS = 16
 
 
 class Generator:
     """Main scenario generator class"""
-    def __init__(self, options: dict):
+
+    def __init__(self, options: dict, trace_file: Optional[dict] = None):
         self.options = options
         self.config = load_yaml(self.options[CreateOptions.CONFIG])
-        self.trace_file = get_trace_file(self.config, options)
+        self.template_dir = Path(self.options[CreateOptions.CONFIG].parent, self.config["base_template"]).parent
+        self.trace_file = trace_file if trace_file is not None else get_trace_file(self.config, options)
         self.scenario = {}
+        self.scenario_number = self.trace_file["total_count"]
+        self.sampler = Sampler()
+        self.base_index: Optional[int] = None
+        self.varied_fields: Optional[list[str]] = None
+        self.estimation_agents: list[dict] = []
 
     def generate_scenarios(self) -> None:
-        """Generates a new scenario based on `options` and `scenario_name` stored in `CreateOptions.DIRECTORY`"""
+        """Generates a new scenario based on `options` and stores it as `scenario_name` in its scenario directory"""
         log().debug("Generating scenario")
         self._init_random_seed()
+        self._init_sampler()
+        with stage(STAGE_GENERATION, self.sampler.index):
+            self._generate(get_scenario_directory(self.options, self.scenario_number))
 
-        defaults = self.config["defaults"]
-        count = self.trace_file["total_count"]
-        self._set_scenario_name(defaults["base_name"] + f"_{count}")
-        self._set_scenario(load_yaml(Path(self.options[CreateOptions.CONFIG].parent, self.config["base_template"])))
+    def generate_candidate(self) -> None:
+        """Generates a new scenario based on `options` in memory only - call `write_scenario` to write it to disk"""
+        log().debug("Generating candidate scenario")
+        self._init_random_seed()
+        self._init_sampler()
+        with stage(STAGE_GENERATION, self.sampler.index):
+            self._prepare(get_scenario_directory(self.options, self.scenario_number))
+            self._generate_in_memory(self.config["defaults"].get("series_rows"))
+
+    def write_scenario(self) -> None:
+        """Writes scenario of `generate_candidate` to disk, numbered by the current count of accepted scenarios"""
+        self.scenario_number = get_trace_file(self.config, self.options)["total_count"]
+        self._set_scenario_location(get_scenario_directory(self.options, self.scenario_number))
+        write_yaml(self.scenario, self.options["scenario_path"])
+
+    def write_candidate(self) -> None:
+        """
+        Writes scenario of `generate_candidate` to disk with a provisional name unique among all candidates, so that
+        candidates can be simulated concurrently - call `assign_number` once the scenario is accepted
+        """
+        self._set_scenario_name(self.config["defaults"]["base_name"] + f"_candidate_{self.sampler.index}")
+        self._set_scenario_path(Path(self.options["scenario_path"].parent, self.options["scenario_name"] + ".yaml"))
+        write_yaml(self.scenario, self.options["scenario_path"])
+
+    def assign_number(self) -> None:
+        """Renames scenario of `write_candidate` and its results according to the current count of accepted scenarios"""
+        provisional_path = self.options["scenario_path"]
+        self.scenario_number = get_trace_file(self.config, self.options)["total_count"]
+        self._set_scenario_location(get_scenario_directory(self.options, self.scenario_number))
+        move_scenario_files(provisional_path, self.options["scenario_path"])
+
+    def generate_in_memory(self, index: int) -> dict:
+        """
+        Returns scenario with given `index` generated in memory from campaign seed `options['random_seed']`;
+        neither scenario nor trace file are written - timeseries paths link from `CreateOptions.DIRECTORY`
+        """
+        self.scenario_number = index
+        self.sampler = self._create_sampler(self.options["random_seed"], index)
+        self._set_scenario(self._load_template(self.config["base_template"]))
+        self._set_scenario_name(self.config["defaults"]["base_name"] + f"_{self.scenario_number}")
+        self._set_scenario_path(Path(self.options[CreateOptions.DIRECTORY], self.options["scenario_name"] + ".yaml"))
+        self._generate_in_memory(self.config["defaults"].get("series_rows"))
+        return self.scenario
+
+    def generate_base(self, scenario_dir: Optional[Path] = None) -> None:
+        """
+        Generates reference scenario of variants in memory for the given `scenario_dir` (default: directory of the next
+        scenario); its index is read from the trace file or - on first use - the next index is taken and stored there
+        """
+        log().debug("Generating reference scenario for variants")
+        self._init_random_seed()
+        if self.trace_file.get(KEY_VARIANT_BASE) is None:
+            self._init_sampler()
+            self.trace_file[KEY_VARIANT_BASE] = self.sampler.index
+            save_variant_base_to_trace_file(self.options, self.sampler.index)
+        else:
+            self.sampler = self._create_sampler(self.options["random_seed"], self.trace_file[KEY_VARIANT_BASE])
+        self._prepare(scenario_dir or get_scenario_directory(self.options, self.scenario_number))
+        self._generate_in_memory(self.config["defaults"].get("series_rows"))
+
+    def generate_variant(self, base: "Generator", fields: list[str]) -> None:
+        """
+        Generates in memory a variant of the reference scenario of `base` in which only the dynamic fields with a path
+        matching any of the (Unix shell-style) patterns in `fields` are sampled anew - call `write_scenario` to write it
+        """
+        log().debug("Generating variant scenario")
+        self._init_random_seed()
+        self._init_sampler()
+        with stage(STAGE_GENERATION, self.sampler.index):
+            self._set_scenario(copy.deepcopy(base.scenario))
+            self._set_scenario_location(get_scenario_directory(self.options, self.scenario_number))
+            self._resample(base, fields)
+
+    def _resample(self, base: "Generator", fields: list[str]) -> None:
+        """Samples dynamic fields of `base` matching patterns in `fields` anew; all other values are kept from `base`"""
+        keys = [key for key in base.sampler.values if any(fnmatchcase(key, pattern) for pattern in fields)]
+        if not keys:
+            log_and_raise_critical(ERR_NO_FIELD_MATCHED.format(fields, list(base.sampler.values)))
+        structural = [key for key in keys if key.startswith("create" + KEY_SEPARATOR)]
+        if structural:
+            log_and_raise_critical(ERR_STRUCTURAL_FIELD.format(structural))
+        self.base_index, self.varied_fields = base.sampler.index, fields
+        self.sampler.values.update(base.sampler.values)
+        self.sampler.specifications.update(base.sampler.specifications)
+        self.sampler.aliases.update(base.sampler.aliases)
+        path_to_append = get_series_path_prefix(self.options, Path(self.config["base_template"]))
+        series_paths = []
+        for key in keys:
+            specification = base.sampler.specifications[key]
+            value = get_value_from_field(
+                specification, self.options, sampler=self.sampler, key=key, template_dir=self.template_dir
+            )
+            if is_series_path(key, value):
+                value = str(Path(path_to_append, value))
+                series_paths.append(value)
+            set_value_at(self.scenario, key, value)
+        validate_series(series_paths, self.options["scenario_path"].parent, self.config["defaults"].get("series_rows"))
+
+    def regenerate(self, manifest: dict, scenario_dir: Path) -> None:
+        """
+        Regenerates the exact scenario described by given compact `manifest` in `scenario_dir`;
+        raises Exception if any template changed or drawn values differ from those in the `manifest`
+        """
+        log().debug("Regenerating scenario '%s'", manifest[KEY_SCENARIO_NAME])
+        hashes, stored_hashes = self._get_template_hashes(), manifest[KEY_TEMPLATES]
+        all_paths = hashes.keys() | stored_hashes.keys()
+        changed = sorted(path for path in all_paths if hashes.get(path) != stored_hashes.get(path))
+        if changed:
+            log_and_raise_critical(ERR_TEMPLATES_CHANGED.format(manifest[KEY_SCENARIO_NAME], changed))
+        self.scenario_number = manifest[KEY_SCENARIO_NUMBER]
+        self.options["random_seed"] = manifest[KEY_SEED]
+        self.options[CreateOptions.NUMBER] = manifest[KEY_DESIGN_SIZE]
+        self.options[CreateOptions.DIRECTORY] = Path(scenario_dir, manifest[KEY_DIRECTORY]).resolve()
+        self.sampler = self._create_sampler(manifest[KEY_SEED], manifest[KEY_INDEX])
+        if manifest.get(KEY_BASE_INDEX) is None:
+            self._generate(scenario_dir)
+        else:
+            trace_file = {"total_count": self.scenario_number, KEY_VARIANT_BASE: manifest[KEY_BASE_INDEX]}
+            base = Generator(dict(self.options), trace_file)
+            base.generate_base(scenario_dir)
+            self._set_scenario(copy.deepcopy(base.scenario))
+            self._set_scenario_location(scenario_dir)
+            self._resample(base, manifest[KEY_FIELDS])
+            write_yaml(self.scenario, self.options["scenario_path"])
+        if self.sampler.values != manifest[KEY_VALUES]:
+            log_and_raise_critical(ERR_VALUES_DIFFER.format(manifest[KEY_SCENARIO_NAME]))
 
+    def get_manifest(self) -> dict:
+        """Returns compact manifest from which the last generated scenario can be regenerated exactly"""
+        design = self.sampler.design
+        return {
+            KEY_SCENARIO_NAME: self.options["scenario_name"],
+            KEY_SCENARIO_NUMBER: self.scenario_number,
+            KEY_INDEX: self.sampler.index,
+            KEY_SEED: self.options["random_seed"],
+            KEY_DESIGN_SIZE: design.size if design else None,
+            KEY_DIRECTORY: os.path.relpath(self.options[CreateOptions.DIRECTORY], self.options["scenario_path"].parent),
+            KEY_TEMPLATES: self._get_template_hashes(),
+            KEY_VALUES: dict(self.sampler.values),
+            **({KEY_BASE_INDEX: self.base_index, KEY_FIELDS: self.varied_fields} if self.varied_fields else {}),
+        }
+
+    def _get_template_hashes(self) -> dict[str, str]:
+        """Returns content hashes of GeneratorConfig and all templates referenced therein by their path"""
+        config_path = Path(self.options[CreateOptions.CONFIG])
+        paths = [config_path.name, self.config["base_template"]]
+        paths.extend(agent["type_template"] for agent in self.config.get("create", []))
+        return {str(path): get_file_hash(Path(config_path.parent, path)) for path in dict.fromkeys(paths)}
+
+    def _generate(self, scenario_dir: Path) -> None:
+        """Generates scenario based on the initialized sampler and writes it to given `scenario_dir`"""
+        self._prepare(scenario_dir)
+        expected_rows = self.config["defaults"].get("series_rows")
+        if self.options.get(CreateOptions.STREAM):
+            self._generate_streamed(expected_rows)
+        else:
+            self._generate_in_memory(expected_rows)
+            write_yaml(self.scenario, self.options["scenario_path"])
+
+    def _prepare(self, scenario_dir: Path) -> None:
+        """Loads base template and sets name and path of the scenario to generate in `scenario_dir`"""
+        self._set_scenario(self._load_template(self.config["base_template"]))
+        self._set_scenario_location(scenario_dir)
+
+    def _set_scenario_location(self, scenario_dir: Path) -> None:
+        """Sets name and path of scenario in given `scenario_dir` based on its `scenario_number`"""
+        self._set_scenario_name(self.config["defaults"]["base_name"] + f"_{self.scenario_number}")
+        ensure_folder_exists(scenario_dir)
+        self._set_scenario_path(Path(scenario_dir, self.options["scenario_name"] + ".yaml"))
+
+    def _generate_in_memory(self, expected_rows: Optional[int]) -> None:
+        """Generates complete scenario in memory"""
         if "create" in self.config:
             raise_if_dynamic_match_missing(self.config["create"])
             self.add_agents()
-            self.add_contracts()
+            with stage(STAGE_ADD_CONTRACTS, self.sampler.index):
+                self.add_contracts()
         else:
             log().debug(DEBUG_NO_CREATE)
 
-        resolve_identifiers(self.scenario, self.options)
-        resolve_ids(self.scenario)
-        update_series_paths(self.scenario, self.options, Path(self.config["base_template"]))
+        with stage(STAGE_RESOLVE_IDENTIFIERS, self.sampler.index):
+            resolve_identifiers(self.scenario, self.options, self.sampler, template_dir=self.template_dir)
+        with stage(STAGE_RESOLVE_IDS, self.sampler.index):
+            resolve_ids(self.scenario)
+        update_series_paths(self.scenario, self.options, Path(self.config["base_template"]), expected_rows)
 
-        self._set_scenario_path(Path(self.options[CreateOptions.DIRECTORY], self.options["scenario_name"] + ".yaml"))
-        write_yaml(self.scenario, self.options["scenario_path"])
+    def _generate_streamed(self, expected_rows: Optional[int]) -> None:
+        """
+        Generates scenario and writes each agent and contract to disk as soon as it is completed; only the base
+        template, placeholder-to-Id maps and the agent attributes read by the estimation are kept in memory.
+        Random draws happen in the same order as in `generate_scenarios`; Ids of all agents are assigned upfront, so
+        that sections may appear in any order in the base template
+        """
+        create = self.config.get("create", [])
+        if create:
+            raise_if_dynamic_match_missing(create)
+        else:
+            log().debug(DEBUG_NO_CREATE)
+        counts = [
+            get_number_of_agents_to_create(agent["count"], self.options, self.sampler, self._count_key(agent))
+            for agent in create
+        ]
+
+        writer = StreamingYamlWriter(self.options["scenario_path"])
+        path_to_append = get_series_path_prefix(self.options, Path(self.config["base_template"]))
+        active_ids = get_all_ids_from(self.scenario)
+        replacement_map: dict[str, int] = {}
+        placeholder_ids = {"Agents": self._get_placeholder_ids(create, counts)}
+        for agent in placeholder_ids["Agents"]:
+            resolve_agent_id(dict(agent), active_ids, replacement_map)
+        series_paths = []
+        for section in list(self.scenario.keys()):
+            if section == "Agents":
+                for index, agent in enumerate(self._iterate_agents(create, counts)):
+                    with stage(STAGE_RESOLVE_IDENTIFIERS, self.sampler.index, allocations=False):
+                        resolve_identifiers(
+                            agent, self.options, self.sampler, join_key(section, index), self.template_dir
+                        )
+                    with stage(STAGE_RESOLVE_IDS, self.sampler.index, allocations=False):
+                        resolve_agent_id(agent, active_ids, replacement_map)
+                    update_agent_series_paths(agent, path_to_append, series_paths)
+                    writer.append(section, agent)
+                    self.estimation_agents.append(reduce_agent(agent))
+            elif section == "Contracts":
+                for index, contract in enumerate(self._iterate_contracts(create, placeholder_ids)):
+                    with stage(STAGE_RESOLVE_IDENTIFIERS, self.sampler.index, allocations=False):
+                        resolve_identifiers(
+                            contract, self.options, self.sampler, join_key(section, index), self.template_dir
+                        )
+                    with stage(STAGE_RESOLVE_IDS, self.sampler.index, allocations=False):
+                        resolve_contract_ids(contract, replacement_map)
+                    writer.append(section, contract)
+            else:
+                content = {section: self.scenario[section]}
+                resolve_identifiers(content, self.options, self.sampler, template_dir=self.template_dir)
+                self.scenario[section] = content[section]
+        writer.close(self.scenario)
+        validate_series(series_paths, self.options["scenario_path"].parent, expected_rows)
+
+    def _get_placeholder_ids(self, create: list[dict], counts: list[int]) -> list[dict]:
+        """Returns unresolved Ids of agents in base template and of `counts` agents to `create` per type template"""
+        ids = [{"Id": agent["Id"]} for agent in self.scenario["Agents"]]
+        for agent, n_to_create in zip(create, counts):
+            ids.extend({"Id": get_agent_id(agent["this_agent"], n, n_to_create)} for n in range(n_to_create))
+        return ids
+
+    def _iterate_agents(self, create: list[dict], counts: list[int]) -> Iterator[dict]:
+        """Yields agents of base template followed by `counts` agents to `create` per type template"""
+        yield from self.scenario["Agents"]
+        position = len(self.scenario["Agents"])
+        for agent, n_to_create in zip(create, counts):
+            agent_type_template = self._load_type_template(agent)["Agent"]
+            for n in range(n_to_create):
+                agent_to_append = copy.deepcopy(agent_type_template)
+                agent_to_append["Id"] = get_agent_id(agent["this_agent"], n, n_to_create)
+                self.sampler.alias(join_key("Agents", position), join_key(self._agent_key(agent), n))
+                position += 1
+                yield agent_to_append
+
+    def _iterate_contracts(self, create: list[dict], placeholder_ids: dict) -> Iterator[dict]:
+        """Yields contracts of base template followed by contracts created for all agents matching `placeholder_ids`"""
+        yield from self.scenario["Contracts"]
+        position = len(self.scenario["Contracts"])
+        for agent in create:
+            type_template = self._load_type_template(agent)
+            if not type_template.get("Contracts"):
+                continue
+            id_map = self._get_id_map(agent, placeholder_ids)
+            for template_index, contract in enumerate(type_template.get("Contracts")):
+                contract = Contract.from_dict(contract)
+                raise_if_static_contract(contract)
+                count = self._count_contracts(contract, id_map)
+                self._alias_contracts(agent, template_index, position, count)
+                position += count
+                yield from self._create_contracts(contract, id_map)
 
     def _init_random_seed(self) -> None:
         """Initializes random seed if not yet saved to `options['random_seed']`"""
         if not self.options.get("random_seed"):
             random_seed = self._get_random_seed()
-            random.seed(random_seed + self.trace_file["total_count"])
             self.options["random_seed"] = self.trace_file["random_seed"] = random_seed
             save_seed_to_trace_file(self.options, random_seed)
 
+    def _init_sampler(self) -> None:
+        """
+        Initializes sampler for this scenario with its own random stream derived from campaign seed and scenario index
+        and the optional design of section `sampling`
+        """
+        index = self.trace_file.get("generated_count", self.trace_file["total_count"])
+        self.sampler = self._create_sampler(self.options["random_seed"], index)
+        self.options["scenario_index"] = index
+        self.trace_file["generated_count"] = index + 1
+        save_generated_count_to_trace_file(self.options, index + 1)
+
+    def _create_sampler(self, seed: int, index: int) -> Sampler:
+        """Returns sampler for scenario `index` of campaign with `seed` using the design of section `sampling`"""
+        default_size = self.options.get(CreateOptions.NUMBER) or 1
+        settings = self.config.get("sampling") or {}
+        fields = []
+        if str(settings.get(KEY_METHOD, "")).lower() == METHOD_SOBOL:
+            fields = self._get_design_fields(settings.get(KEY_DIMENSIONS, DEFAULT_SOBOL_DIMENSIONS))
+        return Sampler(seed, index, get_design(settings, seed, default_size, fields))
+
+    def _get_design_fields(self, limit: int) -> list[str]:
+        """
+        Returns stable paths of up to `limit` fields drawn from numeric ranges in a canonical order independent of the
+        drawn agent counts: fields of the base template, counts of agents to create, then fields of the n-th agent
+        created per entry in `create` for increasing n - cached per modification time of all templates
+        """
+        paths = [self.options[CreateOptions.CONFIG], self.config["base_template"]]
+        paths.extend(agent["type_template"] for agent in self.config.get("create", []))
+        full_paths = [os.path.normpath(Path(self.options[CreateOptions.CONFIG].parent, path)) for path in paths]
+        return list(_collect_design_fields(limit, tuple((path, os.stat(path).st_mtime_ns) for path in full_paths)))
+
     def _get_random_seed(self) -> int:
-        """Returns random seed as integer, defined optionally in `defaults['seed']` or from system time in ns instead"""
+        """
+        Returns random seed as integer, defined optionally in `defaults['seed']`, else the seed of a previous run stored
+        in the `trace_file` (to resume a campaign), or from system time in ns instead
+        """
         defaults = self.config["defaults"]
         if defaults.get("seed"):
             random_seed = defaults["seed"]
+        elif self.trace_file.get("seed"):
+            random_seed = self.trace_file["seed"]
         else:
             random_seed = time.time_ns()
         return random_seed
@@ -83,14 +457,17 @@ class Generator:
     def add_agents(self) -> None:
         """Adds agents to create to `scenario`"""
         for agent in self.config["create"]:
-            type_template = load_yaml(Path(self.options[CreateOptions.CONFIG].parent, agent["type_template"]))
-            agent_type_template = type_template["Agent"]
-            n_to_create = get_number_of_agents_to_create(agent["count"], self.options)
+            agent_type_template = self._load_type_template(agent)["Agent"]
+            n_to_create = get_number_of_agents_to_create(
+                agent["count"], self.options, self.sampler, self._count_key(agent)
+            )
             agent_name = agent["this_agent"]
 
             for n in range(n_to_create):
                 agent_to_append = copy.deepcopy(agent_type_template)
                 agent_to_append["Id"] = get_agent_id(agent_name, n, n_to_create)
+                position = len(self.scenario["Agents"])
+                self.sampler.alias(join_key("Agents", position), join_key(self._agent_key(agent), n))
                 self.scenario["Agents"].append(agent_to_append)
 
     def add_contracts(self) -> None:
@@ -99,23 +476,64 @@ class Generator:
         Note: Ensure that all dynamic agents are already added to the scenario
         """
         for agent in self.config["create"]:
-            type_template = load_yaml(Path(self.options[CreateOptions.CONFIG].parent, agent["type_template"]))
+            type_template = self._load_type_template(agent)
             if not type_template.get("Contracts"):
                 continue
-            id_map = {KEY_THIS_AGENT: get_matching_ids_from(self.scenario, ensure_is_list(agent["this_agent"]))}
-            for id_key, id_values in agent.get("external_ids", {}).items():
-                matched_ids = get_matching_ids_from(self.scenario, ensure_is_list(id_values))
-                id_map[REPLACEMENT_IDENTIFIER + id_key] = matched_ids
-            for contract in type_template.get("Contracts"):
+            id_map = self._get_id_map(agent, self.scenario)
+            for template_index, contract in enumerate(type_template.get("Contracts")):
                 contract = Contract.from_dict(contract)
                 raise_if_static_contract(contract)
-                contracts_to_append = self._create_contracts(contract, id_map)
+                contracts_to_append = list(self._create_contracts(contract, id_map))
+                self._alias_contracts(agent, template_index, len(self.scenario["Contracts"]), len(contracts_to_append))
                 self.scenario["Contracts"].extend(contracts_to_append)
 
+    def _alias_contracts(self, agent: dict, template_index: int, position: int, count: int) -> None:
+        """Records stable paths of `count` contracts created from contract `template_index` of `agent` at `position`"""
+        field = join_key(join_key(self._agent_key(agent), "Contracts"), template_index)
+        for number in range(count):
+            self.sampler.alias(join_key("Contracts", position + number), join_key(field, number))
+
+    @staticmethod
+    def _agent_key(agent: dict) -> str:
+        """Returns stable path of given `agent` to create, under which its created agents are identified by number"""
+        return join_key("create", agent["this_agent"])
+
+    @classmethod
+    def _count_key(cls, agent: dict) -> str:
+        """Returns key under which the number of created agents is recorded for given `agent` to create"""
+        return join_key(cls._agent_key(agent), "count")
+
+    def _load_type_template(self, agent: dict) -> dict:
+        """Returns type template of given `agent` to create"""
+        return self._load_template(agent["type_template"])
+
+    def _load_template(self, path: str) -> dict:
+        """
+        Returns copy of template at `path` relative to GeneratorConfig - each template file is parsed only once per
+        modification time, shared by all generators
+        """
+        full_path = os.path.normpath(Path(self.options[CreateOptions.CONFIG].parent, path))
+        return copy.deepcopy(_read_template(full_path, os.stat(full_path).st_mtime_ns))
+
     @staticmethod
-    def _create_contracts(contract: Contract, id_map: dict) -> list[dict]:
-        """Returns list of dynamically created `contracts` based on template `contract` and `id_map`"""
-        created_contracts = []
+    def _get_id_map(agent: dict, scenario: dict) -> dict:
+        """Returns map of replacement identifiers of `agent` to create to the matching agent Ids in `scenario`"""
+        id_map = {KEY_THIS_AGENT: get_matching_ids_from(scenario, ensure_is_list(agent["this_agent"]))}
+        for id_key, id_values in agent.get("external_ids", {}).items():
+            matched_ids = get_matching_ids_from(scenario, ensure_is_list(id_values))
+            id_map[REPLACEMENT_IDENTIFIER + id_key] = matched_ids
+        return id_map
+
+    @staticmethod
+    def _count_contracts(contract: Contract, id_map: dict) -> int:
+        """Returns number of contracts created from template `contract` by `_create_contracts` for given `id_map`"""
+        sender_default = str(contract.sender_id)
+        receiver_default = str(contract.receiver_id)
+        return len(id_map.get(sender_default, [sender_default])) * len(id_map.get(receiver_default, [receiver_default]))
+
+    @staticmethod
+    def _create_contracts(contract: Contract, id_map: dict) -> Iterator[dict]:
+        """Yields dynamically created `contracts` one by one based on template `contract` and `id_map`"""
         sender_default = str(contract.sender_id)
         receiver_default = str(contract.receiver_id)
         for sender_override in id_map.get(sender_default, [sender_default]):
@@ -127,5 +545,31 @@ class Generator:
                 if REPLACEMENT_IDENTIFIER in receiver_default:
                     # noinspection PyProtectedMember
                     contract_to_append[Contract._KEY_RECEIVER] = receiver_override
-                created_contracts.append(contract_to_append)
-        return created_contracts
+                yield contract_to_append
+
+
+@lru_cache(maxsize=MAX_CACHED_TEMPLATES)
+def _read_template(path: str, _modified: int) -> dict:
+    """Returns template at `path` parsed from disk - must not be modified"""
+    return load_yaml(Path(path))
+
+
+@lru_cache(maxsize=MAX_CACHED_DESIGN_FIELDS)
+def _collect_design_fields(limit: int, files: tuple[tuple[str, int], ...]) -> tuple[str, ...]:
+    """
+    Returns up to `limit` design fields as described in `Generator._get_design_fields` for given `files` with their
+    modification time: the GeneratorConfig, its base template and the type template of each entry in `create`
+    """
+    (config_path, _), (base_path, base_modified), *type_templates = files
+    create = load_yaml(Path(config_path)).get("create", [])
+    fields = get_numeric_range_fields(_read_template(base_path, base_modified))
+    fields += [Generator._count_key(agent) for agent in create if is_numeric_range(agent["count"])]
+    maxima = [get_maximum_number_of_agents(agent["count"]) for agent in create]
+    templates = [_read_template(path, modified)["Agent"] for path, modified in type_templates]
+    for n in range(max(maxima, default=0)):
+        if len(fields) >= limit:
+            break
+        for agent, maximum, template in zip(create, maxima, templates):
+            if n < maximum:
+                fields += get_numeric_range_fields(template, join_key(Generator._agent_key(agent), n))
+    return tuple(fields[:limit])
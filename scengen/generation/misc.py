@@ -1,8 +1,11 @@
 import os
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Union
 
+MAX_CACHED_LISTINGS = 1024
+
 
 def get_matching_ids_from(scenario: dict, ids_to_look_for: list[Union[str, int]]) -> list:
     """Returns resolved ids of matching `ids_to_look_for` from created agents in `scenario` and static integer ids"""
@@ -11,7 +14,7 @@ def get_matching_ids_from(scenario: dict, ids_to_look_for: list[Union[str, int]]
         if isinstance(id_pattern, int):
             resolved_ids.append(id_pattern)
         else:
-            pattern = re.compile(rf'//{id_pattern}\d*')
+            pattern = re.compile(rf"//{id_pattern}\d*")
             resolved_ids.extend([agent["Id"] for agent in scenario["Agents"] if pattern.match(str(agent["Id"]))])
     return resolved_ids
 
@@ -45,11 +48,19 @@ def cast_numeric_strings(values: list[str]) -> list[Union[int, float, str]]:
 
 
 def get_relative_paths_in_dir(path_to_dir: Path, relative_path: str) -> list[str]:
-    """Returns files in `path_to_dir` with suffix of `relative_path`"""
-    files_in_dir = [
-        str(Path(relative_path, f)) for f in os.listdir(path_to_dir) if os.path.isfile(os.path.join(path_to_dir, f))
-    ]
-    return files_in_dir
+    """
+    Returns files in `path_to_dir` with suffix of `relative_path` sorted by name;
+    directories are listed only once per modification time
+    """
+    path = os.path.normpath(path_to_dir)
+    return [str(Path(relative_path, name)) for name in _list_files(path, os.stat(path).st_mtime_ns)]
+
+
+@lru_cache(maxsize=MAX_CACHED_LISTINGS)
+def _list_files(path: str, _modified: int) -> tuple[str, ...]:
+    """Returns names of files in directory at `path` sorted by name"""
+    with os.scandir(path) as entries:
+        return tuple(sorted(entry.name for entry in entries if entry.is_file()))
 
 
 def extract_numbers_from_string(input_value: str, identifier: str) -> str:
@@ -0,0 +1,178 @@
+import hashlib
+import math
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from scengen.logs import log, log_and_raise_critical
+
+try:
+    from scipy.stats import qmc
+except ImportError:
+    qmc = None
+
+KEY_SEPARATOR = "/"
+KEY_METHOD = "method"
+KEY_SIZE = "size"
+KEY_DIMENSIONS = "dimensions"
+METHOD_RANDOM = "random"
+METHOD_LATIN_HYPERCUBE = "lhs"
+METHOD_SOBOL = "sobol"
+DEFAULT_SOBOL_DIMENSIONS = 64
+
+ERR_UNKNOWN_METHOD = "Unknown sampling method '{}'. Please use one of: {}"
+ERR_NO_SCIPY = f"Sampling method '{METHOD_SOBOL}' requires package `scipy`. Please install it or use another method."
+ERR_INVALID_SIZE = "Sampling design size must be a positive integer but was '{}'."
+WARN_FIELD_NOT_COVERED = (
+    "Dynamic numeric field '{}' is not among the first {} fields covered by the Sobol design "
+    "and is drawn independently. Increase `sampling: dimensions` to include more fields."
+)
+
+
+class Design(ABC):
+    """Space-filling design assigning each scenario index a point in the unit hypercube with one dimension per field"""
+
+    def __init__(self, size: int, seed: int):
+        if not isinstance(size, int) or size < 1:
+            log_and_raise_critical(ERR_INVALID_SIZE.format(size))
+        self.size = size
+        self.seed = seed
+
+    @abstractmethod
+    def unit_value(self, index: int, field: str) -> Optional[float]:
+        """Returns coordinate in [0, 1) of design point for scenario `index` in dimension of `field` or None if none"""
+
+
+class LatinHypercube(Design):
+    """Latin hypercube over consecutive blocks of `size` scenarios, each field's dimension stratified independently"""
+
+    def unit_value(self, index: int, field: str) -> float:
+        block, position = divmod(index, self.size)
+        strata, jitter = _latin_hypercube_column(self.seed, self.size, block, field)
+        return float((strata[position] + jitter[position]) / self.size)
+
+
+class Sobol(Design):
+    """
+    Scrambled Sobol sequence over all scenarios with a fixed number of `dimensions`, assigned to given `fields` in order
+    """
+
+    def __init__(self, size: int, seed: int, dimensions: int = DEFAULT_SOBOL_DIMENSIONS, fields: Sequence[str] = ()):
+        if qmc is None:
+            log_and_raise_critical(ERR_NO_SCIPY)
+        super().__init__(size, seed)
+        self.dimensions = dimensions
+        self.fields = {field: dimension for dimension, field in enumerate(list(fields)[:dimensions])}
+        self._warned: set[str] = set()
+
+    def unit_value(self, index: int, field: str) -> Optional[float]:
+        dimension = self.fields.get(field)
+        if dimension is None:
+            if field not in self._warned:
+                log().warning(WARN_FIELD_NOT_COVERED.format(field, self.dimensions))
+                self._warned.add(field)
+            return None
+        block, position = divmod(index, self.size)
+        return float(_sobol_block(self.seed, self.dimensions, self.size, block)[position, dimension])
+
+
+@lru_cache(maxsize=1024)
+def _latin_hypercube_column(seed: int, size: int, block: int, field: str) -> tuple[np.ndarray, np.ndarray]:
+    """Returns random permutation of strata and jitter within strata for the dimension of `field` in a design `block`"""
+    field_entropy = int.from_bytes(hashlib.sha256(field.encode("utf-8")).digest()[:8], "little")
+    rng = np.random.default_rng([seed, block, field_entropy])
+    return rng.permutation(size), rng.random(size)
+
+
+@lru_cache(maxsize=16)
+def _sobol_block(seed: int, dimensions: int, size: int, block: int) -> np.ndarray:
+    """Returns `size` consecutive points of scrambled Sobol sequence starting at point `block` * `size`"""
+    sequence = qmc.Sobol(d=dimensions, scramble=True, seed=seed)
+    if block > 0:
+        sequence.fast_forward(block * size)
+    return sequence.random(size)
+
+
+def get_design(settings: Optional[dict], seed: int, default_size: int, fields: Sequence[str] = ()) -> Optional[Design]:
+    """
+    Returns design specified in `sampling` section `settings` of GeneratorConfig, or None for random sampling;
+    a Sobol design covers the given dynamic numeric `fields` in order
+    """
+    settings = settings or {}
+    method = settings.get(KEY_METHOD, METHOD_RANDOM).lower()
+    size = settings.get(KEY_SIZE, default_size)
+    if method == METHOD_RANDOM:
+        return None
+    elif method == METHOD_LATIN_HYPERCUBE:
+        return LatinHypercube(size, seed)
+    elif method == METHOD_SOBOL:
+        return Sobol(size, seed, settings.get(KEY_DIMENSIONS, DEFAULT_SOBOL_DIMENSIONS), fields)
+    log_and_raise_critical(ERR_UNKNOWN_METHOD.format(method, [METHOD_RANDOM, METHOD_LATIN_HYPERCUBE, METHOD_SOBOL]))
+
+
+class Sampler:
+    """
+    Draws values for dynamic fields of the scenario with given `index` from an independent random stream derived from
+    the campaign `seed` and the `index` - values are thus independent of the order in which scenarios are generated.
+    Numeric ranges follow the given `design` (if any) with one dimension per field - identified by its path stable
+    across scenarios, see `get_field`; all other draws are taken from the random stream
+    """
+
+    def __init__(self, seed: Optional[int] = None, index: int = 0, design: Optional[Design] = None):
+        self.rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+        self.design = design
+        self.index = index
+        self.values: dict[str, Any] = {}
+        self.specifications: dict[str, str] = {}
+        self.aliases: dict[str, str] = {}
+
+    def record(self, key: str, specification: str, value: Any) -> None:
+        """Records `value` drawn for field `key` based on given `specification`"""
+        self.values[key] = value
+        self.specifications[key] = specification
+
+    def alias(self, prefix: str, field: str) -> None:
+        """Records that draws below path `prefix` (e.g. 'Agents/5') belong to stable `field` (e.g. 'create/PV/2')"""
+        self.aliases[prefix] = field
+
+    def get_field(self, key: str) -> str:
+        """
+        Returns path of field at path `key` stable across scenarios: created agents and contracts are identified by
+        their `create` entry and number instead of their position in the scenario, which depends on the agent counts
+        """
+        section, _, rest = key.partition(KEY_SEPARATOR)
+        position, _, rest = rest.partition(KEY_SEPARATOR)
+        field = self.aliases.get(f"{section}{KEY_SEPARATOR}{position}")
+        if field is None:
+            return key
+        return f"{field}{KEY_SEPARATOR}{rest}" if rest else field
+
+    def numeric_values(self) -> dict[str, float]:
+        """Returns all recorded values that are numeric by their stable field path"""
+        return {self.get_field(key): value for key, value in self.values.items() if isinstance(value, (int, float))}
+
+    def _unit_value(self, key: Optional[str]) -> Optional[float]:
+        """Returns design coordinate for field at path `key` or None if no design applies"""
+        if self.design is None or key is None:
+            return None
+        return self.design.unit_value(self.index, self.get_field(key))
+
+    def randint(self, minimum: int, maximum: int, key: Optional[str] = None) -> int:
+        """Returns integer in [`minimum`, `maximum`] for field at path `key`"""
+        unit_value = self._unit_value(key)
+        if unit_value is None:
+            return int(self.rng.integers(minimum, maximum, endpoint=True))
+        return min(minimum + math.floor(unit_value * (maximum - minimum + 1)), maximum)
+
+    def uniform(self, minimum: float, maximum: float, key: Optional[str] = None) -> float:
+        """Returns float in [`minimum`, `maximum`] for field at path `key`"""
+        unit_value = self._unit_value(key)
+        if unit_value is None:
+            return float(self.rng.uniform(minimum, maximum))
+        return minimum + unit_value * (maximum - minimum)
+
+    def choice(self, options: Sequence[Any]) -> Any:
+        """Returns one randomly chosen element of `options`"""
+        return options[int(self.rng.integers(len(options)))]
@@ -2,7 +2,9 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 import logging as pylog
+import multiprocessing
 from enum import Enum
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import NoReturn, Optional
 
@@ -21,6 +23,8 @@ class LogLevel(Enum):
 
 _loggers: list[pylog.Logger] = []
 _handlers: list[pylog.Handler] = []
+_listeners: list[QueueListener] = []
+_queues: list[multiprocessing.Queue] = []
 
 _FORMAT_NORMAL = "%(asctime)s — %(levelname)s — %(message)s"  # noqa
 _FORMAT_DETAILLED = "%(asctime)s.%(msecs)03d — %(levelname)s — %(module)s:%(funcName)s:%(lineno)d — %(message)s"  # noqa
@@ -53,21 +57,27 @@ def log_error_and_raise(exception: Exception) -> NoReturn:
     raise exception
 
 
-def scengen_logger(log_level_name: str, file_name: Optional[Path] = None) -> None:
+def scengen_logger(log_level_name: str, file_name: Optional[Path] = None, use_queue: bool = False) -> None:
     """
     Ensures a logger for scengen is present and uses the specified options
 
     Args:
         log_level_name: one of Python's official logging level names, e.g. "INFO"
         file_name: if present, logs are also written to the specified file path
+        use_queue: if True, records are only put to a queue and written by a background listener thread;
+            worker processes can forward their records to this queue using `worker_logger(get_log_queue(), ...)`
     """
     log_level = LogLevel[log_level_name.upper()]
     logger = _get_logger(log_level)
+    _stop_listener()
 
     formatter = _get_formatter(log_level)
-    _add_handler(logger, pylog.StreamHandler(), formatter)
-    if file_name:
-        _add_handler(logger, pylog.FileHandler(file_name, mode="w"), formatter)
+    if use_queue:
+        _add_handler(logger, QueueHandler(_start_listener(formatter, file_name)), None)
+    else:
+        _add_handler(logger, pylog.StreamHandler(), formatter)
+        if file_name:
+            _add_handler(logger, pylog.FileHandler(file_name, mode="w"), formatter)
 
     if _loggers:
         pylog.info(_INFO_UPDATING_LOG_LEVEL.format(log_level_name))
@@ -76,6 +86,57 @@ def scengen_logger(log_level_name: str, file_name: Optional[Path] = None) -> Non
         _loggers.append(logger)
 
 
+def worker_logger(queue: multiprocessing.Queue, log_level_name: str) -> None:
+    """
+    Sets up scengen logger in a worker process to forward all records to the given `queue` of the main process
+
+    Args:
+        queue: as returned by `get_log_queue()` in the main process
+        log_level_name: one of Python's official logging level names, e.g. "INFO"
+    """
+    logger = _get_logger(LogLevel[log_level_name.upper()])
+    _add_handler(logger, QueueHandler(queue), None)
+    if _loggers:
+        _loggers[0] = logger
+    else:
+        _loggers.append(logger)
+
+
+def get_log_queue() -> Optional[multiprocessing.Queue]:
+    """Returns queue of the scengen logger if set up with `use_queue`, else None"""
+    return _queues[0] if _queues else None
+
+
+def shutdown_logger() -> None:
+    """Stops background listener (if any) after all queued records are written"""
+    _stop_listener()
+
+
+def _start_listener(formatter: pylog.Formatter, file_name: Optional[Path]) -> multiprocessing.Queue:
+    """Returns new queue whose records are written in a background thread to stream and (optionally) `file_name`"""
+    handlers = [pylog.StreamHandler()]
+    if file_name:
+        handlers.append(pylog.FileHandler(file_name, mode="w"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    queue = multiprocessing.Queue()
+    listener = QueueListener(queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _queues.append(queue)
+    _listeners.append(listener)
+    return queue
+
+
+def _stop_listener() -> None:
+    """Stops and removes the active queue listener after writing all pending records"""
+    for listener in _listeners:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+    _listeners.clear()
+    _queues.clear()
+
+
 def _get_logger(level: LogLevel) -> pylog.Logger:
     """
     Returns scengen logger with given log level without any handler and, not propagating to parent
@@ -106,8 +167,9 @@ def _get_formatter(level: LogLevel) -> pylog.Formatter:
     return pylog.Formatter(_FORMAT_DETAILLED if level is LogLevel.DEBUG else _FORMAT_NORMAL, _TIME_FORMAT)
 
 
-def _add_handler(logger: pylog.Logger, handler: pylog.Handler, formatter: pylog.Formatter) -> None:
-    """Adds given `handler` using the specified `formatter` to given `logger` and `_handlers` list"""
-    handler.setFormatter(formatter)
+def _add_handler(logger: pylog.Logger, handler: pylog.Handler, formatter: Optional[pylog.Formatter]) -> None:
+    """Adds given `handler` using the specified `formatter` (if any) to given `logger` and `_handlers` list"""
+    if formatter:
+        handler.setFormatter(formatter)
     _handlers.append(handler)
     logger.addHandler(handler)
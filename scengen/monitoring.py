@@ -0,0 +1,244 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center <amiris@dlr.de>
+#
+# SPDX-License-Identifier: Apache-2.0
+import json
+import os
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Optional
+
+from scengen.cli import CreateOptions
+from scengen.evaluator import Evaluation
+from scengen.logs import log
+from scengen.profiling import StageDurations, enable_timing, disable_timing
+
+NAME_STATUS = "status.json"
+STATUS_INTERVAL_IN_S = 10.0
+METRICS_HOST = "127.0.0.1"
+METRICS_PATHS = ("/", "/metrics")
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REASON_GENERATION = "generation"
+REASON_ESTIMATION = "estimation"
+REASON_SCREENING = "screening"
+REASON_FAILURE = "failure"
+REASON_SURPLUS = "surplus"
+
+INFO_METRICS = "Serving metrics in Prometheus text format at 'http://{}:{}/metrics'"
+WARN_STATUS_FILE = "Could not write status file '{}': {}"
+
+_METRICS = [
+    ("scengen_target_scenarios", "gauge", "Number of scenarios requested", "target"),
+    ("scengen_accepted_scenarios_total", "counter", "Number of accepted scenarios", "accepted"),
+    ("scengen_rejected_scenarios_total", "counter", "Number of rejected scenarios", "rejected"),
+    ("scengen_scenarios_in_flight", "gauge", "Number of scenarios being simulated or evaluated", "in_flight"),
+    ("scengen_accepted_scenarios_per_hour", "gauge", "Accepted scenarios per hour since start", "accepted_per_hour"),
+    ("scengen_rejected_scenarios_per_hour", "gauge", "Rejected scenarios per hour since start", "rejected_per_hour"),
+    ("scengen_eta_seconds", "gauge", "Estimated seconds until all scenarios are accepted", "eta_in_s"),
+]
+
+
+class Progress:
+    """Live state of creating `target` scenarios in `directory`: accepted, rejected (per reason), and in-flight ones"""
+
+    def __init__(self, directory: Path, target: int):
+        self.directory = directory
+        self.target = target
+        self.accepted = 0
+        self.rejected = 0
+        self.rejections: dict[str, int] = {}
+        self.in_flight = 0
+        self.started = time.time()
+
+    def reject(self, reasons: list[str]) -> None:
+        """Counts one rejected scenario and each of its rejection `reasons`"""
+        self.rejected += 1
+        for reason in reasons:
+            self.rejections[reason] = self.rejections.get(reason, 0) + 1
+
+    def get_status(self) -> dict:
+        """Returns current state including throughput per hour and estimated remaining time since start"""
+        hours = max(time.time() - self.started, 1e-9) / 3600
+        accepted_per_hour = self.accepted / hours
+        remaining = max(self.target - self.accepted, 0)
+        eta_in_s = remaining / accepted_per_hour * 3600 if accepted_per_hour > 0 else None
+        return {
+            "directory": str(self.directory),
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "target": self.target,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "rejections": dict(self.rejections),
+            "in_flight": self.in_flight,
+            "accepted_per_hour": accepted_per_hour,
+            "rejected_per_hour": self.rejected / hours,
+            "eta_in_s": 0.0 if remaining == 0 else eta_in_s,
+        }
+
+
+class Monitor:
+    """
+    Tracks Progress of scenario creation in each of the given `targets` directories, periodically writes it to
+    `status.json` in each directory, and - if a `port` is given - serves it in Prometheus text format on localhost
+    """
+
+    def __init__(self, targets: dict[Path, int], port: Optional[int], durations: StageDurations):
+        self.progresses = {
+            Path(directory).resolve(): Progress(directory, target) for directory, target in targets.items()
+        }
+        self.durations = durations
+        self.lock = Lock()
+        self._stopped = Event()
+        self._writer = Thread(target=self._write_periodically, name="scengen-status", daemon=True)
+        self._server = _create_server(self, port) if port is not None else None
+
+    def start(self) -> None:
+        """Writes initial status files, then updates them and serves metrics (if enabled) in background threads"""
+        self.write_status()
+        self._writer.start()
+        if self._server:
+            Thread(target=self._server.serve_forever, name="scengen-metrics", daemon=True).start()
+            log().info(INFO_METRICS.format(*self._server.server_address[:2]))
+
+    def stop(self) -> None:
+        """Stops background threads and writes final status files"""
+        self._stopped.set()
+        self._writer.join()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        self.write_status()
+
+    def get(self, options: dict) -> Optional[Progress]:
+        """Returns Progress of output directory in `options`, if tracked"""
+        return self.progresses.get(Path(options[CreateOptions.DIRECTORY]).resolve())
+
+    def write_status(self) -> None:
+        """Replaces `status.json` in each tracked directory by the current status"""
+        durations = self.durations.means()
+        for progress in self.progresses.values():
+            with self.lock:
+                status = progress.get_status()
+            status["stage_durations_in_s"] = durations
+            path = Path(progress.directory, NAME_STATUS)
+            temporary_path = path.with_suffix(".tmp")
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                temporary_path.write_text(json.dumps(status, indent=2))
+                os.replace(temporary_path, path)
+            except OSError as error:
+                log().warning(WARN_STATUS_FILE.format(path, repr(error)))
+
+    def render_metrics(self) -> str:
+        """Returns current state of all tracked directories in Prometheus text exposition format"""
+        with self.lock:
+            statuses = [progress.get_status() for progress in self.progresses.values()]
+        lines = []
+        for name, kind, description, key in _METRICS:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            for status in statuses:
+                if status[key] is not None:
+                    lines.append(f"{name}{_labels(directory=status['directory'])} {status[key]}")
+        name = "scengen_rejections_total"
+        lines += [f"# HELP {name} Number of rejections per check or reason", f"# TYPE {name} counter"]
+        for status in statuses:
+            for reason, count in status["rejections"].items():
+                lines.append(f"{name}{_labels(directory=status['directory'], reason=reason)} {count}")
+        name = "scengen_stage_duration_seconds_mean"
+        lines += [f"# HELP {name} Mean duration of one call per stage", f"# TYPE {name} gauge"]
+        for stage_name, seconds in self.durations.means().items():
+            lines.append(f"{name}{_labels(stage=stage_name)} {seconds}")
+        return "\n".join(lines) + "\n"
+
+    def _write_periodically(self) -> None:
+        """Writes status files every STATUS_INTERVAL_IN_S until stopped"""
+        while not self._stopped.wait(STATUS_INTERVAL_IN_S):
+            self.write_status()
+
+
+def _labels(**labels: str) -> str:
+    """Returns given `labels` formatted and escaped for Prometheus"""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _create_server(monitor: Monitor, port: int) -> ThreadingHTTPServer:
+    """Returns HTTP server on localhost at `port` answering GET requests with the metrics of `monitor`"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path not in METRICS_PATHS:
+                self.send_error(404)
+                return
+            body = monitor.render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            log().debug(format, *args)
+
+    server = ThreadingHTTPServer((METRICS_HOST, port), MetricsHandler)
+    server.daemon_threads = True
+    return server
+
+
+_monitor: Optional[Monitor] = None
+
+
+def start_monitoring(targets: dict[Path, int], port: Optional[int] = None) -> None:
+    """Starts tracking creation of scenarios in each directory of `targets` towards its number of scenarios"""
+    global _monitor
+    _monitor = Monitor(targets, port, enable_timing())
+    _monitor.start()
+
+
+def stop_monitoring() -> None:
+    """Stops tracking and writes final status files"""
+    global _monitor
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor = None
+    disable_timing()
+
+
+def record_rejected(options: dict, reason: str, count: int = 1) -> None:
+    """Counts `count` scenarios created with `options` as rejected before simulation for given `reason`"""
+    progress = _monitor.get(options) if _monitor else None
+    if progress:
+        with _monitor.lock:
+            for _ in range(count):
+                progress.reject([reason])
+
+
+def record_started(options: dict) -> None:
+    """Counts scenario created with `options` as in flight"""
+    progress = _monitor.get(options) if _monitor else None
+    if progress:
+        with _monitor.lock:
+            progress.in_flight += 1
+
+
+def record_simulated(options: dict, evaluation: Evaluation, accepted: bool) -> None:
+    """Counts simulated scenario created with `options` as `accepted` or rejected due to its `evaluation`"""
+    progress = _monitor.get(options) if _monitor else None
+    if progress:
+        with _monitor.lock:
+            progress.in_flight -= 1
+            if accepted:
+                progress.accepted += 1
+            elif evaluation.failure:
+                progress.reject([REASON_FAILURE])
+            elif evaluation.passed:
+                progress.reject([REASON_SURPLUS])
+            else:
+                progress.reject(evaluation.failed_checks)
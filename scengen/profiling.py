@@ -0,0 +1,212 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center <amiris@dlr.de>
+#
+# SPDX-License-Identifier: Apache-2.0
+import cProfile
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from threading import Lock
+from typing import ContextManager, Iterator, Optional, Union
+
+from scengen.logs import log
+
+NAME_PROFILES_FOLDER = "profiles"
+SUFFIX_STATS = ".prof"
+SUFFIX_ALLOCATIONS = ".allocations.txt"
+TOP_ALLOCATIONS = 25
+
+STAGE_GENERATION = "generate_scenarios"
+STAGE_RESOLVE_IDENTIFIERS = "resolve_identifiers"
+STAGE_RESOLVE_IDS = "resolve_ids"
+STAGE_ADD_CONTRACTS = "add_contracts"
+STAGE_ESTIMATION = "estimation"
+STAGE_SHORT_RUN = "short_run"
+STAGE_SIMULATION = "simulation"
+STAGE_EVALUATION = "evaluation"
+
+INFO_PROFILING = "Profiling enabled - stats and allocations of each scenario are written to '{}'"
+
+_NOT_PROFILING = nullcontext()
+_EXCLUDE_TRACEMALLOC = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+
+class Profiler:
+    """
+    Collects cProfile stats and tracemalloc allocations per stage and scenario `key` and writes them to `directory`
+    once the outermost stage of a scenario is completed; stats of a stage exclude those of its nested stages, while
+    allocations include them; traces are cleared when entering an outermost stage to keep snapshots small
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._stack: list[cProfile.Profile] = []
+        self._profiles: dict[str, cProfile.Profile] = {}
+        self._allocations: dict[str, dict[str, tuple[int, int]]] = {}
+
+    @contextmanager
+    def stage(self, name: str, key: Union[int, str], allocations: bool = True) -> Iterator[None]:
+        """Profiles code executed within this context as stage `name` of scenario `key`"""
+        if self._stack:
+            self._stack[-1].disable()
+        elif allocations:
+            tracemalloc.clear_traces()
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        self._stack.append(profile)
+        start = tracemalloc.take_snapshot().filter_traces(_EXCLUDE_TRACEMALLOC) if allocations else None
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            if start is not None:
+                self._add_allocations(name, start)
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1].enable()
+            else:
+                self._write(key)
+
+    def _add_allocations(self, name: str, start: tracemalloc.Snapshot) -> None:
+        """Accumulates size and number of memory blocks allocated per code line in stage `name` since `start`"""
+        end = tracemalloc.take_snapshot().filter_traces(_EXCLUDE_TRACEMALLOC)
+        accumulated = self._allocations.setdefault(name, {})
+        for difference in end.compare_to(start, "lineno"):
+            if difference.size_diff > 0:
+                location = str(difference.traceback)
+                size, count = accumulated.get(location, (0, 0))
+                accumulated[location] = (size + difference.size_diff, count + difference.count_diff)
+
+    def _write(self, key: Union[int, str]) -> None:
+        """Writes (or merges with existing) stats and top allocations of all stages collected for scenario `key`"""
+        folder = Path(self.directory, str(key))
+        folder.mkdir(parents=True, exist_ok=True)
+        for name, profile in self._profiles.items():
+            path = Path(folder, name + SUFFIX_STATS)
+            stats = pstats.Stats(profile)
+            if path.exists():
+                stats.add(str(path))
+            stats.dump_stats(path)
+        for name, allocations in self._allocations.items():
+            path = Path(folder, name + SUFFIX_ALLOCATIONS)
+            merged = _read_allocations(path)
+            for location, (size, number) in allocations.items():
+                previous_size, previous_number = merged.get(location, (0, 0))
+                merged[location] = (previous_size + size, previous_number + number)
+            top = sorted(merged.items(), key=lambda item: -item[1][0])[:TOP_ALLOCATIONS]
+            lines = [f"{location}: {size} B in {number} blocks\n" for location, (size, number) in top]
+            with open(path, "w") as file:
+                file.writelines(lines)
+        self._profiles.clear()
+        self._allocations.clear()
+
+
+def _read_allocations(path: Path) -> dict[str, tuple[int, int]]:
+    """Returns size and number of memory blocks per code line from allocations file at `path`, if it exists"""
+    if not path.exists():
+        return {}
+    allocations = {}
+    for line in path.read_text().splitlines():
+        location, _, counts = line.rpartition(": ")
+        size, _, _, number, _ = counts.split(" ")
+        allocations[location] = (int(size), int(number))
+    return allocations
+
+
+class StageDurations:
+    """Accumulates number of calls and total wall-clock duration per stage; safe to read from other threads"""
+
+    def __init__(self):
+        self._counts: dict[str, int] = {}
+        self._totals: dict[str, float] = {}
+        self._lock = Lock()
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """Adds duration of code executed within this context to stage `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float, count: int = 1) -> None:
+        """Adds `count` calls of stage `name` lasting given `seconds` in total"""
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + count
+            self._totals[name] = self._totals.get(name, 0.0) + seconds
+
+    def totals(self) -> dict[str, tuple[int, float]]:
+        """Returns number of calls and total duration in seconds of each stage"""
+        with self._lock:
+            return {name: (count, self._totals[name]) for name, count in self._counts.items()}
+
+    def means(self) -> dict[str, float]:
+        """Returns mean duration in seconds per call of each stage"""
+        with self._lock:
+            return {name: self._totals[name] / count for name, count in self._counts.items()}
+
+
+_profiler: Optional[Profiler] = None
+_durations: Optional[StageDurations] = None
+
+
+def stage(name: str, key: Optional[Union[int, str]], allocations: bool = True) -> ContextManager:
+    """
+    Returns context profiling stage `name` of scenario `key` if profiling is enabled (and `key` is given) and timing
+    it if timing is enabled, else a no-op context; tracemalloc snapshots and timing are skipped if `allocations` is
+    False, i.e. for stages entered per agent or contract, so that mean durations refer to one call per scenario
+    """
+    profiled = _profiler is not None and key is not None
+    timed = _durations is not None and allocations
+    if not profiled:
+        return _durations.time(name) if timed else _NOT_PROFILING
+    if not timed:
+        return _profiler.stage(name, key, allocations)
+    return _timed_stage(name, key, allocations)
+
+
+@contextmanager
+def _timed_stage(name: str, key: Union[int, str], allocations: bool) -> Iterator[None]:
+    """Profiles and times stage `name` of scenario `key`"""
+    with _durations.time(name), _profiler.stage(name, key, allocations):
+        yield
+
+
+def enable_profiling(directory: Path) -> None:
+    """Enables profiling of all stages writing results per scenario to `profiles` folder in `directory`"""
+    global _profiler
+    _profiler = Profiler(Path(directory, NAME_PROFILES_FOLDER))
+    tracemalloc.start()
+    log().info(INFO_PROFILING.format(_profiler.directory))
+
+
+def disable_profiling() -> None:
+    """Disables profiling"""
+    global _profiler
+    _profiler = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def enable_timing() -> StageDurations:
+    """Enables timing of all stages and returns the accumulated durations"""
+    global _durations
+    _durations = StageDurations()
+    return _durations
+
+
+def add_duration(name: str, seconds: float, count: int = 1) -> None:
+    """
+    Adds `count` calls of stage `name` lasting `seconds` in total measured elsewhere, e.g. by a worker process, if
+    timing is on
+    """
+    if _durations is not None:
+        _durations.add(name, seconds, count)
+
+
+def disable_timing() -> None:
+    """Disables timing of stages"""
+    global _durations
+    _durations = None
@@ -0,0 +1,196 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center <amiris@dlr.de>
+#
+# SPDX-License-Identifier: Apache-2.0
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+from fameio.source.loader import load_yaml
+
+from scengen.cli import EvaluateOptions, GeneralOptions
+from scengen.evaluator import (
+    Check,
+    get_checks,
+    get_settings,
+    get_check_key,
+    load_results,
+    find_output_file,
+    KEY_EVALUATION,
+    KEY_CHECKS,
+    OUTPUT_SUFFIXES,
+)
+from scengen.files import read_manifest, SUFFIX_SCENARIO_MANIFEST
+from scengen.logs import log, log_and_raise_critical, worker_logger, get_log_queue
+
+NAME_EVALUATION = "evaluation.csv"
+NAME_EVALUATION_CACHE = "evaluation_cache.json"
+KEY_FINGERPRINT = "fingerprint"
+KEY_OUTCOMES = "outcomes"
+COLUMN_SCENARIO_NUMBER = "scenario_number"
+COLUMN_FOLDER = "folder"
+COLUMN_PASSED = "passed"
+COLUMN_FAILED_CHECKS = "failed_checks"
+REASON_FAILURE = "failure"
+CHUNK_SIZE = 8
+CACHE_WRITE_INTERVAL = 1000
+
+ERR_NO_OUTPUTS = "Found no scenario outputs in '{}' - expected files named {} with one of suffixes {}."
+INFO_START = "Re-evaluating {} of {} scenario output folders on {} workers - all other outcomes are cached"
+INFO_DONE = "Accepted {} of {} scenarios - written to '{}'"
+WARN_FAILED = "Could not evaluate outputs in '{}': {}"
+
+Outcomes = dict[str, tuple[bool, dict[str, float]]]
+
+
+def reevaluate(options: dict) -> None:
+    """
+    Applies evaluation checks of GeneratorConfig `EvaluateOptions.CONFIG` to all scenario outputs found in
+    `EvaluateOptions.DIRECTORY` on a pool of worker processes and writes the outcome of each scenario to
+    `evaluation.csv`; outcomes are cached per output folder and check version with its settings
+    """
+    directory = Path(options[EvaluateOptions.DIRECTORY])
+    config = load_yaml(options[EvaluateOptions.CONFIG])
+    checks = get_checks((config.get(KEY_EVALUATION) or {}).get(KEY_CHECKS))
+    settings = get_settings(config, checks)
+    keys = {check.name: get_check_key(check, settings) for check in checks}
+    folders = find_output_folders(directory, checks)
+
+    previous_cache = load_cache(directory)
+    cache = {}
+    tasks = []
+    for folder in folders:
+        relative = folder.relative_to(directory).as_posix()
+        fingerprint = get_fingerprint(folder, checks)
+        entry = previous_cache.get(relative)
+        if entry is None or entry[KEY_FINGERPRINT] != fingerprint:
+            entry = {KEY_FINGERPRINT: fingerprint, KEY_OUTCOMES: {}}
+        cache[relative] = entry
+        missing = [check.name for check in checks if keys[check.name] not in entry[KEY_OUTCOMES]]
+        if missing:
+            tasks.append((folder, missing))
+
+    failures = {}
+    if tasks:
+        workers = max(min(options[EvaluateOptions.WORKERS] or 1, len(tasks)), 1)
+        log().info(INFO_START.format(len(tasks), len(folders), workers))
+        initializer, initargs = None, ()
+        if options[GeneralOptions.LOG_QUEUE]:
+            initializer, initargs = worker_logger, (get_log_queue(), options[GeneralOptions.LOG])
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+            folders_to_evaluate = [folder for folder, _ in tasks]
+            names = [missing for _, missing in tasks]
+            outcomes = pool.map(evaluate_folder, folders_to_evaluate, names, repeat(settings), chunksize=CHUNK_SIZE)
+            for count, (folder, outcome) in enumerate(zip(folders_to_evaluate, outcomes), start=1):
+                relative = folder.relative_to(directory).as_posix()
+                if isinstance(outcome, str):
+                    log().warning(WARN_FAILED.format(folder, outcome))
+                    failures[relative] = outcome
+                else:
+                    cache[relative][KEY_OUTCOMES].update({keys[name]: result for name, result in outcome.items()})
+                if count % CACHE_WRITE_INTERVAL == 0:
+                    write_cache(directory, cache)
+    write_cache(directory, cache)
+
+    table = get_evaluation_table(directory, cache, [keys[check.name] for check in checks], failures)
+    table.to_csv(Path(directory, NAME_EVALUATION), sep=";", index=False)
+    log().info(INFO_DONE.format(int(table[COLUMN_PASSED].sum()), len(table), Path(directory, NAME_EVALUATION)))
+
+
+def find_output_folders(directory: Path, checks: list[Check]) -> list[Path]:
+    """Returns all folders below `directory` holding the output file required first by the given `checks`"""
+    required = [file_name for check in checks for file_name in check.columns]
+    folders = set()
+    for suffix in OUTPUT_SUFFIXES if required else ():
+        for path in Path(directory).rglob(required[0] + suffix):
+            if not any(part.startswith(".") for part in path.relative_to(directory).parts):
+                folders.add(path.parent)
+    if not folders:
+        log_and_raise_critical(ERR_NO_OUTPUTS.format(directory, required[:1], OUTPUT_SUFFIXES))
+    return sorted(folders)
+
+
+def get_fingerprint(folder: Path, checks: list[Check]) -> str:
+    """Returns fingerprint of the output files in `folder` required by `checks` from their names, sizes and mtimes"""
+    parts = []
+    for file_name in sorted({file_name for check in checks for file_name in check.columns}):
+        try:
+            stat = os.stat(find_output_file(folder, file_name))
+            parts.append(f"{file_name}:{stat.st_size}:{stat.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{file_name}:missing")
+    return "|".join(parts)
+
+
+def evaluate_folder(folder: Path, names: list[str], settings: dict) -> Union[Outcomes, str]:
+    """
+    Returns outcome of each check in `names` applied to the outputs in `folder` with given `settings` - all checks
+    are evaluated; returns the error as string if the outputs cannot be evaluated
+    """
+    try:
+        checks = get_checks(names)
+        results = load_results(folder, checks)
+        outcomes = {}
+        for check in checks:
+            metrics = {}
+            passed = bool(check.function(results, settings, metrics))
+            outcomes[check.name] = (passed, {key: _to_builtin(value) for key, value in metrics.items()})
+        return outcomes
+    except Exception as error:
+        return repr(error)
+
+
+def _to_builtin(value):
+    """Returns given metric `value` as builtin Python type, if it is a numpy scalar"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def load_cache(directory: Path) -> dict:
+    """Returns cached outcomes of previous evaluations in `directory`, or an empty dict if there are none"""
+    path = Path(directory, NAME_EVALUATION_CACHE)
+    if not path.exists():
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def write_cache(directory: Path, cache: dict) -> None:
+    """Replaces cache of outcomes in `directory` by given `cache`"""
+    path = Path(directory, NAME_EVALUATION_CACHE)
+    temporary_path = path.with_suffix(".tmp")
+    with open(temporary_path, "w") as file:
+        json.dump(cache, file)
+    os.replace(temporary_path, path)
+
+
+def get_evaluation_table(directory: Path, cache: dict, keys: list[str], failures: dict[str, str]) -> pd.DataFrame:
+    """Returns one row per cached folder with its scenario number, overall outcome, failed checks, and metrics"""
+    numbers = get_scenario_numbers(directory)
+    rows = []
+    for relative, entry in cache.items():
+        row = {COLUMN_SCENARIO_NUMBER: numbers.get(relative), COLUMN_FOLDER: relative}
+        if relative in failures:
+            row.update({COLUMN_PASSED: False, COLUMN_FAILED_CHECKS: f"{REASON_FAILURE}: {failures[relative]}"})
+        else:
+            outcomes = [entry[KEY_OUTCOMES][key] for key in keys]
+            failed = [key.split("@")[0] for key, (passed, _) in zip(keys, outcomes) if not passed]
+            row.update({COLUMN_PASSED: not failed, COLUMN_FAILED_CHECKS: ",".join(failed)})
+            for _, metrics in outcomes:
+                row.update(metrics)
+        rows.append(row)
+    table = pd.DataFrame(rows)
+    table[COLUMN_SCENARIO_NUMBER] = table[COLUMN_SCENARIO_NUMBER].astype("Int64")
+    return table
+
+
+def get_scenario_numbers(directory: Path) -> dict[str, int]:
+    """Returns scenario numbers from the manifest in `directory` by path of their output folder relative to it"""
+    numbers = {}
+    for number, scenario_path in read_manifest(directory).items():
+        name = scenario_path.name.removesuffix(SUFFIX_SCENARIO_MANIFEST).removesuffix(".yaml")
+        numbers[Path(scenario_path.parent, name).relative_to(directory).as_posix()] = number
+    return numbers
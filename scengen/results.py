@@ -0,0 +1,91 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center <amiris@dlr.de>
+#
+# SPDX-License-Identifier: Apache-2.0
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+from fameio.source.loader import load_yaml
+
+from scengen.files import ensure_folder_exists, write_dict_to_disk
+
+NAME_RESULTS_FOLDER = "campaign_results"
+NAME_DATA_FILE = "data.bin"
+NAME_SCHEMA_FILE = "schema.yaml"
+KEY_FIELDS = "fields"
+COLUMN_SCENARIO_NUMBER = "scenario_number"
+COLUMN_FIELD = "field"
+COLUMN_VALUE = "value"
+DTYPE = np.float64
+
+
+class CampaignResults:
+    """
+    Append-only store of numeric values per accepted scenario in long format, i.e. one record (scenario, field, value)
+    per value. Records are appended as raw binary to a single file which can be loaded instantly as memory-mapped array;
+    field names are listed in the schema in order of their first occurrence.
+    """
+
+    def __init__(self, directory: Path, folder: str = NAME_RESULTS_FOLDER, key: str = COLUMN_SCENARIO_NUMBER):
+        self.directory = Path(directory, folder)
+        self.key = key
+        self._data_file = Path(self.directory, NAME_DATA_FILE)
+        self._schema_file = Path(self.directory, NAME_SCHEMA_FILE)
+        self.fields: list[str] = load_yaml(self._schema_file)[KEY_FIELDS] if self._schema_file.exists() else []
+        self._field_ids: dict[str, int] = {field: field_id for field_id, field in enumerate(self.fields)}
+
+    def append(self, scenario_number: int, values: dict[str, Union[int, float]]) -> None:
+        """Appends one record per numeric entry of `values` for given `scenario_number`; new fields extend the schema"""
+        new_fields = [field for field in values if field not in self._field_ids]
+        if new_fields or not self._schema_file.exists():
+            self._write_schema(self.fields + new_fields)
+        records = np.array(
+            [(scenario_number, self._field_ids[field], value) for field, value in values.items()], dtype=DTYPE
+        )
+        with open(self._data_file, "ab") as file:
+            file.write(records.tobytes())
+
+    def _write_schema(self, fields: list[str]) -> None:
+        """Writes schema with given `fields` to disk before any record refers to them"""
+        ensure_folder_exists(self.directory)
+        write_dict_to_disk({KEY_FIELDS: fields}, self._schema_file)
+        self.fields = fields
+        self._field_ids = {field: field_id for field_id, field in enumerate(fields)}
+
+
+def load_campaign_records(directory: Path, folder: str = NAME_RESULTS_FOLDER) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Returns all records stored in `folder` of `directory` as DataFrame with columns (scenario_number, field, value)
+    backed by a read-only memory-mapped array, and the names of the fields by their id in column `field`
+    """
+    directory = Path(directory, folder)
+    columns = [COLUMN_SCENARIO_NUMBER, COLUMN_FIELD, COLUMN_VALUE]
+    schema_file = Path(directory, NAME_SCHEMA_FILE)
+    data_file = Path(directory, NAME_DATA_FILE)
+    if not schema_file.exists() or not data_file.exists() or data_file.stat().st_size == 0:
+        return pd.DataFrame(columns=columns, dtype=DTYPE), []
+    fields = load_yaml(schema_file)[KEY_FIELDS]
+    data = np.memmap(data_file, dtype=DTYPE, mode="r").reshape(-1, len(columns))
+    return pd.DataFrame(data, columns=columns, copy=False), fields
+
+
+def load_campaign_results(
+    directory: Path, folder: str = NAME_RESULTS_FOLDER, key: str = COLUMN_SCENARIO_NUMBER
+) -> pd.DataFrame:
+    """
+    Returns all stored campaign results in `folder` of `directory` as DataFrame with one row per scenario (in order of
+    storage) with its number in column `key` and one column per field - values missing for a scenario are NaN
+    """
+    records, fields = load_campaign_records(directory, folder)
+    if records.empty:
+        return pd.DataFrame(columns=[key] + fields, dtype=DTYPE)
+    scenarios, rows = np.unique(records[COLUMN_SCENARIO_NUMBER].to_numpy(), return_inverse=True)
+    first_occurrence = np.full(len(scenarios), len(rows))
+    np.minimum.at(first_occurrence, rows, np.arange(len(rows)))
+    order = np.argsort(first_occurrence, kind="stable")
+    table = np.full((len(scenarios), len(fields)), np.nan, dtype=DTYPE)
+    table[rows, records[COLUMN_FIELD].to_numpy().astype(int)] = records[COLUMN_VALUE].to_numpy()
+    result = pd.DataFrame(table[order], columns=fields)
+    result.insert(0, key, scenarios[order])
+    return result
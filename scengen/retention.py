@@ -0,0 +1,107 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center <amiris@dlr.de>
+#
+# SPDX-License-Identifier: Apache-2.0
+import gzip
+import os
+import shutil
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from scengen.evaluator import get_required_files, SUFFIX_PARQUET
+from scengen.files import run_in_background
+from scengen.logs import log, log_and_raise_critical
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+KEY_RETENTION = "retention"
+KEY_FORMAT = "format"
+KEY_KEEP = "keep"
+KEY_REQUIRED = "required"
+FORMAT_NONE = "none"
+FORMAT_GZIP = "gzip"
+FORMAT_ZSTD = "zstd"
+FORMAT_PARQUET = "parquet"
+SUFFIXES = {FORMAT_GZIP: ".csv.gz", FORMAT_ZSTD: ".csv.zst", FORMAT_PARQUET: SUFFIX_PARQUET}
+DEFAULT_SETTINGS = {KEY_FORMAT: FORMAT_GZIP, KEY_KEEP: None}
+RETENTION_WORKERS = 2
+
+ERR_UNKNOWN_FORMAT = f"Unknown retention format '{{}}'. Please use one of: {[FORMAT_NONE, *SUFFIXES]}"
+ERR_MISSING_PACKAGE = "Retention format '{}' requires package `{}`. Please install it or use another format."
+WARN_RETENTION_FAILED = "Could not apply retention to output '{}' - kept it unchanged: {}"
+
+
+def get_retention_settings(config: dict) -> Optional[dict]:
+    """
+    Returns settings of section `retention` in GeneratorConfig `config`, or None if the section is missing;
+    raises if the format is unknown or requires a package that is not installed
+    """
+    if KEY_RETENTION not in config:
+        return None
+    settings = {**DEFAULT_SETTINGS, **(config[KEY_RETENTION] or {})}
+    file_format = settings[KEY_FORMAT]
+    if file_format != FORMAT_NONE and file_format not in SUFFIXES:
+        log_and_raise_critical(ERR_UNKNOWN_FORMAT.format(file_format))
+    if file_format == FORMAT_ZSTD and zstandard is None:
+        log_and_raise_critical(ERR_MISSING_PACKAGE.format(file_format, "zstandard"))
+    if file_format == FORMAT_PARQUET and pyarrow is None:
+        log_and_raise_critical(ERR_MISSING_PACKAGE.format(file_format, "pyarrow"))
+    settings[KEY_REQUIRED] = get_required_files(config)
+    return settings
+
+
+def retain_in_background(output_dir: Path, settings: dict) -> None:
+    """Applies `retain_outputs` to `output_dir` on a background thread pool"""
+    run_in_background("scengen_retention", RETENTION_WORKERS, retain_outputs, Path(output_dir), settings)
+
+
+def retain_outputs(output_dir: Path, settings: dict) -> None:
+    """
+    Deletes CSV outputs in `output_dir` not matching any pattern in `keep` (if given) unless required by the evaluation
+    and converts all remaining ones to `format` - errors are logged and leave the affected CSV file unchanged
+    """
+    for path in sorted(Path(output_dir).glob("*.csv")):
+        try:
+            if not is_kept(path.name[: -len(".csv")], settings):
+                os.remove(path)
+            elif settings[KEY_FORMAT] != FORMAT_NONE:
+                convert_output(path, settings[KEY_FORMAT])
+        except Exception as error:
+            log().warning(WARN_RETENTION_FAILED.format(path, repr(error)))
+
+
+def is_kept(name: str, settings: dict) -> bool:
+    """Returns True if output file `name` is required by the evaluation or matches a pattern in `keep` (if any)"""
+    if settings[KEY_KEEP] is None or name in settings[KEY_REQUIRED]:
+        return True
+    return any(fnmatchcase(name, pattern) for pattern in settings[KEY_KEEP])
+
+
+def convert_output(path: Path, file_format: str) -> Path:
+    """Replaces CSV output at `path` by a file of given `file_format` and returns its path"""
+    target = Path(path.parent, path.name[: -len(".csv")] + SUFFIXES[file_format])
+    temporary_path = Path(target.parent, f".{target.name}.tmp")
+    try:
+        if file_format == FORMAT_PARQUET:
+            pd.read_csv(path, sep=";").to_parquet(temporary_path, compression="zstd", index=False)
+        else:
+            opener = gzip.open if file_format == FORMAT_GZIP else zstandard.open
+            with open(path, "rb") as source, opener(temporary_path, "wb") as destination:
+                shutil.copyfileobj(source, destination)
+    except Exception:
+        temporary_path.unlink(missing_ok=True)
+        raise
+    os.replace(temporary_path, target)
+    os.remove(path)
+    log().debug("Converted output '%s' to '%s'", path, target)
+    return target
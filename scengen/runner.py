@@ -1,42 +1,199 @@
 # SPDX-FileCopyrightText: 2024 German Aerospace Center <amiris@dlr.de>
 #
 # SPDX-License-Identifier: Apache-2.0
-import os
+import shutil
+import subprocess
+import time
+from datetime import datetime, timedelta
+from enum import Enum, auto
 from pathlib import Path
+from typing import Optional
 
 from amirispy.scripts.subcommands import run as amiris
 from amirispy.source.cli import GeneralOptions as AMIRISGeneralOptions
-
 from scengen.cli import CreateOptions, GeneralOptions
+from scengen.evaluator import evaluate, Evaluation
+from scengen.files import temporary_working_directory, delete_all_files, read_yaml_scalars, copy_yaml_replacing_scalars
 from scengen.logs import log
+from scengen.profiling import stage, enable_timing, disable_timing, STAGE_EVALUATION, STAGE_SIMULATION, STAGE_SHORT_RUN
+from scengen.timeseries import TIME_FORMAT
 
 NAME_SCENARIO_YAML = "scenario.yaml"
+TRANSIENT_EXIT_CODES = (3, 137, -9)  # JVM exiting on OutOfMemoryError, process killed by SIGKILL e.g. by OOM killer
+RETRY_BACKOFF_IN_S = 2.0
+
+KEY_SHORT_RUN = "short_run"
+KEY_DAYS = "days"
+KEY_THRESHOLD_FACTOR = "threshold_factor"
+DEFAULT_SHORT_RUN = {KEY_DAYS: 28, KEY_THRESHOLD_FACTOR: 1.5}
+SUFFIX_SHORT_RUN = "_short_run"
+KEYS_START_TIME = ("GeneralProperties", "Simulation", "StartTime")
+KEYS_STOP_TIME = ("GeneralProperties", "Simulation", "StopTime")
+PREFIX_SHORT_RUN = "short_run:"
+
+WARN_SHORT_RUN_FAILED = "Short run of scenario '{}' did not pass evaluation; skipped its full run."
+DEBUG_NO_SHORT_RUN = "Skipped short run of scenario '%s' as its horizon is unknown or not longer than %s days"
+
+WARN_RETRY = "Run of scenario '{}' failed transiently with '{}'. Retry {}/{} in {:.0f} s."
+WARN_RUN_FAILED = "Run of scenario '{}' failed ({}) with '{}'."
+
+
+class FailureKind(Enum):
+    """Kind of failure of a scenario run: TRANSIENT failures may vanish on retry, DETERMINISTIC ones will not"""
+
+    TRANSIENT = auto()
+    DETERMINISTIC = auto()
+
+
+def classify_failure(error: BaseException) -> FailureKind:
+    """
+    Returns TRANSIENT if `error` stems from the environment, i.e. lack of memory, a killed JVM, or I/O errors other
+    than missing files; all other errors, e.g. invalid scenarios or missing results, are DETERMINISTIC
+    """
+    if isinstance(error, subprocess.CalledProcessError):
+        return FailureKind.TRANSIENT if error.returncode in TRANSIENT_EXIT_CODES else FailureKind.DETERMINISTIC
+    if isinstance(error, MemoryError) or (isinstance(error, OSError) and not isinstance(error, FileNotFoundError)):
+        return FailureKind.TRANSIENT
+    return FailureKind.DETERMINISTIC
+
+
+def simulate(options: dict) -> Evaluation:
+    """
+    Executes and evaluates scenario of given `options` - transient failures are retried up to `CreateOptions.RETRIES`
+    times with exponential backoff; returns a rejecting Evaluation naming the failure if it persists or is
+    deterministic; with short run settings stored in `options` under KEY_SHORT_RUN, a short run screens the full run
+    """
+    retries = options.get(CreateOptions.RETRIES) or 0
+    short_run = options.get(KEY_SHORT_RUN)
+    for attempt in range(retries + 1):
+        try:
+            if short_run:
+                with stage(STAGE_SHORT_RUN, options.get("scenario_index")):
+                    evaluation = run_short_horizon(options, short_run)
+                short_run = None
+                if evaluation and not evaluation.passed:
+                    log().warning(WARN_SHORT_RUN_FAILED.format(options["scenario_name"]))
+                    failed_checks = [PREFIX_SHORT_RUN + check for check in evaluation.failed_checks]
+                    return Evaluation(False, failed_checks, evaluation.metrics)
+            with stage(STAGE_SIMULATION, options.get("scenario_index")):
+                execute_scenario(options)
+            if options[CreateOptions.SKIP_EVALUATION]:
+                return Evaluation(True, [], {})
+            with stage(STAGE_EVALUATION, options.get("scenario_index")):
+                return evaluate(options)
+        except Exception as error:
+            kind = classify_failure(error)
+            if kind is FailureKind.DETERMINISTIC or attempt == retries:
+                log().warning(WARN_RUN_FAILED.format(options["scenario_name"], kind.name.lower(), repr(error)))
+                return Evaluation(False, [], {}, failure=f"{kind.name.lower()}: {error!r}")
+            delay = RETRY_BACKOFF_IN_S * 2**attempt
+            log().warning(WARN_RETRY.format(options["scenario_name"], repr(error), attempt + 1, retries, delay))
+            time.sleep(delay)
+
+
+def simulate_timed(options: dict) -> tuple[Evaluation, dict[str, tuple[int, float]]]:
+    """
+    Returns Evaluation of `simulate` with given `options` and the number of calls and total duration of each stage it
+    ran - for worker processes whose stage durations are not collected otherwise
+    """
+    durations = enable_timing()
+    try:
+        return simulate(options), durations.totals()
+    finally:
+        disable_timing()
+
+
+def get_short_run_settings(config: dict, options: dict) -> Optional[dict]:
+    """
+    Returns settings of short run if GeneratorConfig `config` has section `short_run` and evaluation is not skipped
+    in `options` - to be stored in `options` under KEY_SHORT_RUN once per run for `simulate`
+    """
+    if options.get(CreateOptions.SKIP_EVALUATION):
+        return None
+    if KEY_SHORT_RUN not in config:
+        return None
+    return {**DEFAULT_SHORT_RUN, **(config[KEY_SHORT_RUN] or {})}
+
+
+def run_short_horizon(options: dict, settings: dict) -> Optional[Evaluation]:
+    """
+    Executes copy of scenario of given `options` shortened to the first `days` of its horizon and returns its
+    Evaluation with thresholds scaled by `threshold_factor`; returns None if the scenario cannot be shortened;
+    the copy is written event by event without loading the scenario and is removed afterwards with its results
+    """
+    scenario_path = Path(options["scenario_path"])
+    times = read_yaml_scalars(scenario_path, [KEYS_START_TIME, KEYS_STOP_TIME])
+    short_stop = get_short_stop_time(times.get(KEYS_START_TIME), times.get(KEYS_STOP_TIME), settings[KEY_DAYS])
+    if short_stop is None:
+        log().debug(DEBUG_NO_SHORT_RUN, options["scenario_name"], settings[KEY_DAYS])
+        return None
+    short_options = dict(options)
+    short_options["scenario_name"] = scenario_path.stem + SUFFIX_SHORT_RUN
+    short_options["scenario_path"] = scenario_path.with_name(short_options["scenario_name"] + scenario_path.suffix)
+    copy_yaml_replacing_scalars(scenario_path, short_options["scenario_path"], {KEYS_STOP_TIME: short_stop})
+    try:
+        execute_scenario(short_options)
+        return evaluate(short_options, settings[KEY_THRESHOLD_FACTOR])
+    finally:
+        delete_all_files(short_options)
+
+
+def shorten_horizon(scenario: dict, days: float) -> bool:
+    """Sets StopTime of `scenario` to `days` after its StartTime; returns False if this would not shorten it"""
+    simulation = (scenario.get("GeneralProperties") or {}).get("Simulation") or {}
+    short_stop = get_short_stop_time(simulation.get("StartTime"), simulation.get("StopTime"), days)
+    if short_stop is None:
+        return False
+    simulation["StopTime"] = short_stop
+    return True
+
+
+def get_short_stop_time(start_time: Optional[str], stop_time: Optional[str], days: float) -> Optional[str]:
+    """Returns StopTime `days` after `start_time`, or None if times are missing or this would not shorten the horizon"""
+    try:
+        start = datetime.strptime(str(start_time), TIME_FORMAT)
+        stop = datetime.strptime(str(stop_time), TIME_FORMAT)
+    except ValueError:
+        return None
+    short_stop = start + timedelta(days=days)
+    if short_stop >= stop:
+        return None
+    return short_stop.strftime(TIME_FORMAT)
 
 
 def execute_scenario(options: dict) -> None:
-    """Calls AMIRIS after mapping `options` using amirispy functionality"""
+    """
+    Calls AMIRIS after mapping `options` using amirispy functionality in a working directory of its own, which holds
+    the temporary Protobuf files and is removed afterwards; if `CreateOptions.SCRATCH` is set, the working directory
+    and results are placed in this directory instead of next to the scenario
+    """
     log().debug("Executing scenario")
     options = map_options(options)
-    amiris.run_amiris(options)
-    delete_pb_files()
+    with temporary_working_directory(options.get(CreateOptions.SCRATCH) or Path(options["scenario_path"]).parent):
+        amiris.run_amiris(options)
+
+
+def promote_results(options: dict) -> None:
+    """Moves results of scenario from `CreateOptions.SCRATCH` (if any) next to its `scenario_path`"""
+    if not options.get(CreateOptions.SCRATCH):
+        return
+    source = Path(options[amiris.RunOptions.OUTPUT])
+    target = Path(Path(options["scenario_path"]).parent, source.name)
+    shutil.rmtree(target, ignore_errors=True)
+    shutil.move(source, target)
+    options[amiris.RunOptions.OUTPUT] = target
+    log().debug(f"Moved results from '{source}' to '{target}'")
 
 
 def map_options(options: dict) -> dict:
-    """Maps values from scengen `options` to option keys of amirispy"""
-    options[amiris.RunOptions.JAR] = options[CreateOptions.JAR]
-    options[amiris.RunOptions.OUTPUT] = Path(options[CreateOptions.DIRECTORY], options['scenario_path'].stem)
+    """Maps values from scengen `options` to option keys of amirispy - all paths are made absolute"""
+    options[amiris.RunOptions.JAR] = Path(options[CreateOptions.JAR]).absolute()
+    result_dir = options.get(CreateOptions.SCRATCH) or Path(options["scenario_path"]).parent
+    options[amiris.RunOptions.OUTPUT] = Path(result_dir, options["scenario_path"].stem).absolute()
     options[AMIRISGeneralOptions.LOG] = options[GeneralOptions.LOG]
-    options[AMIRISGeneralOptions.LOGFILE] = options[GeneralOptions.LOGFILE]
-    options[amiris.RunOptions.SCENARIO] = options["scenario_path"]
+    log_file = options[GeneralOptions.LOGFILE]
+    options[AMIRISGeneralOptions.LOGFILE] = Path(log_file).absolute() if log_file else log_file
+    options[amiris.RunOptions.SCENARIO] = Path(options["scenario_path"]).absolute()
     options[amiris.RunOptions.OUTPUT_OPTIONS] = options[CreateOptions.OUTPUT_OPTIONS]
     options[amiris.RunOptions.NO_CHECKS] = options[CreateOptions.NO_CHECKS]
     return options
-
-
-def delete_pb_files() -> None:
-    """Deletes input and output Protobuf files created by fameio in current working dir"""
-    for file in ["input.pb", "output.pb"]:
-        try:
-            os.remove(Path(os.getcwd(), file))
-        except FileNotFoundError:
-            log().debug(f"Could not delete file `{file}` in current working dir.")
@@ -0,0 +1,148 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center <amiris@dlr.de>
+#
+# SPDX-License-Identifier: Apache-2.0
+from typing import Optional
+
+import numpy as np
+
+from scengen.cli import CreateOptions
+from scengen.files import append_to_rejections
+from scengen.generation.generator import Generator
+from scengen.logs import log
+from scengen.monitoring import record_rejected, REASON_SCREENING
+from scengen.results import CampaignResults, load_campaign_results
+
+NAME_OUTCOMES_FOLDER = "screening_outcomes"
+COLUMN_INDEX = "index"
+COLUMN_PASSED = "passed"
+
+KEY_SCREENING = "screening"
+KEY_MIN_SAMPLES = "min_samples"
+KEY_CONFIDENCE = "confidence"
+KEY_EXPLORATION_RATE = "exploration_rate"
+KEY_REFIT_INTERVAL = "refit_interval"
+DEFAULT_SETTINGS = {KEY_MIN_SAMPLES: 100, KEY_CONFIDENCE: 0.95, KEY_EXPLORATION_RATE: 0.1, KEY_REFIT_INTERVAL: 20}
+MIN_EXPLORATION_RATE = 0.01
+
+REGULARIZATION = 1.0
+MAX_ITERATIONS = 25
+TOLERANCE = 1e-8
+
+INFO_FITTED = "Fitted screening model on {} outcomes with {} parameters and {:.1%} accepted scenarios"
+WARN_EXPLORATION_RATE = (
+    "Screening `exploration_rate` {} is below minimum {} - using the minimum to keep simulating "
+    "candidates if the model predicts all to fail"
+)
+WARN_SKIPPED = "Skipped candidate with index {} predicted to fail with probability {:.1%}"
+REASON_SKIPPED = "screening: predicted to fail with probability {:.3f}"
+
+
+class LogisticModel:
+    """Logistic regression on standardized `features` with L2 regularization, fitted by Newton's method"""
+
+    def __init__(self, features: list[str]):
+        self.features = features
+        self.mean = np.zeros(len(features))
+        self.scale = np.ones(len(features))
+        self.weights = np.zeros(len(features) + 1)
+
+    def fit(self, values: np.ndarray, labels: np.ndarray) -> None:
+        """Fits model to `values` with one row per sample and column per feature and boolean `labels`"""
+        self.mean = np.nanmean(values, axis=0)
+        self.mean[np.isnan(self.mean)] = 0
+        self.scale = np.nanstd(values, axis=0)
+        self.scale[~(self.scale > 0)] = 1
+        x = self._design(values)
+        y = labels.astype(np.float64)
+        penalty = np.full(x.shape[1], REGULARIZATION)
+        penalty[0] = 0
+        for _ in range(MAX_ITERATIONS):
+            probability = _sigmoid(x @ self.weights)
+            gradient = x.T @ (probability - y) + penalty * self.weights
+            hessian = (x.T * (probability * (1 - probability))) @ x + np.diag(penalty + TOLERANCE)
+            step = np.linalg.solve(hessian, gradient)
+            self.weights -= step
+            if np.abs(step).max() < TOLERANCE:
+                break
+
+    def predict(self, values: np.ndarray) -> np.ndarray:
+        """Returns predicted probability to pass for each row of `values`"""
+        return _sigmoid(self._design(values) @ self.weights)
+
+    def _design(self, values: np.ndarray) -> np.ndarray:
+        """Returns standardized `values` with missing values imputed by their mean and a leading intercept column"""
+        standardized = np.nan_to_num((values - self.mean) / self.scale, nan=0.0)
+        return np.hstack([np.ones((len(values), 1)), standardized])
+
+
+def _sigmoid(values: np.ndarray) -> np.ndarray:
+    """Returns logistic function of given `values`"""
+    return 1 / (1 + np.exp(-np.clip(values, -500, 500)))
+
+
+class Screening:
+    """
+    Records drawn parameters and evaluation outcome of each simulated scenario and - if section `screening` is present
+    in the GeneratorConfig `config` - fits a logistic regression to them once enough outcomes exist to skip candidates
+    predicted to fail with high confidence; an `exploration_rate` share (at least 1%) of those is simulated nonetheless.
+    Parameters are keyed by their stable field path, e.g. `create/PV/2/Attributes/InstalledPowerInMW`
+    """
+
+    def __init__(self, options: dict, config: dict):
+        self.options = options
+        self.enabled = KEY_SCREENING in config
+        self.settings = {**DEFAULT_SETTINGS, **(config.get(KEY_SCREENING) or {})}
+        if self.enabled and self.settings[KEY_EXPLORATION_RATE] < MIN_EXPLORATION_RATE:
+            log().warning(WARN_EXPLORATION_RATE.format(self.settings[KEY_EXPLORATION_RATE], MIN_EXPLORATION_RATE))
+            self.settings[KEY_EXPLORATION_RATE] = MIN_EXPLORATION_RATE
+        self.outcomes = CampaignResults(options[CreateOptions.DIRECTORY], NAME_OUTCOMES_FOLDER, COLUMN_INDEX)
+        self.model: Optional[LogisticModel] = None
+        self._unfitted_count = self.settings[KEY_REFIT_INTERVAL]
+
+    def record(self, generator: Generator, passed: bool) -> None:
+        """Records drawn values of scenario of `generator` and whether it `passed` the evaluation"""
+        self.outcomes.append(generator.sampler.index, {COLUMN_PASSED: passed, **generator.sampler.numeric_values()})
+        self._unfitted_count += 1
+
+    def rank(self, generators: list[Generator]) -> list[Generator]:
+        """
+        Returns given candidate `generators` ordered by predicted probability to pass - candidates predicted to fail
+        with probability of at least `confidence` are dropped and recorded as rejections, unless picked for exploration
+        """
+        if not self.enabled or not generators or not self._fit():
+            return generators
+        drawn = [generator.sampler.numeric_values() for generator in generators]
+        values = np.array([[row.get(feature, np.nan) for feature in self.model.features] for row in drawn], dtype=float)
+        probabilities = self.model.predict(values)
+        kept = []
+        for generator, probability in zip(generators, probabilities):
+            if 1 - probability >= self.settings[KEY_CONFIDENCE] and not self._explore(generator):
+                log().warning(WARN_SKIPPED.format(generator.sampler.index, 1 - probability))
+                append_to_rejections(self.options, generator.sampler.index, REASON_SKIPPED.format(1 - probability))
+                record_rejected(self.options, REASON_SCREENING)
+            else:
+                kept.append((probability, generator))
+        return [generator for _, generator in sorted(kept, key=lambda item: -item[0])]
+
+    def _fit(self) -> bool:
+        """Refits model every `refit_interval` new outcomes if at least `min_samples` exist; returns True if fitted"""
+        if self._unfitted_count < self.settings[KEY_REFIT_INTERVAL]:
+            return self.model is not None
+        self._unfitted_count = 0
+        data = load_campaign_results(self.options[CreateOptions.DIRECTORY], NAME_OUTCOMES_FOLDER, COLUMN_INDEX)
+        if len(data) < self.settings[KEY_MIN_SAMPLES]:
+            return self.model is not None
+        labels = data[COLUMN_PASSED].to_numpy() > 0
+        if labels.all() or not labels.any():
+            return self.model is not None
+        features = [column for column in data.columns if column not in (COLUMN_INDEX, COLUMN_PASSED)]
+        model = LogisticModel(features)
+        model.fit(data[features].to_numpy(), labels)
+        self.model = model
+        log().info(INFO_FITTED.format(len(data), len(features), labels.mean()))
+        return True
+
+    def _explore(self, generator: Generator) -> bool:
+        """Returns True if candidate of `generator` is picked for exploration - reproducibly derived from its index"""
+        sequence = np.random.SeedSequence(generator.options["random_seed"], spawn_key=(generator.sampler.index, 1))
+        return np.random.default_rng(sequence).random() < self.settings[KEY_EXPLORATION_RATE]
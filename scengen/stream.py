@@ -0,0 +1,69 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center <amiris@dlr.de>
+#
+# SPDX-License-Identifier: Apache-2.0
+import time
+from pathlib import Path
+from typing import Any, Iterator, NamedTuple, Optional
+
+from scengen.cli import CreateOptions
+from scengen.generation.generator import Generator
+from scengen.generation.sampling import KEY_METHOD, KEY_SIZE, METHOD_RANDOM
+from scengen.logs import log_and_raise_critical
+
+ERR_NO_DESIGN_SIZE = (
+    "Sampling design '{}' requires its size: specify `sampling: size` in the GeneratorConfig or "
+    "`design_size` equal to the number of scenarios `-n` of `scengen create`."
+)
+
+
+class GeneratedScenario(NamedTuple):
+    """Scenario generated in memory with its `index` and the `parameters` drawn for its dynamic fields"""
+
+    index: int
+    scenario: dict
+    parameters: dict[str, Any]
+
+
+class ScenarioStream:
+    """
+    Iterator over scenarios generated lazily in memory from the GeneratorConfig at `config` - no scenario is written to
+    disk; only timeseries derived by `transform` fields are cached in `<directory>/series_cache` as they are
+    referenced by the scenarios. Scenario `index` values start at `start` and are drawn from independent random
+    streams derived from `seed` (default: seed of GeneratorConfig, else system time), i.e. a scenario equals the one
+    with the same index (`generated_count`) created by `scengen create` with the same seed.
+    A space-filling design in section `sampling` covers `design_size` scenarios (default: `sampling: size`) - use the
+    number of scenarios `-n` of `scengen create` to obtain the same design points.
+    Paths to timeseries and `pickfile` directories are relative to `directory`; iteration stops after `count`
+    scenarios or never if `count` is None
+    """
+
+    def __init__(
+        self,
+        config: Path,
+        seed: Optional[int] = None,
+        start: int = 0,
+        count: Optional[int] = None,
+        directory: Path = Path("./"),
+        design_size: Optional[int] = None,
+    ):
+        self.start = start
+        self.count = count
+        options = {
+            CreateOptions.CONFIG: Path(config).resolve(),
+            CreateOptions.DIRECTORY: Path(directory).resolve(),
+            CreateOptions.NUMBER: design_size,
+        }
+        self._generator = Generator(options, trace_file={"total_count": start})
+        settings = self._generator.config.get("sampling") or {}
+        method = str(settings.get(KEY_METHOD, METHOD_RANDOM)).lower()
+        if method != METHOD_RANDOM and design_size is None and KEY_SIZE not in settings:
+            log_and_raise_critical(ERR_NO_DESIGN_SIZE.format(method))
+        self.seed = seed if seed is not None else self._generator.config["defaults"].get("seed") or time.time_ns()
+        options["random_seed"] = self.seed
+
+    def __iter__(self) -> Iterator[GeneratedScenario]:
+        index = self.start
+        while self.count is None or index < self.start + self.count:
+            scenario = self._generator.generate_in_memory(index)
+            yield GeneratedScenario(index, scenario, dict(self._generator.sampler.values))
+            index += 1
@@ -0,0 +1,216 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center <amiris@dlr.de>
+#
+# SPDX-License-Identifier: Apache-2.0
+import hashlib
+import math
+import os
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from scengen.logs import log, log_and_raise_critical
+
+NAME_SERIES_CACHE = "series_cache"
+NAME_PINNED_SERIES = "pinned.txt"
+TIME_FORMAT = "%Y-%m-%d_%H:%M:%S"
+MAX_CACHED_SERIES = 256
+MAX_CACHED_SERIES_INFO = 65536
+
+ERR_MISSING_SERIES = "Could not find timeseries file '{}' referenced in scenario."
+ERR_INVALID_SERIES = "Timeseries file '{}' contains no valid numeric values."
+WARN_MISMATCHED_ROWS = "Timeseries file '{}' has {} rows but {} rows are expected."
+WARN_LIMIT_EXCEEDED = (
+    "Derived timeseries in '{}' exceed size limit of {} MB but are all referenced by written, "
+    "pending or accepted scenarios and thus kept."
+)
+DEBUG_EVICTED = "Evicted least recently used derived timeseries '%s' from cache"
+
+
+class SeriesInfo(NamedTuple):
+    """Metadata of a timeseries CSV file"""
+
+    exists: bool
+    rows: int = 0
+    minimum: float = math.nan
+    maximum: float = math.nan
+
+
+_references: dict[tuple[str, int], set[str]] = {}
+_pinned: dict[str, set[str]] = {}
+_warned_limits: set[str] = set()
+
+
+def get_series_info(path: Path) -> SeriesInfo:
+    """
+    Returns metadata of timeseries at `path` - files are read only once per modification time while their metadata is
+    among the most recently used; raises Exception if the file is empty
+    """
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except OSError:
+        return SeriesInfo(exists=False)
+    return _read_series_info(os.path.normpath(path), modified)
+
+
+@lru_cache(maxsize=MAX_CACHED_SERIES_INFO)
+def _read_series_info(path: str, _modified: int) -> SeriesInfo:
+    """Returns metadata of timeseries at `path` read from disk"""
+    try:
+        data = pd.read_csv(path, sep=";", header=None, comment="#")
+    except pd.errors.EmptyDataError:
+        log_and_raise_critical(ERR_INVALID_SERIES.format(path))
+    values = pd.to_numeric(data.iloc[:, -1], errors="coerce")
+    return SeriesInfo(exists=True, rows=len(values), minimum=values.min(), maximum=values.max())
+
+
+def get_series(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns times (in seconds since epoch) and values of timeseries at `path` as read-only arrays -
+    the most recently used files are kept in memory per modification time
+    """
+    return _read_series(os.path.normpath(path), os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=MAX_CACHED_SERIES)
+def _read_series(path: str, _modified: int) -> tuple[np.ndarray, np.ndarray]:
+    """Returns times and values of timeseries at `path` read from disk"""
+    data = pd.read_csv(path, sep=";", header=None, comment="#", dtype={0: str})
+    times = to_seconds(data.iloc[:, 0])
+    values = pd.to_numeric(data.iloc[:, -1], errors="coerce").to_numpy(dtype=np.float64)
+    valid = ~np.isnan(times) & ~np.isnan(values)
+    times, values = times[valid], values[valid]
+    times.flags.writeable = values.flags.writeable = False
+    return times, values
+
+
+def to_seconds(time_stamps: pd.Series) -> np.ndarray:
+    """Returns given FAME `time_stamps` (e.g. '2019-01-01_00:00:00') as seconds since epoch; invalid ones are NaN"""
+    times = pd.to_datetime(time_stamps, format=TIME_FORMAT, errors="coerce")
+    return np.where(times.isna(), np.nan, times.to_numpy(dtype="datetime64[s]").astype(np.int64)).astype(np.float64)
+
+
+def validate_series(paths: list[str], base_dir: Path, expected_rows: Optional[int] = None) -> None:
+    """
+    Raises Exception if any timeseries in `paths` (relative to `base_dir`) is missing or has no numeric values,
+    logs warning if its number of rows differs from `expected_rows` (if given)
+    """
+    for path in dict.fromkeys(paths):
+        full_path = Path(base_dir, path)
+        info = get_series_info(full_path)
+        if not info.exists:
+            log_and_raise_critical(ERR_MISSING_SERIES.format(full_path))
+        if math.isnan(info.maximum):
+            log_and_raise_critical(ERR_INVALID_SERIES.format(full_path))
+        if expected_rows and info.rows != expected_rows:
+            log().warning(WARN_MISMATCHED_ROWS.format(full_path, info.rows, expected_rows))
+
+
+def get_transformed_series(
+    source: Path,
+    scale: float,
+    offset: float,
+    cache_dir: Path,
+    limit_in_mb: Optional[float] = None,
+    owner: Optional[int] = None,
+) -> Path:
+    """
+    Returns path to timeseries with values of timeseries at `source` multiplied by `scale` plus `offset`;
+    derived files are stored in `cache_dir` named by the hash of source content and transform parameters, i.e. they
+    are created only once. The derived file is referenced by scenario index `owner` (if given) until released or
+    pinned - if `limit_in_mb` is given, least recently used derived files exceeding it are removed unless referenced
+    """
+    if not get_series_info(source).exists:
+        log_and_raise_critical(ERR_MISSING_SERIES.format(source))
+    key = f"{_get_content_hash(source)};{float(scale)!r};{float(offset)!r}"
+    target = Path(cache_dir, hashlib.sha256(key.encode()).hexdigest()[:32] + ".csv")
+    if owner is not None:
+        _references.setdefault((os.path.normpath(cache_dir), owner), set()).add(target.name)
+    if target.exists():
+        os.utime(target)
+        return target
+    data = pd.read_csv(source, sep=";", header=None, comment="#", dtype={0: str})
+    value_column = data.columns[-1]
+    data[value_column] = pd.to_numeric(data[value_column], errors="coerce") * scale + offset
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary = Path(cache_dir, f".{uuid.uuid4().hex}.tmp")
+    data.to_csv(temporary, sep=";", header=False, index=False)
+    os.replace(temporary, target)
+    if limit_in_mb is not None:
+        _evict_least_recently_used(cache_dir, int(limit_in_mb * 1024 * 1024), keep=target)
+    return target
+
+
+def _get_content_hash(path: Path) -> str:
+    """Returns SHA-256 hex digest of content of file at `path` - files are hashed only once per modification time"""
+    return _hash_file(os.path.normpath(path), os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=MAX_CACHED_SERIES_INFO)
+def _hash_file(path: str, _modified: int) -> str:
+    """Returns SHA-256 hex digest of content of file at `path` read from disk"""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def release_series(cache_dir: Path, owner: Optional[int]) -> None:
+    """Removes references of scenario index `owner` to derived timeseries in `cache_dir`, e.g. once it is deleted"""
+    _references.pop((os.path.normpath(cache_dir), owner), None)
+
+
+def pin_series(cache_dir: Path, owner: Optional[int]) -> None:
+    """Keeps derived timeseries in `cache_dir` referenced by scenario index `owner` permanently, e.g. once accepted"""
+    names = _references.pop((os.path.normpath(cache_dir), owner), set())
+    pinned = _get_pinned(cache_dir)
+    new_names = sorted(names - pinned)
+    if new_names:
+        with open(Path(cache_dir, NAME_PINNED_SERIES), "a") as file:
+            file.writelines(f"{name}\n" for name in new_names)
+        pinned.update(new_names)
+
+
+def _get_pinned(cache_dir: Path) -> set[str]:
+    """Returns names of derived timeseries pinned in `cache_dir` - read from disk once per directory"""
+    key = os.path.normpath(cache_dir)
+    if key not in _pinned:
+        path = Path(cache_dir, NAME_PINNED_SERIES)
+        _pinned[key] = set(path.read_text().split()) if path.exists() else set()
+    return _pinned[key]
+
+
+def _evict_least_recently_used(cache_dir: Path, limit_in_bytes: int, keep: Path) -> None:
+    """
+    Removes least recently used derived files from `cache_dir` until its size is within `limit_in_bytes` - files
+    pinned or referenced by any scenario (including `keep`) are never removed; warns if the limit cannot be met
+    """
+    with os.scandir(cache_dir) as entries:
+        files = [
+            (entry.stat().st_mtime_ns, entry.stat().st_size, entry.name)
+            for entry in entries
+            if entry.is_file() and entry.name.endswith(".csv")
+        ]
+    total_size = sum(size for _, size, _ in files)
+    key = os.path.normpath(cache_dir)
+    protected = {keep.name, *_get_pinned(cache_dir)}
+    protected.update(name for (directory, _), names in _references.items() if directory == key for name in names)
+    for _, size, name in sorted(files):
+        if total_size <= limit_in_bytes:
+            break
+        if name in protected:
+            continue
+        os.remove(Path(cache_dir, name))
+        total_size -= size
+        log().debug(DEBUG_EVICTED, name)
+    if total_size > limit_in_bytes and key not in _warned_limits:
+        _warned_limits.add(key)
+        log().warning(WARN_LIMIT_EXCEEDED.format(cache_dir, limit_in_bytes / 1024 / 1024))
+
+
+def clear_cache() -> None:
+    """Removes all cached timeseries metadata and values"""
+    _pinned.clear()
+    _read_series_info.cache_clear()
+    _hash_file.cache_clear()
+    _read_series.cache_clear()
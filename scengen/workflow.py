@@ -3,52 +3,400 @@
 # SPDX-FileCopyrightText: 2023 German Aerospace Center <amiris@dlr.de>
 #
 # SPDX-License-Identifier: Apache-2.0
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
 from typing import Optional
 
+from fameio.source.loader import load_yaml
+
+from scengen.runner import promote_results, simulate, simulate_timed, get_short_run_settings, KEY_SHORT_RUN
 from scengen.generation.generator import Generator
-from scengen.logs import scengen_logger, log
-from scengen.cli import arg_handling_run, GeneralOptions, CreateOptions, Command
-from scengen.estimator import estimate_scenario
-from scengen.files import delete_all_files, increase_count_in_trace_file
-from scengen.runner import execute_scenario
-from scengen.evaluator import evaluate_scenario
+from scengen.logs import scengen_logger, log, shutdown_logger, log_and_raise_critical, worker_logger, get_log_queue
+from scengen.cli import arg_handling_run, GeneralOptions, CreateOptions, Command, MaterializeOptions, CampaignOptions
+from scengen.estimator import estimate_scenario, estimate_scenarios
+from scengen.files import (
+    delete_all_files,
+    increase_count_in_trace_file,
+    wait_for_background_tasks,
+    append_to_manifest,
+    compact_scenario,
+    append_to_rejections,
+    get_series_cache_dir,
+)
+from scengen.evaluator import Evaluation
+from scengen.results import CampaignResults
+from scengen.campaign import CampaignEntry, load_campaign, select_entry
+from scengen.screening import Screening
+from scengen.retention import get_retention_settings, retain_in_background
+from scengen.reevaluation import reevaluate
+from scengen.timeseries import pin_series, release_series
+from scengen.profiling import stage, STAGE_ESTIMATION, enable_profiling, disable_profiling, add_duration
+from scengen.monitoring import (
+    start_monitoring,
+    stop_monitoring,
+    record_rejected,
+    record_started,
+    record_simulated,
+    REASON_GENERATION,
+    REASON_ESTIMATION,
+)
+
+ERR_VARY_STREAM = (
+    "Option `--vary` cannot be combined with option `--stream` as variants require the scenario in memory."
+)
+ERR_TOO_MANY_FAILURES = "Aborting after {} scenarios in a row failed - last failure: {}"
+WARN_POOL_BROKEN = "A worker process terminated abruptly, e.g. killed for lack of memory. Restarting worker pool."
+WARN_GENERATION_FAILED = "Generation of scenario with index {} failed with '{}'. Creating another scenario."
+WARN_ESTIMATION_FAILED = "Estimation of scenario with index {} failed with '{}'. Creating another scenario."
+
+
+class FailureCounter:
+    """Counts scenarios failing in a row and raises once their number reaches `limit` (if any)"""
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.count = 0
+
+    def record(self, reason: str) -> None:
+        """Counts another failure due to given `reason`; raises if `limit` scenarios failed in a row"""
+        self.count += 1
+        if self.limit and self.count >= self.limit:
+            log_and_raise_critical(ERR_TOO_MANY_FAILURES.format(self.count, reason))
+
+    def reset(self) -> None:
+        """Resets count after a scenario did not fail"""
+        self.count = 0
 
 
 def scengen_cli(args: Optional[list[str]] = None) -> None:
     """Calls sub-commands with appropriate arguments as returned by the command line parser"""
     command, options = arg_handling_run(args)
-    scengen_logger(options[GeneralOptions.LOG], options[GeneralOptions.LOGFILE])
+    scengen_logger(options[GeneralOptions.LOG], options[GeneralOptions.LOGFILE], options[GeneralOptions.LOG_QUEUE])
 
-    if command is Command.CREATE:
-        create(options)
+    try:
+        if command is Command.CREATE:
+            create(options)
+        elif command is Command.MATERIALIZE:
+            materialize(options)
+        elif command is Command.CAMPAIGN:
+            campaign(options)
+        elif command is Command.EVALUATE:
+            reevaluate(options)
+    finally:
+        shutdown_logger()
 
 
 def create(options: dict) -> None:
-    """Handles scenario generation based on given `options`"""
+    """Handles scenario generation based on given `options` - monitoring its progress and optionally profiling it"""
+    if options[CreateOptions.PROFILE]:
+        enable_profiling(options[CreateOptions.DIRECTORY])
+    targets = {options[CreateOptions.DIRECTORY]: options[CreateOptions.NUMBER]}
+    start_monitoring(targets, options[CreateOptions.METRICS_PORT])
+    try:
+        create_scenarios(options)
+    finally:
+        stop_monitoring()
+        disable_profiling()
+
+
+def create_scenarios(options: dict) -> None:
+    """Creates scenarios until `CreateOptions.NUMBER` scenarios are accepted"""
     log().info("Starting to create scenarios")
     requested_scenario_count = options[CreateOptions.NUMBER]
     useful_scenario_count = 0
+    campaign_results = CampaignResults(options[CreateOptions.DIRECTORY])
+    config = load_yaml(options[CreateOptions.CONFIG])
+    options[KEY_SHORT_RUN] = get_short_run_settings(config, options)
+    screening = Screening(options, config)
+    retention = get_retention_settings(config)
+    base = generate_variant_base(options) if options[CreateOptions.VARY] else None
+    failures = FailureCounter(options[CreateOptions.MAX_FAILURES])
     while useful_scenario_count < requested_scenario_count:
-        generator = Generator(options)
-        generator.generate_scenarios()
+        for generator in generate_candidates(options, failures, base, screening):
+            if useful_scenario_count >= requested_scenario_count:
+                break
+            if not options[CreateOptions.STREAM]:
+                generator.write_scenario()
+
+            record_started(options)
+            evaluation = simulate(generator.options)
+            record_simulated(options, evaluation, accepted=evaluation.passed)
+            if evaluation.passed:
+                useful_scenario_count += 1
+                accept_scenario(generator, evaluation, campaign_results, retention)
+                log().info(f"Created {useful_scenario_count}/{requested_scenario_count} scenarios.")
+            else:
+                reject_scenario(options, failures, generator, evaluation)
+            if not evaluation.failure:
+                failures.reset()
+                screening.record(generator, evaluation.passed)
+    wait_for_background_tasks()
+    log().info(f"Created scenario {useful_scenario_count} of {requested_scenario_count}.")
+
+
+def accept_scenario(
+    generator: Generator, evaluation: Evaluation, campaign_results: CampaignResults, retention: Optional[dict] = None
+) -> None:
+    """
+    Stores accepted scenario of `generator` with its drawn values and metrics, keeps its derived timeseries, and
+    increases count in trace file; its outputs are compressed and filtered in the background according to `retention`
+    """
+    options = generator.options
+    promote_results(options)
+    pin_series(get_series_cache_dir(options), options.get("scenario_index"))
+    campaign_results.append(generator.scenario_number, {**evaluation.metrics, **generator.sampler.numeric_values()})
+    append_to_manifest(options, generator.scenario_number)
+    if options[CreateOptions.COMPACT]:
+        compact_scenario(options, generator.get_manifest())
+    increase_count_in_trace_file(options)
+    if retention:
+        retain_in_background(Path(Path(options["scenario_path"]).parent, options["scenario_name"]), retention)
+
+
+def reject_scenario(options: dict, failures: FailureCounter, generator: Generator, evaluation: Evaluation) -> None:
+    """
+    Records reason of rejection of scenario of `generator` created with given `options` - counting it in `failures`
+    if it failed - and deletes its files
+    """
+    if evaluation.failure:
+        record_failure(options, failures, generator.sampler.index, evaluation.failure)
+    else:
+        log().warning(f"Scenario did not pass evaluation. Restarting.")
+        append_to_rejections(options, generator.sampler.index, ",".join(evaluation.failed_checks))
+    discard_scenario(generator)
+
+
+def record_failure(options: dict, failures: FailureCounter, index: int, reason: str) -> None:
+    """
+    Records scenario `index` as rejected due to a failure with given `reason` and counts it in `failures`, which raises
+    if `CreateOptions.MAX_FAILURES` scenarios failed in a row
+    """
+    append_to_rejections(options, index, reason)
+    failures.record(reason)
+
+
+def campaign(options: dict) -> None:
+    """
+    Creates scenarios for all GeneratorConfigs of a campaign: scenarios are generated and estimated in this process
+    and simulated on one shared pool of worker processes; GeneratorConfigs are served by their weighted fair share
+    """
+    entries = load_campaign(options)
+    targets = {entry.options[CreateOptions.DIRECTORY]: entry.target for entry in entries}
+    start_monitoring(targets, options[CampaignOptions.METRICS_PORT])
+    try:
+        run_campaign(options, entries)
+    finally:
+        stop_monitoring()
+
 
-        positive_estimation = True if options[CreateOptions.SKIP_ESTIMATION] else estimate_scenario(options)
-        if not positive_estimation:
-            log().warning(f"Scenario did not pass estimation. Creating another scenario.")
-            delete_all_files(options)
+def run_campaign(options: dict, entries: list[CampaignEntry]) -> None:
+    """
+    Creates scenarios for all campaign `entries` on a pool of `CampaignOptions.WORKERS` worker processes; if a worker
+    dies abruptly, its in-flight scenarios are recorded as transient failures and the pool is restarted
+    """
+    workers = max(options[CampaignOptions.WORKERS] or 1, 1)
+    log().info(f"Starting campaign of {len(entries)} GeneratorConfigs on {workers} workers")
+    running: dict[Future, tuple[CampaignEntry, Generator]] = {}
+    failures = {entry: FailureCounter(entry.options[CreateOptions.MAX_FAILURES]) for entry in entries}
+    pool = create_pool(options, workers)
+    try:
+        while not all(entry.is_done() for entry in entries):
+            while len(running) < workers and (entry := select_entry(entries)):
+                while not entry.candidates:
+                    candidates = generate_candidates(entry.options, failures[entry], screening=entry.screening)
+                    entry.candidates.extend(candidates)
+                generator = entry.candidates.popleft()
+                generator.write_candidate()
+                running[pool.submit(simulate_timed, generator.options)] = (entry, generator)
+                entry.running += 1
+                record_started(entry.options)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            pool_broken = False
+            for future in done:
+                entry, generator = running.pop(future)
+                entry.running -= 1
+                try:
+                    evaluation, durations = future.result()
+                except BrokenProcessPool as error:
+                    pool_broken = True
+                    evaluation, durations = Evaluation(False, [], {}, failure=f"transient: {error!r}"), {}
+                for name, (count, seconds) in durations.items():
+                    add_duration(name, seconds, count)
+                record_simulated(entry.options, evaluation, accepted=evaluation.passed and not entry.is_done())
+                if evaluation.passed and not entry.is_done():
+                    entry.accepted += 1
+                    generator.assign_number()
+                    accept_scenario(generator, evaluation, entry.results, entry.retention)
+                    config = entry.options[CreateOptions.CONFIG]
+                    log().info(f"Created {entry.accepted}/{entry.target} scenarios for '{config}'.")
+                elif evaluation.passed:
+                    discard_scenario(generator)
+                else:
+                    reject_scenario(entry.options, failures[entry], generator, evaluation)
+                if not evaluation.failure:
+                    failures[entry].reset()
+                    entry.screening.record(generator, evaluation.passed)
+            if pool_broken:
+                log().warning(WARN_POOL_BROKEN)
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = create_pool(options, workers)
+    finally:
+        pool.shutdown()
+    wait_for_background_tasks()
+    log().info(f"Finished campaign of {len(entries)} GeneratorConfigs.")
+
+
+def create_pool(options: dict, workers: int) -> ProcessPoolExecutor:
+    """Returns pool of given number of `workers` processes forwarding their logs to the log queue (if enabled)"""
+    initializer, initargs = None, ()
+    if options[GeneralOptions.LOG_QUEUE]:
+        initializer, initargs = worker_logger, (get_log_queue(), options[GeneralOptions.LOG])
+    return ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+
+
+def generate_variant_base(options: dict) -> Generator:
+    """Returns generator holding the reference scenario in memory of which variants are created"""
+    if options[CreateOptions.STREAM]:
+        log_and_raise_critical(ERR_VARY_STREAM)
+    base = Generator(dict(options))
+    base.generate_base()
+    pin_series(get_series_cache_dir(options), base.sampler.index)
+    options["random_seed"] = base.options["random_seed"]
+    return base
+
+
+def generate_candidates(
+    options: dict, failures: FailureCounter, base: Optional[Generator] = None, screening: Optional[Screening] = None
+) -> list[Generator]:
+    """
+    Returns generators of candidate scenarios that passed the estimation (unless skipped); `CreateOptions.BATCH_SIZE`
+    candidates are generated in memory and estimated at once - in `CreateOptions.STREAM` mode one candidate is
+    written to disk and estimated from the agent attributes collected while writing it; each generator works on its
+    own copy of `options`. Candidates failing to generate or estimate are counted in `failures`.
+    If a `base` generator is given, candidates are variants of its reference scenario varying `CreateOptions.VARY`;
+    if `screening` is given, candidates are ranked and screened by it
+    """
+    if options[CreateOptions.STREAM]:
+        generator = Generator(dict(options))
+        try:
+            generator.generate_scenarios()
+        except Exception as error:
+            handle_generation_failure(options, failures, generator, error)
+            if Path(generator.options.get("scenario_path", "")).is_file():
+                delete_all_files(generator.options)
+            release_candidates([generator])
+            return []
+        options["random_seed"] = generator.options["random_seed"]
+        if not options[CreateOptions.SKIP_ESTIMATION]:
+            with stage(STAGE_ESTIMATION, generator.sampler.index):
+                scenario = {**generator.scenario, "Agents": generator.estimation_agents}
+                try:
+                    passed = estimate_scenario(scenario, generator.options["scenario_path"].parent, generator.config)
+                except Exception as error:
+                    handle_estimation_failure(options, failures, generator, error)
+                    passed = False
+            if not passed:
+                log().warning(f"Scenario did not pass estimation. Creating another scenario.")
+                record_rejected(options, REASON_ESTIMATION)
+                discard_scenario(generator)
+                return []
+        if screening and not screening.rank([generator]):
+            discard_scenario(generator)
+            return []
+        return [generator]
+
+    generators = []
+    for _ in range(max(options[CreateOptions.BATCH_SIZE], 1)):
+        generator = Generator(dict(options))
+        try:
+            if base:
+                generator.generate_variant(base, options[CreateOptions.VARY])
+            else:
+                generator.generate_candidate()
+        except Exception as error:
+            handle_generation_failure(options, failures, generator, error)
+            release_candidates([generator])
             continue
+        options["random_seed"] = generator.options["random_seed"]
+        generators.append(generator)
+    if not generators:
+        return []
+    if options[CreateOptions.SKIP_ESTIMATION]:
+        return rank_candidates(generators, screening)
+    with stage(STAGE_ESTIMATION, f"batch_{generators[0].sampler.index}-{generators[-1].sampler.index}"):
+        decisions = estimate_candidates(options, failures, generators)
+    if not all(decisions):
+        log().warning(f"{decisions.count(False)} of {len(decisions)} candidate scenario(s) did not pass estimation.")
+        record_rejected(options, REASON_ESTIMATION, decisions.count(False))
+    release_candidates([generator for generator, passed in zip(generators, decisions) if not passed])
+    return rank_candidates([generator for generator, passed in zip(generators, decisions) if passed], screening)
 
-        execute_scenario(options)
 
-        positive_evaluation = True if options[CreateOptions.SKIP_EVALUATION] else evaluate_scenario(options)
-        if positive_evaluation:
-            useful_scenario_count += 1
-            increase_count_in_trace_file(options)
-            log().info(f"Created {useful_scenario_count}/{requested_scenario_count} scenarios.")
-        else:
-            log().warning(f"Scenario did not pass evaluation. Restarting.")
-            delete_all_files(options)
-    log().info(f"Created scenario {useful_scenario_count} of {requested_scenario_count}.")
+def estimate_candidates(options: dict, failures: FailureCounter, generators: list[Generator]) -> list[bool]:
+    """
+    Returns for each candidate of `generators` True if it passed the estimation - all candidates are estimated at once;
+    if this fails, each candidate is estimated on its own and those failing are counted in `failures` and rejected
+    """
+    scenarios = [generator.scenario for generator in generators]
+    series_dirs = [generator.options["scenario_path"].parent for generator in generators]
+    try:
+        return estimate_scenarios(scenarios, series_dirs, generators[0].config)
+    except Exception:
+        decisions = []
+        for generator, scenario, series_dir in zip(generators, scenarios, series_dirs):
+            try:
+                decisions.append(estimate_scenario(scenario, series_dir, generator.config))
+            except Exception as error:
+                handle_estimation_failure(options, failures, generator, error)
+                decisions.append(False)
+        return decisions
+
+
+def rank_candidates(generators: list[Generator], screening: Optional[Screening]) -> list[Generator]:
+    """Returns candidate `generators` ranked by `screening` (if any) and releases timeseries of skipped ones"""
+    if not screening:
+        return generators
+    ranked = screening.rank(generators)
+    release_candidates([generator for generator in generators if generator not in ranked])
+    return ranked
+
+
+def discard_scenario(generator: Generator) -> None:
+    """Deletes all files of the written scenario of `generator` and releases its derived timeseries"""
+    delete_all_files(generator.options)
+    release_candidates([generator])
+
+
+def release_candidates(generators: list[Generator]) -> None:
+    """Releases derived timeseries of discarded candidate scenarios of `generators` that were never written"""
+    for generator in generators:
+        release_series(get_series_cache_dir(generator.options), generator.options.get("scenario_index"))
+
+
+def handle_generation_failure(options: dict, failures: FailureCounter, generator: Generator, error: Exception) -> None:
+    """Records failed generation of scenario of `generator` with `options` due to given `error` in `failures`"""
+    options["random_seed"] = generator.options.get("random_seed") or options.get("random_seed")
+    log().warning(WARN_GENERATION_FAILED.format(generator.sampler.index, repr(error)))
+    record_rejected(options, REASON_GENERATION)
+    record_failure(options, failures, generator.sampler.index, f"generation: {error!r}")
+
+
+def handle_estimation_failure(options: dict, failures: FailureCounter, generator: Generator, error: Exception) -> None:
+    """Records failed estimation of scenario of `generator` with `options` due to given `error` in `failures`"""
+    log().warning(WARN_ESTIMATION_FAILED.format(generator.sampler.index, repr(error)))
+    record_failure(options, failures, generator.sampler.index, f"estimation: {error!r}")
+
+
+def materialize(options: dict) -> None:
+    """
+    Rebuilds full scenario YAMLs next to the compact scenario manifests given in `options` - neither the
+    GeneratorConfig nor its trace file are modified
+    """
+    for manifest_path in options[MaterializeOptions.MANIFEST]:
+        generator = Generator({CreateOptions.CONFIG: options[MaterializeOptions.CONFIG]}, trace_file={"total_count": 0})
+        generator.regenerate(load_yaml(manifest_path), Path(manifest_path).parent)
+        log().info(f"Materialized scenario '{generator.options['scenario_path']}'.")
 
 
 if __name__ == "__main__":
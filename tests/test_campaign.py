@@ -0,0 +1,134 @@
+import os
+from pathlib import Path
+
+import pytest
+import yaml
+
+from scengen import workflow
+from scengen.campaign import CampaignEntry, load_campaign, select_entry
+from scengen.cli import CreateOptions, arg_handling_run
+from scengen.evaluator import Evaluation
+
+
+def get_campaign_options(campaign_path: Path) -> dict:
+    return arg_handling_run(["campaign", "-c", str(campaign_path), "-j", "amiris.jar", "-cp"])[1]
+
+
+def get_entry(tmp_path: Path, target: int, weight: float, accepted: int = 0, running: int = 0) -> CampaignEntry:
+    config_path = Path(tmp_path, "config.yaml")
+    config_path.write_text(yaml.safe_dump({"defaults": {"base_name": "Test"}}))
+    entry = CampaignEntry({CreateOptions.DIRECTORY: tmp_path, CreateOptions.CONFIG: config_path}, target, weight)
+    entry.accepted = accepted
+    entry.running = running
+    return entry
+
+
+def crash_first_worker(options: dict) -> tuple[Evaluation, dict]:
+    marker = Path(options[CreateOptions.DIRECTORY], "crashed")
+    if not marker.exists():
+        marker.touch()
+        os._exit(1)
+    return Evaluation(True, [], {}), {}
+
+
+def pass_run(options: dict) -> tuple[Evaluation, dict]:
+    return Evaluation(True, [], {}), {}
+
+
+def write_campaign(tmp_path: Path, number: int) -> Path:
+    template = {"Agents": [{"Type": "Demand", "Id": 1}], "Contracts": []}
+    Path(tmp_path, "template.yaml").write_text(yaml.safe_dump(template))
+    defaults = {"base_name": "Test", "seed": 3, "trace_file": "trace.yaml"}
+    Path(tmp_path, "config.yaml").write_text(yaml.safe_dump({"defaults": defaults, "base_template": "template.yaml"}))
+    campaign = {"configs": [{"config": "config.yaml", "number": number, "directory": "out"}]}
+    campaign_path = Path(tmp_path, "campaign.yaml")
+    campaign_path.write_text(yaml.safe_dump(campaign))
+    return campaign_path
+
+
+class Test:
+    def test_load_campaign__entries_with_create_options(self, tmp_path):
+        campaign = {
+            "configs": [
+                {"config": "a/config.yaml", "number": 5, "directory": "out_a"},
+                {"config": "b/config.yaml", "number": 2, "directory": "out_b", "weight": 2},
+            ]
+        }
+        for folder in ["a", "b"]:
+            Path(tmp_path, folder).mkdir()
+            Path(tmp_path, folder, "config.yaml").write_text(yaml.safe_dump({"defaults": {"base_name": folder}}))
+        campaign_path = Path(tmp_path, "campaign.yaml")
+        campaign_path.write_text(yaml.safe_dump(campaign))
+        entries = load_campaign(get_campaign_options(campaign_path))
+        assert [(entry.target, entry.weight) for entry in entries] == [(5, 1), (2, 2)]
+        options = entries[1].options
+        assert options[CreateOptions.CONFIG] == Path(tmp_path, "b/config.yaml").resolve()
+        assert options[CreateOptions.DIRECTORY] == Path(tmp_path, "out_b").resolve()
+        assert options[CreateOptions.NUMBER] == 2
+        assert options[CreateOptions.COMPACT] and not options[CreateOptions.STREAM]
+        assert options[CreateOptions.VARY] is None
+
+    @pytest.mark.parametrize(
+        "campaign",
+        [
+            {},
+            {"configs": []},
+            {"configs": [{"config": "config.yaml", "number": 1}]},
+            {"configs": [{"config": "config.yaml", "number": 1, "directory": "out", "weight": 0}]},
+        ],
+    )
+    def test_load_campaign__invalid_raises(self, tmp_path, campaign):
+        campaign_path = Path(tmp_path, "campaign.yaml")
+        campaign_path.write_text(yaml.safe_dump(campaign))
+        with pytest.raises(Exception):
+            load_campaign(get_campaign_options(campaign_path))
+
+    def test_select_entry__lowest_weighted_share(self, tmp_path):
+        light = get_entry(tmp_path, target=10, weight=1, accepted=2)
+        heavy = get_entry(tmp_path, target=10, weight=3, accepted=3, running=1)
+        assert select_entry([light, heavy]) is heavy
+
+    def test_select_entry__skips_entries_without_open_slots(self, tmp_path):
+        full = get_entry(tmp_path, target=2, weight=1, accepted=1, running=1)
+        open_entry = get_entry(tmp_path, target=10, weight=1, accepted=5)
+        assert select_entry([full, open_entry]) is open_entry
+        assert select_entry([full]) is None
+
+    def test_run_campaign__restarts_pool_after_worker_died(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(workflow, "simulate_timed", crash_first_worker)
+        campaign_path = write_campaign(tmp_path, number=2)
+        options = arg_handling_run(["campaign", "-c", str(campaign_path), "-j", "amiris.jar", "-w", "1", "-ses"])[1]
+        entries = load_campaign(options)
+        workflow.run_campaign(options, entries)
+        assert entries[0].accepted == 2
+        rejections = Path(tmp_path, "out", "rejections.csv").read_text().splitlines()
+        assert len(rejections) == 2 and "transient: BrokenProcessPool" in rejections[1]
+
+    @pytest.mark.parametrize("max_failures, raises", [("2", False), ("1", True)])
+    def test_run_campaign__estimation_error_counts_as_failure(self, tmp_path, monkeypatch, max_failures, raises):
+        calls = []
+
+        def estimate_batch(*_args):
+            raise FileNotFoundError("missing.csv")
+
+        def estimate(*_args):
+            calls.append(1)
+            if len(calls) == 1:
+                raise FileNotFoundError("missing.csv")
+            return True
+
+        monkeypatch.setattr(workflow, "simulate_timed", pass_run)
+        monkeypatch.setattr(workflow, "estimate_scenarios", estimate_batch)
+        monkeypatch.setattr(workflow, "estimate_scenario", estimate)
+        campaign_path = write_campaign(tmp_path, number=2)
+        args = ["campaign", "-c", str(campaign_path), "-j", "amiris.jar", "-w", "1", "-mf", max_failures]
+        options = arg_handling_run(args)[1]
+        entries = load_campaign(options)
+        if raises:
+            with pytest.raises(Exception):
+                workflow.run_campaign(options, entries)
+        else:
+            workflow.run_campaign(options, entries)
+            assert entries[0].accepted == 2
+        rejections = Path(tmp_path, "out", "rejections.csv").read_text().splitlines()
+        assert len(rejections) == 2 and "estimation: FileNotFoundError" in rejections[1]
@@ -1,6 +1,13 @@
 from pathlib import Path
 
-from scengen.cli import resolve_relative_paths
+from scengen.cli import (
+    resolve_relative_paths,
+    arg_handling_run,
+    Command,
+    MaterializeOptions,
+    CampaignOptions,
+    EvaluateOptions,
+)
 
 
 class Test:
@@ -27,3 +34,35 @@ class Test:
         args = {"none_value": None}
         resolved_args = resolve_relative_paths(args)
         assert resolved_args["none_value"] is None
+
+    @staticmethod
+    def test_resolve_relative_paths__list_of_paths():
+        args = {"paths": [Path("a.yaml"), Path("b.yaml")]}
+        resolved_args = resolve_relative_paths(args)
+        assert all(path.is_absolute() for path in resolved_args["paths"])
+
+    @staticmethod
+    def test_arg_handling_run__materialize():
+        command, options = arg_handling_run(["materialize", "-c", "config.yaml", "-m", "a.yaml", "b.yaml"])
+        assert command is Command.MATERIALIZE
+        assert [path.name for path in options[MaterializeOptions.MANIFEST]] == ["a.yaml", "b.yaml"]
+
+    @staticmethod
+    def test_arg_handling_run__campaign():
+        command, options = arg_handling_run(["campaign", "-c", "campaign.yaml", "-j", "amiris.jar", "-w", "4"])
+        assert command is Command.CAMPAIGN
+        assert options[CampaignOptions.CAMPAIGN].is_absolute()
+        assert options[CampaignOptions.WORKERS] == 4
+        assert options[CampaignOptions.METRICS_PORT] is None
+
+    @staticmethod
+    def test_arg_handling_run__metrics_port():
+        command, options = arg_handling_run(["campaign", "-c", "campaign.yaml", "-j", "amiris.jar", "-mp", "9464"])
+        assert options[CampaignOptions.METRICS_PORT] == 9464
+
+    @staticmethod
+    def test_arg_handling_run__evaluate():
+        command, options = arg_handling_run(["evaluate", "-c", "config.yaml", "-d", "scenarios", "-w", "3"])
+        assert command is Command.EVALUATE
+        assert options[EvaluateOptions.DIRECTORY].is_absolute()
+        assert options[EvaluateOptions.WORKERS] == 3
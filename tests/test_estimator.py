@@ -0,0 +1,151 @@
+from pathlib import Path
+
+import pytest
+
+from scengen.estimator import (
+    get_installed_capacity,
+    accumulate_capacities,
+    capacities_by_technology,
+    generation_capacity_available,
+    COLUMN_ID,
+    COLUMN_TECHNOLOGY,
+    get_installed_capacities,
+    estimate_scenarios,
+    accumulate_capacities_by_candidate,
+    predict_scarcity_share,
+    get_hours,
+    get_scarcity_settings,
+    reduce_agent,
+    estimate_scenario,
+)
+
+SCENARIO = {
+    "Agents": [
+        {"Type": "EnergyExchange", "Id": 1, "Attributes": {"DistributionMethod": "SAME_SHARES"}},
+        {"Type": "VariableRenewableOperator", "Id": 2, "Attributes": {"EnergyCarrier": "PV", "InstalledPowerInMW": 50}},
+        {"Type": "StorageTrader", "Id": 3, "Attributes": {"Device": {"InstalledPowerInMW": 20}}},
+        {
+            "Type": "PredefinedPlantBuilder",
+            "Id": 4,
+            "Attributes": {
+                "Prototype": {"FuelType": "NUCLEAR"},
+                "Plants": [{"Id": 41, "NetCapacityInMW": 100}, {"Id": 42, "NetCapacityInMW": 200}],
+            },
+        },
+    ]
+}
+
+SIMULATION = {"Simulation": {"StartTime": "2019-01-01_00:00:00", "StopTime": "2019-01-01_04:00:00"}}
+
+
+def get_market(demand: str, value_of_lost_load: float = 10000) -> dict:
+    return {
+        "GeneralProperties": SIMULATION,
+        "Agents": [
+            {
+                "Type": "DemandTrader",
+                "Id": 1,
+                "Attributes": {"Loads": [{"ValueOfLostLoad": value_of_lost_load, "DemandSeries": demand}]},
+            },
+            {
+                "Type": "VariableRenewableOperator",
+                "Id": 2,
+                "Attributes": {"EnergyCarrier": "PV", "InstalledPowerInMW": 100, "YieldProfile": "yield.csv"},
+            },
+            {
+                "Type": "PredefinedPlantBuilder",
+                "Id": 3,
+                "Attributes": {
+                    "Prototype": {"FuelType": "NUCLEAR", "UnplannedAvailabilityFactor": 0.5},
+                    "Plants": [{"Id": 31, "NetCapacityInMW": 100}],
+                },
+            },
+        ],
+    }
+
+
+def write_series(path: Path, values: list[float]) -> None:
+    path.write_text("".join(f"2019-01-01_{hour:02d}:00:00;{value}\n" for hour, value in enumerate(values)))
+
+
+class Test:
+    def test_get_installed_capacity__columns(self):
+        capacities = get_installed_capacity(SCENARIO)
+        assert list(capacities[COLUMN_ID]) == [2, 3, 41, 42]
+        assert list(capacities[COLUMN_TECHNOLOGY]) == ["PV", "Storage", "NUCLEAR", "NUCLEAR"]
+
+    def test_get_installed_capacity__no_agents(self):
+        assert get_installed_capacity({"Agents": []}).empty
+
+    def test_get_installed_capacity__builder_without_plants_needs_no_prototype(self):
+        builder = {"Type": "PredefinedPlantBuilder", "Id": 5, "Attributes": {"Plants": []}}
+        assert get_installed_capacity({"Agents": [builder]}).empty
+
+    def test_accumulate_capacities(self):
+        assert accumulate_capacities(get_installed_capacity(SCENARIO)) == 370
+
+    def test_capacities_by_technology(self):
+        by_technology = capacities_by_technology(get_installed_capacity(SCENARIO))
+        assert by_technology.to_dict() == {"NUCLEAR": 300, "PV": 50, "Storage": 20}
+
+    @pytest.mark.parametrize("scenario, expected", [(SCENARIO, True), ({"Agents": []}, False)])
+    def test_generation_capacity_available(self, scenario, expected):
+        capacities = get_installed_capacities([scenario], [Path(".")])
+        assert generation_capacity_available(capacities).tolist() == [expected]
+
+    def test_accumulate_capacities_by_candidate__includes_empty_candidates(self):
+        capacities = get_installed_capacities([{"Agents": []}, SCENARIO, {"Agents": []}], [Path(".")] * 3)
+        assert accumulate_capacities_by_candidate(capacities).tolist() == [0, 370, 0]
+
+    def test_estimate_scenarios(self):
+        scenarios = [SCENARIO, {"Agents": []}, SCENARIO]
+        assert estimate_scenarios(scenarios, [Path(".")] * 3) == [True, False, True]
+
+    def test_get_hours(self):
+        assert len(get_hours({"GeneralProperties": SIMULATION})) == 4
+        assert get_hours({"Agents": []}) is None
+
+    @pytest.mark.parametrize(
+        "demand, value_of_lost_load, expected",
+        [("demand.csv", 10000, 0.5), (120, 10000, 0.75), (120, 500, 0.0)],
+    )
+    def test_predict_scarcity_share(self, tmp_path, demand, value_of_lost_load, expected):
+        write_series(Path(tmp_path, "yield.csv"), [0.0, 0.5, 1.0, 0.5])
+        write_series(Path(tmp_path, "demand.csv"), [40, 120, 120, 120])
+        scenario = get_market(demand, value_of_lost_load)
+        assert predict_scarcity_share(scenario, tmp_path, scarcity_price=3000) == expected
+
+    @pytest.mark.parametrize(
+        "config, expected",
+        [
+            (None, (3000, 0.15)),
+            (
+                {"estimation": {"scarcity_margin": 2}, "evaluation": {"threshold_share_scarcity_hours": 0.2}},
+                (3000, 0.4),
+            ),
+            ({"estimation": {"scarcity_margin": None}}, None),
+            ({"evaluation": {"checks": []}}, None),
+        ],
+    )
+    def test_get_scarcity_settings(self, config, expected):
+        settings = get_scarcity_settings(config)
+        assert settings == (pytest.approx(expected) if expected else None)
+
+    def test_estimate_scenarios__rejects_predicted_scarcity(self, tmp_path):
+        write_series(Path(tmp_path, "yield.csv"), [0.0, 0.5, 1.0, 0.5])
+        scenarios = [get_market(40), get_market(120)]
+        assert estimate_scenarios(scenarios, [tmp_path] * 2) == [True, False]
+
+    def test_reduce_agent__keeps_estimation_inputs(self, tmp_path):
+        write_series(Path(tmp_path, "yield.csv"), [0.0, 0.5, 1.0, 0.5])
+        write_series(Path(tmp_path, "demand.csv"), [40, 120, 120, 120])
+        scenario = get_market("demand.csv")
+        scenario["Agents"][1]["Attributes"]["Strategy"] = {"Bids": "strategy.csv"}
+        reduced = {**scenario, "Agents": [reduce_agent(agent) for agent in scenario["Agents"]]}
+
+        assert "Type" not in reduced["Agents"][0]
+        assert "Strategy" not in reduced["Agents"][1]["Attributes"]
+        assert get_installed_capacity(reduced).equals(get_installed_capacity(scenario))
+        assert predict_scarcity_share(reduced, tmp_path, 3000) == predict_scarcity_share(scenario, tmp_path, 3000)
+        assert estimate_scenario(reduced, tmp_path) == estimate_scenario(scenario, tmp_path)
+        assert reduce_agent({"Type": "EnergyExchange", "Id": 1}) == {"Id": 1}
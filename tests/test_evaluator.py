@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from scengen.evaluator import (
+    scarcity_occurrence,
+    get_checks,
+    get_settings,
+    run_checks,
+    scale_thresholds,
+    Check,
+    get_check_key,
+    NAME_ENERGY_EXCHANGE,
+    NAME_ELECTRICITY_PRICE_COLUMN,
+    KEY_SCARCITY_PRICE,
+    KEY_THRESHOLD_SHARE_SCARCITY_HOURS,
+    KEY_SHORT_CIRCUIT,
+    METRIC_SCARCITY_HOURS,
+    METRIC_MEAN_PRICE,
+)
+
+
+def results_with_prices(prices: list[float]) -> dict:
+    return {NAME_ENERGY_EXCHANGE: {NAME_ELECTRICITY_PRICE_COLUMN: np.array(prices)}}
+
+
+class Test:
+    @pytest.mark.parametrize(
+        "prices, expected",
+        [
+            ([10, 20, 3000, 40, 50, 60, 70, 80, 90, 100], True),
+            ([10, 3000, 3000, 40, 50, 60, 70, 80, 90, 100], False),
+            ([10, 20, 30], True),
+        ],
+    )
+    def test_scarcity_occurrence(self, prices, expected):
+        settings = get_settings({}, get_checks(["scarcity_occurrence"]))
+        assert scarcity_occurrence(results_with_prices(prices), settings, {}) == expected
+
+    def test_scarcity_occurrence__metrics(self):
+        metrics = {}
+        scarcity_occurrence(results_with_prices([10, 3000, 20]), get_settings({}, get_checks()), metrics)
+        assert metrics == {METRIC_SCARCITY_HOURS: 1, METRIC_MEAN_PRICE: 1010}
+
+    def test_get_settings__config_overrides_defaults(self):
+        config = {"evaluation": {KEY_SCARCITY_PRICE: 100, KEY_THRESHOLD_SHARE_SCARCITY_HOURS: 0.5}}
+        settings = get_settings(config, get_checks())
+        assert settings[KEY_SCARCITY_PRICE] == 100
+        assert settings[KEY_THRESHOLD_SHARE_SCARCITY_HOURS] == 0.5
+        assert settings[KEY_SHORT_CIRCUIT] is True
+
+    def test_scale_thresholds__scales_only_thresholds(self):
+        settings = get_settings({}, get_checks(["scarcity_occurrence"]))
+        scaled = scale_thresholds(settings, 2)
+        assert scaled[KEY_THRESHOLD_SHARE_SCARCITY_HOURS] == 2 * settings[KEY_THRESHOLD_SHARE_SCARCITY_HOURS]
+        assert scaled[KEY_SCARCITY_PRICE] == settings[KEY_SCARCITY_PRICE]
+        assert scaled[KEY_SHORT_CIRCUIT] is True
+
+    def test_get_checks__unknown_check(self):
+        with pytest.raises(Exception):
+            get_checks(["not_a_check"])
+
+    @pytest.mark.parametrize("short_circuit, expected_calls", [(True, ["fail"]), (False, ["fail", "pass"])])
+    def test_run_checks__short_circuit(self, short_circuit, expected_calls):
+        calls = []
+
+        def record(name: str, decision: bool):
+            def function(_results, _settings, _metrics):
+                calls.append(name)
+                return decision
+
+            return Check(name, function, {}, {})
+
+        checks = [record("fail", False), record("pass", True)]
+        evaluation = run_checks({}, checks, {KEY_SHORT_CIRCUIT: short_circuit})
+        assert not evaluation.passed
+        assert evaluation.failed_checks == ["fail"]
+        assert calls == expected_calls
+
+    @pytest.mark.parametrize(
+        "changes, same_key",
+        [
+            ({KEY_SHORT_CIRCUIT: False, "other": 1}, True),
+            ({KEY_THRESHOLD_SHARE_SCARCITY_HOURS: 0.2}, False),
+        ],
+    )
+    def test_get_check_key__depends_on_declared_settings_only(self, changes, same_key):
+        check = get_checks(["scarcity_occurrence"])[0]
+        settings = get_settings({}, [check])
+        assert (get_check_key(check, settings) == get_check_key(check, {**settings, **changes})) == same_key
+
+    def test_get_check_key__depends_on_version(self):
+        check = get_checks(["scarcity_occurrence"])[0]
+        settings = get_settings({}, [check])
+        assert get_check_key(check, settings) != get_check_key(check._replace(version=2), settings)
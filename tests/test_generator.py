@@ -1,11 +1,74 @@
+from pathlib import Path
+
 import pytest
+import yaml
 from fameio.source.scenario import Contract
 
-from scengen.generation.digest import validate_input_range, digest_int_range, digest_float_range, get_agent_id, \
-    RANGE_INT_IDENTIFIER, RANGE_FLOAT_IDENTIFIER
-from scengen.generation.misc import create_new_unique_id, get_all_ids_from, \
-    extract_numbers_from_string, cast_numeric_strings
+from scengen.cli import CreateOptions, MaterializeOptions
+from scengen.files import compact_scenario, get_scenario_manifest_path
+
+from scengen.generation.digest import (
+    validate_input_range,
+    digest_int_range,
+    digest_float_range,
+    get_agent_id,
+    RANGE_INT_IDENTIFIER,
+    RANGE_FLOAT_IDENTIFIER,
+    set_value_at,
+    is_series_path,
+)
+from scengen.generation.misc import (
+    create_new_unique_id,
+    get_all_ids_from,
+    extract_numbers_from_string,
+    cast_numeric_strings,
+)
+from scengen.estimator import reduce_agent
 from scengen.generation.generator import Generator
+from scengen.workflow import materialize
+
+
+def write_config(directory: Path) -> Path:
+    agent = {"Type": "PV", "Id": "//PV", "Attributes": {"InstalledPowerInMW": "range_float(0; 100)"}}
+    Path(directory, "type_pv.yaml").write_text(yaml.safe_dump({"Agent": agent}))
+    template = {
+        "GeneralProperties": {"Seed": "range_int(1; 1000)"},
+        "Agents": [{"Type": "Demand", "Id": 1}],
+        "Contracts": [],
+    }
+    Path(directory, "template.yaml").write_text(yaml.safe_dump(template))
+    config = {
+        "defaults": {"base_name": "Test", "seed": 7, "trace_file": "trace.yaml"},
+        "base_template": "template.yaml",
+        "create": [{"type_template": "type_pv.yaml", "this_agent": "PV", "count": "range_int(1; 3)"}],
+    }
+    Path(directory, "config.yaml").write_text(yaml.safe_dump(config))
+    return Path(directory, "config.yaml")
+
+
+def write_config_with_contracts_first(directory: Path) -> Path:
+    contract = {
+        "SenderId": "//THIS_AGENT",
+        "ReceiverId": 1,
+        "ProductName": "Power",
+        "FirstDeliveryTime": 0,
+        "DeliveryIntervalInSteps": 3600,
+    }
+    agent = {"Type": "PV", "Id": "//PV", "Attributes": {"InstalledPowerInMW": "range_float(0; 100)"}}
+    Path(directory, "type_pv.yaml").write_text(yaml.safe_dump({"Agent": agent, "Contracts": [contract]}))
+    template = {
+        "GeneralProperties": {"Seed": "range_int(1; 1000)"},
+        "Contracts": [dict(contract, SenderId=1, ReceiverId=2)],
+        "Agents": [{"Type": "Demand", "Id": 1}, {"Type": "Exchange", "Id": 2}],
+    }
+    Path(directory, "template.yaml").write_text(yaml.safe_dump(template, sort_keys=False))
+    config = {
+        "defaults": {"base_name": "Test", "seed": 7, "trace_file": "trace.yaml"},
+        "base_template": "template.yaml",
+        "create": [{"type_template": "type_pv.yaml", "this_agent": "PV", "count": "range_int(2; 4)"}],
+    }
+    Path(directory, "config.yaml").write_text(yaml.safe_dump(config))
+    return Path(directory, "config.yaml")
 
 
 class Test:
@@ -41,38 +104,182 @@ class Test:
     @pytest.mark.parametrize(
         "contract, id_map, expected",
         [
-            (Contract(12, 12, "A", 1, 0, ), {"//THIS_AGENT": [123]}, [Contract(12, 12, "A", 1, 0, ).to_dict()]),
-            (Contract(12, "//THIS_AGENT", "A", 1, 0, ), {"//THIS_AGENT": [123]},
-             [Contract(12, 123, "A", 1, 0, ).to_dict()]),
-            (Contract(12, "//THIS_AGENT", "A", 1, 0, ), {"//THIS_AGENT": [123, 234]},
-             [Contract(12, 123, "A", 1, 0, ).to_dict(), Contract(12, 234, "A", 1, 0, ).to_dict()]),
-            (Contract("//dynamic", "//THIS_AGENT", "A", 1, 0, ), {"//THIS_AGENT": [123, 234], "//dynamic": [1]},
-             [Contract(1, 123, "A", 1, 0, ).to_dict(), Contract(1, 234, "A", 1, 0, ).to_dict()]),
-            (Contract("//dynamic", "//THIS_AGENT", "A", 1, 0, ),
-             {"//THIS_AGENT": [123, 234], "//dynamic2": [10], "//dynamic": [1]},
-             [Contract(1, 123, "A", 1, 0, ).to_dict(), Contract(1, 234, "A", 1, 0, ).to_dict()]),
-            (Contract("//dynamic", "//THIS_AGENT", "A", 1, 0, ), {"//THIS_AGENT": [123, 234], "//dynamic": [1, 11]},
-             [Contract(1, 123, "A", 1, 0, ).to_dict(), Contract(1, 234, "A", 1, 0, ).to_dict(),
-              Contract(11, 123, "A", 1, 0, ).to_dict(), Contract(11, 234, "A", 1, 0, ).to_dict()]),
+            (
+                Contract(
+                    12,
+                    12,
+                    "A",
+                    1,
+                    0,
+                ),
+                {"//THIS_AGENT": [123]},
+                [
+                    Contract(
+                        12,
+                        12,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict()
+                ],
+            ),
+            (
+                Contract(
+                    12,
+                    "//THIS_AGENT",
+                    "A",
+                    1,
+                    0,
+                ),
+                {"//THIS_AGENT": [123]},
+                [
+                    Contract(
+                        12,
+                        123,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict()
+                ],
+            ),
+            (
+                Contract(
+                    12,
+                    "//THIS_AGENT",
+                    "A",
+                    1,
+                    0,
+                ),
+                {"//THIS_AGENT": [123, 234]},
+                [
+                    Contract(
+                        12,
+                        123,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict(),
+                    Contract(
+                        12,
+                        234,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict(),
+                ],
+            ),
+            (
+                Contract(
+                    "//dynamic",
+                    "//THIS_AGENT",
+                    "A",
+                    1,
+                    0,
+                ),
+                {"//THIS_AGENT": [123, 234], "//dynamic": [1]},
+                [
+                    Contract(
+                        1,
+                        123,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict(),
+                    Contract(
+                        1,
+                        234,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict(),
+                ],
+            ),
+            (
+                Contract(
+                    "//dynamic",
+                    "//THIS_AGENT",
+                    "A",
+                    1,
+                    0,
+                ),
+                {"//THIS_AGENT": [123, 234], "//dynamic2": [10], "//dynamic": [1]},
+                [
+                    Contract(
+                        1,
+                        123,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict(),
+                    Contract(
+                        1,
+                        234,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict(),
+                ],
+            ),
+            (
+                Contract(
+                    "//dynamic",
+                    "//THIS_AGENT",
+                    "A",
+                    1,
+                    0,
+                ),
+                {"//THIS_AGENT": [123, 234], "//dynamic": [1, 11]},
+                [
+                    Contract(
+                        1,
+                        123,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict(),
+                    Contract(
+                        1,
+                        234,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict(),
+                    Contract(
+                        11,
+                        123,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict(),
+                    Contract(
+                        11,
+                        234,
+                        "A",
+                        1,
+                        0,
+                    ).to_dict(),
+                ],
+            ),
         ],
     )
     def test_create_contracts(self, contract: Contract, id_map: dict, expected: list[dict]):
-        result = Generator._create_contracts(contract, id_map)
+        result = list(Generator._create_contracts(contract, id_map))
         assert result == expected
+        assert Generator._count_contracts(contract, id_map) == len(expected)
 
     @pytest.mark.parametrize(
         "scenario, expected",
         [
             ({"Agents": [{"Type": "A", "Id": 2}, {"Type": "B", "Id": 4}, {"Type": "B", "Id": "PLACEHOLDER"}]}, [2, 4]),
             (
-                    {
-                        "Agents": [
-                            {"Type": "A", "Id": "PLACEHOLDER1"},
-                            {"Type": "B", "Id": "PLACEHOLDER2"},
-                            {"Type": "B", "Id": "PLACEHOLDER3"},
-                        ]
-                    },
-                    [],
+                {
+                    "Agents": [
+                        {"Type": "A", "Id": "PLACEHOLDER1"},
+                        {"Type": "B", "Id": "PLACEHOLDER2"},
+                        {"Type": "B", "Id": "PLACEHOLDER3"},
+                    ]
+                },
+                [],
             ),
         ],
     )
@@ -83,8 +290,9 @@ class Test:
     def test_digest_int_range__valid_input(self, values, expected):
         assert digest_int_range(values) == expected
 
-    @pytest.mark.parametrize("values, expected",
-                             [("range_float(0; 4.2)", (0, 4.2)), ("RaNGE_float(-10.999; 30.1)", (-10.999, 30.1))])
+    @pytest.mark.parametrize(
+        "values, expected", [("range_float(0; 4.2)", (0, 4.2)), ("RaNGE_float(-10.999; 30.1)", (-10.999, 30.1))]
+    )
     def test_digest_float_range__valid_input(self, values, expected):
         assert digest_float_range(values) == expected
 
@@ -102,8 +310,9 @@ class Test:
     def test_extract_ints_from_string(self, values, expected):
         assert extract_numbers_from_string(values, RANGE_INT_IDENTIFIER) == expected
 
-    @pytest.mark.parametrize("values, expected",
-                             [("range_float(0, 4.0)", "0, 4.0"), ("RaNgE_FlOAT(1.2, 23.2", "1.2, 23.2")])
+    @pytest.mark.parametrize(
+        "values, expected", [("range_float(0, 4.0)", "0, 4.0"), ("RaNgE_FlOAT(1.2, 23.2", "1.2, 23.2")]
+    )
     def test_extract_floats_from_string(self, values, expected):
         assert extract_numbers_from_string(values, RANGE_FLOAT_IDENTIFIER) == expected
 
@@ -128,3 +337,87 @@ class Test:
     )
     def test_cast_numeric_strings(self, values, expected):
         assert cast_numeric_strings(values) == expected
+
+    def test_set_value_at(self):
+        scenario = {"Agents": [{"Id": 1}, {"Id": 2, "Attributes": {"Loads": [{"Value": 1}]}}]}
+        set_value_at(scenario, "Agents/1/Attributes/Loads/0/Value", 5)
+        assert scenario["Agents"][1]["Attributes"]["Loads"][0]["Value"] == 5
+
+    @pytest.mark.parametrize(
+        "key, value, expected",
+        [
+            ("Agents/1/Attributes/Loads/0/DemandSeries", "timeseries/load.CSV", True),
+            ("Agents/1/Attributes/Loads/0/DemandSeries", 1000, False),
+            ("Agents/1/Type", "file.csv", False),
+            ("GeneralProperties/Output/File", "file.csv", False),
+        ],
+    )
+    def test_is_series_path(self, key, value, expected):
+        assert is_series_path(key, value) == expected
+
+    def test_materialize__compact_roundtrip_byte_identical(self, tmp_path):
+        config_path = write_config(tmp_path)
+        options = {
+            CreateOptions.CONFIG: config_path,
+            CreateOptions.DIRECTORY: Path(tmp_path, "out"),
+            CreateOptions.NUMBER: 2,
+        }
+        generator = Generator(options)
+        generator.generate_scenarios()
+        scenario_path = generator.options["scenario_path"]
+        original = scenario_path.read_bytes()
+        compact_scenario(generator.options, generator.get_manifest())
+        Path(tmp_path, "trace.yaml").unlink()
+        config = config_path.read_bytes()
+
+        materialize(
+            {
+                MaterializeOptions.CONFIG: config_path,
+                MaterializeOptions.MANIFEST: [get_scenario_manifest_path(scenario_path)],
+            }
+        )
+
+        assert scenario_path.read_bytes() == original
+        assert config_path.read_bytes() == config
+        assert not Path(tmp_path, "trace.yaml").exists()
+
+    def test_generate_scenarios__streamed_equals_in_memory_with_contracts_before_agents(self, tmp_path):
+        config_path = write_config_with_contracts_first(tmp_path)
+        options = {CreateOptions.CONFIG: config_path, CreateOptions.DIRECTORY: tmp_path, CreateOptions.STREAM: True}
+        streamed = Generator(options)
+        streamed.generate_scenarios()
+        in_memory = Generator(dict(options, random_seed=streamed.options["random_seed"]), trace_file={"total_count": 0})
+
+        expected = in_memory.generate_in_memory(streamed.sampler.index)
+
+        assert yaml.safe_load(streamed.options["scenario_path"].read_text()) == expected
+        assert len(expected["Contracts"]) > 1
+        assert streamed.estimation_agents == [reduce_agent(agent) for agent in expected["Agents"]]
+
+    def test_generate_variant__redraws_only_varied_fields_reproducibly(self, tmp_path):
+        options = {CreateOptions.CONFIG: write_config(tmp_path), CreateOptions.DIRECTORY: Path(tmp_path, "out")}
+        base = Generator(dict(options))
+        base.generate_base()
+        varied = "Agents/*/Attributes/InstalledPowerInMW"
+        variant = Generator(dict(options))
+        variant.generate_variant(base, [varied])
+        trace_file = {"total_count": 0, "generated_count": variant.sampler.index}
+        repeated = Generator(dict(options), trace_file)
+        repeated.generate_variant(base, [varied])
+
+        varied_keys = [key for key in base.sampler.values if key.endswith("InstalledPowerInMW")]
+        assert varied_keys
+        for key, value in base.sampler.values.items():
+            if key in varied_keys:
+                assert variant.sampler.values[key] != value
+            else:
+                assert variant.sampler.values[key] == value
+        assert variant.scenario["GeneralProperties"] == base.scenario["GeneralProperties"]
+        base_agents, variant_agents = base.scenario["Agents"], variant.scenario["Agents"]
+        assert [agent["Id"] for agent in variant_agents] == [agent["Id"] for agent in base_agents]
+        assert all(
+            varied_agent["Attributes"] != base_agent["Attributes"]
+            for varied_agent, base_agent in zip(variant_agents, base_agents)
+            if varied_agent["Type"] == "PV"
+        )
+        assert repeated.scenario == variant.scenario
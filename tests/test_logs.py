@@ -0,0 +1,36 @@
+import multiprocessing
+from pathlib import Path
+
+from scengen.logs import scengen_logger, log, shutdown_logger, get_log_queue, worker_logger
+
+
+def _log_from_worker(queue, message: str) -> None:
+    worker_logger(queue, "info")
+    log().info(message)
+
+
+class Test:
+    def test_scengen_logger__queue_writes_file(self, tmp_path):
+        log_file = Path(tmp_path, "scengen.log")
+        scengen_logger("info", log_file, use_queue=True)
+        log().info("Message %s", 42)
+        log().debug("Skipped %s", 43)
+        shutdown_logger()
+        content = log_file.read_text()
+        assert "Message 42" in content
+        assert "Skipped" not in content
+        scengen_logger("warning")
+
+    def test_scengen_logger__worker_forwards_to_queue(self, tmp_path):
+        log_file = Path(tmp_path, "scengen.log")
+        scengen_logger("info", log_file, use_queue=True)
+        process = multiprocessing.Process(target=_log_from_worker, args=(get_log_queue(), "From worker"))
+        process.start()
+        process.join()
+        shutdown_logger()
+        assert "From worker" in log_file.read_text()
+        scengen_logger("warning")
+
+    def test_get_log_queue__none_without_queue(self):
+        scengen_logger("warning")
+        assert get_log_queue() is None
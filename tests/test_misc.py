@@ -1,8 +1,23 @@
 from pathlib import Path
+from threading import Event
 
 import pytest
+import yaml
 
-from scengen.files import check_if_valid_yaml_path
+from scengen.cli import CreateOptions
+from scengen.files import (
+    check_if_valid_yaml_path,
+    StreamingYamlWriter,
+    discard_in_background,
+    wait_for_background_tasks,
+    working_directory,
+    get_scenario_directory,
+    append_to_manifest,
+    read_manifest,
+    get_scenario_manifest_path,
+    append_to_rejections,
+    run_in_background,
+)
 
 
 class Test:
@@ -14,3 +29,77 @@ class Test:
     def test_check_if_valid_yaml_path__invalid(self, path):
         with pytest.raises(Exception):
             check_if_valid_yaml_path(Path(path))
+
+    def test_streaming_yaml_writer__equals_full_dump(self, tmp_path):
+        content = {"Agents": [{"Id": 1}, {"Id": 2, "Attributes": {"A": [1, 2]}}], "Contracts": [], "Schema": {"X": 1}}
+        writer = StreamingYamlWriter(Path(tmp_path, "scenario.yaml"))
+        for agent in content["Agents"]:
+            writer.append("Agents", agent)
+        writer.close(content)
+        assert Path(tmp_path, "scenario.yaml").read_text() == yaml.safe_dump(content)
+
+    def test_streaming_yaml_writer__non_consecutive_section(self, tmp_path):
+        writer = StreamingYamlWriter(Path(tmp_path, "scenario.yaml"))
+        writer.append("Agents", {"Id": 1})
+        writer.append("Contracts", {"SenderId": 1})
+        with pytest.raises(Exception):
+            writer.append("Agents", {"Id": 2})
+
+    def test_discard_in_background__frees_name_immediately(self, tmp_path):
+        path = Path(tmp_path, "scenario_0")
+        Path(path, "sub").mkdir(parents=True)
+        discard_in_background(path)
+        assert not path.exists()
+        wait_for_background_tasks()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_run_in_background__relative_path_unaffected_by_working_directory(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        Path(tmp_path, "output").mkdir()
+        started, paths = Event(), []
+        run_in_background("test", 1, lambda path: started.wait() and paths.append(path.exists()), Path("output"))
+        with working_directory(Path(tmp_path, "scratch")):
+            started.set()
+            wait_for_background_tasks()
+        assert paths == [True]
+
+    def test_working_directory__restores_origin(self, tmp_path):
+        origin = Path.cwd()
+        with working_directory(Path(tmp_path, "scratch")):
+            assert Path.cwd() == Path(tmp_path, "scratch").resolve()
+        assert Path.cwd() == origin
+
+    @pytest.mark.parametrize(
+        "shard_size, scenario_number, expected",
+        [(0, 1234, "out"), (None, 7, "out"), (1000, 999, "out/0"), (1000, 1234, "out/1"), (10, 1234, "out/123")],
+    )
+    def test_get_scenario_directory(self, shard_size, scenario_number, expected):
+        options = {CreateOptions.DIRECTORY: Path("out"), CreateOptions.SHARD_SIZE: shard_size}
+        assert get_scenario_directory(options, scenario_number) == Path(expected)
+
+    def test_manifest__round_trip(self, tmp_path):
+        options = {CreateOptions.DIRECTORY: tmp_path, CreateOptions.SHARD_SIZE: 1000}
+        for number in [5, 1234]:
+            options["scenario_path"] = Path(get_scenario_directory(options, number), f"scenario_{number}.yaml")
+            append_to_manifest(options, number)
+        assert read_manifest(tmp_path) == {
+            5: Path(tmp_path, "0", "scenario_5.yaml"),
+            1234: Path(tmp_path, "1", "scenario_1234.yaml"),
+        }
+
+    def test_manifest__lists_compact_manifest_as_stored(self, tmp_path):
+        options = {CreateOptions.DIRECTORY: tmp_path, CreateOptions.SHARD_SIZE: 1000, CreateOptions.COMPACT: True}
+        options["scenario_path"] = Path(get_scenario_directory(options, 5), "scenario_5.yaml")
+        append_to_manifest(options, 5)
+        assert read_manifest(tmp_path) == {5: Path(tmp_path, "0", "scenario_5.manifest.yaml")}
+
+    def test_get_scenario_manifest_path(self):
+        expected = Path("out", "1", "Demo_1234.manifest.yaml")
+        assert get_scenario_manifest_path(Path("out", "1", "Demo_1234.yaml")) == expected
+
+    def test_append_to_rejections__one_line_per_rejection(self, tmp_path):
+        options = {CreateOptions.DIRECTORY: tmp_path}
+        append_to_rejections(options, 3, "scarcity_occurrence")
+        append_to_rejections(options, 7, "deterministic: ValueError('a;b\nc')")
+        lines = Path(tmp_path, "rejections.csv").read_text().splitlines()
+        assert lines == ["index;reason", "3;scarcity_occurrence", "7;deterministic: ValueError('a,b c')"]
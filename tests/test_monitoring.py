@@ -0,0 +1,92 @@
+import json
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from scengen import monitoring
+from scengen.cli import CreateOptions
+from scengen.evaluator import Evaluation
+from scengen.monitoring import (
+    NAME_STATUS,
+    Progress,
+    REASON_ESTIMATION,
+    REASON_FAILURE,
+    record_rejected,
+    record_simulated,
+    record_started,
+    start_monitoring,
+    stop_monitoring,
+)
+from scengen.profiling import stage
+
+
+@pytest.fixture
+def directory(tmp_path: Path):
+    start_monitoring({tmp_path: 4}, port=0)
+    yield tmp_path
+    stop_monitoring()
+
+
+def get_metrics() -> str:
+    host, port = monitoring._monitor._server.server_address[:2]
+    with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+        return response.read().decode("utf-8")
+
+
+class Test:
+    def test_progress__eta_from_accepted_per_hour(self):
+        progress = Progress(Path("out"), target=4)
+        progress.started -= 3600
+        progress.accepted = 1
+        status = progress.get_status()
+        assert status["accepted_per_hour"] == pytest.approx(1, rel=1e-3)
+        assert status["eta_in_s"] == pytest.approx(3 * 3600, rel=1e-3)
+
+    def test_progress__no_accepted__eta_unknown(self):
+        assert Progress(Path("out"), target=4).get_status()["eta_in_s"] is None
+
+    def test_progress__reject__counts_scenario_and_each_reason(self):
+        progress = Progress(Path("out"), target=4)
+        progress.reject(["a", "b"])
+        progress.reject(["a"])
+        assert progress.rejected == 2
+        assert progress.rejections == {"a": 2, "b": 1}
+
+    def test_record__counts_outcomes(self, directory):
+        options = {CreateOptions.DIRECTORY: directory}
+        record_rejected(options, REASON_ESTIMATION, 2)
+        evaluations = [Evaluation(True, [], {}), Evaluation(False, ["scarcity"], {}), Evaluation(False, [], {}, "x")]
+        for evaluation in evaluations:
+            record_started(options)
+            record_simulated(options, evaluation, accepted=evaluation.passed)
+        record_started(options)
+        progress = monitoring._monitor.get(options)
+        assert (progress.accepted, progress.rejected, progress.in_flight) == (1, 4, 1)
+        assert progress.rejections == {REASON_ESTIMATION: 2, "scarcity": 1, REASON_FAILURE: 1}
+
+    def test_record__untracked_directory__ignored(self, directory, tmp_path):
+        record_started({CreateOptions.DIRECTORY: Path(tmp_path, "other")})
+        assert monitoring._monitor.get({CreateOptions.DIRECTORY: directory}).in_flight == 0
+
+    def test_record__disabled__ignored(self, tmp_path):
+        record_started({CreateOptions.DIRECTORY: tmp_path})
+        assert not Path(tmp_path, NAME_STATUS).exists()
+
+    def test_stop_monitoring__writes_status_with_stage_durations(self, tmp_path):
+        start_monitoring({tmp_path: 2})
+        with stage("generate_scenarios", None):
+            pass
+        stop_monitoring()
+        status = json.loads(Path(tmp_path, NAME_STATUS).read_text())
+        assert status["target"] == 2
+        assert set(status["stage_durations_in_s"]) == {"generate_scenarios"}
+
+    def test_metrics__prometheus_text_with_labels(self, directory):
+        options = {CreateOptions.DIRECTORY: directory}
+        record_rejected(options, 'check "quoted"')
+        metrics = get_metrics()
+        assert "# TYPE scengen_rejections_total counter" in metrics
+        assert f'scengen_target_scenarios{{directory="{directory}"}} 4' in metrics
+        assert f'scengen_rejections_total{{directory="{directory}",reason="check \\"quoted\\""}} 1' in metrics
+        assert not any(line.startswith("scengen_eta_seconds") for line in metrics.splitlines())
@@ -0,0 +1,114 @@
+import pstats
+from pathlib import Path
+
+import pytest
+
+from scengen import profiling
+from scengen.profiling import (
+    NAME_PROFILES_FOLDER,
+    StageDurations,
+    add_duration,
+    disable_profiling,
+    disable_timing,
+    enable_profiling,
+    enable_timing,
+    stage,
+)
+
+
+def allocate() -> list:
+    return [bytearray(1024) for _ in range(100)]
+
+
+@pytest.fixture
+def profiles(tmp_path: Path):
+    enable_profiling(tmp_path)
+    yield Path(tmp_path, NAME_PROFILES_FOLDER)
+    disable_profiling()
+
+
+class Test:
+    def test_stage__disabled__returns_no_op_context(self):
+        assert stage("outer", 1) is profiling._NOT_PROFILING
+
+    def test_stage__missing_key__returns_no_op_context(self, profiles):
+        assert stage("outer", None) is profiling._NOT_PROFILING
+
+    def test_stage__nested__writes_stats_per_stage(self, profiles):
+        with stage("outer", 3):
+            with stage("inner", 3):
+                allocate()
+        folder = Path(profiles, "3")
+        inner = pstats.Stats(str(Path(folder, "inner.prof")))
+        outer = pstats.Stats(str(Path(folder, "outer.prof")))
+        assert any(function == "allocate" for _, _, function in inner.stats)
+        assert not any(function == "allocate" for _, _, function in outer.stats)
+
+    def test_stage__nested__allocations_include_nested_stages(self, profiles):
+        with stage("outer", 3):
+            with stage("inner", 3):
+                kept = allocate()
+        assert "test_profiling.py" in Path(profiles, "3", "outer.allocations.txt").read_text()
+        assert "test_profiling.py" in Path(profiles, "3", "inner.allocations.txt").read_text()
+        assert kept
+
+    def test_stage__repeated__adds_to_existing_stats(self, profiles):
+        for _ in range(2):
+            with stage("outer", 1):
+                allocate()
+        stats = pstats.Stats(str(Path(profiles, "1", "outer.prof")))
+        calls = [values[1] for (_, _, function), values in stats.stats.items() if function == "allocate"]
+        assert calls == [2]
+
+    def test_stage__repeated__merges_allocations(self, profiles):
+        kept = []
+        for _ in range(2):
+            with stage("outer", 1):
+                kept.append(allocate())
+        lines = Path(profiles, "1", "outer.allocations.txt").read_text().splitlines()
+        locations = [line.rpartition(": ")[0] for line in lines]
+        sizes = [int(line.rpartition(": ")[2].split(" ")[0]) for line in lines]
+        assert len(set(locations)) == len(locations) <= profiling.TOP_ALLOCATIONS
+        assert sizes == sorted(sizes, reverse=True)
+        assert sizes[0] >= 2 * 100 * 1024
+
+    def test_stage__without_allocations__writes_no_allocations(self, profiles):
+        with stage("outer", 1, allocations=False):
+            allocate()
+        assert Path(profiles, "1", "outer.prof").exists()
+        assert not Path(profiles, "1", "outer.allocations.txt").exists()
+
+    def test_disable_profiling__stops_tracing(self, profiles):
+        disable_profiling()
+        assert not profiling.tracemalloc.is_tracing()
+        assert stage("outer", 1) is profiling._NOT_PROFILING
+
+    def test_stage_durations__mean_per_call(self):
+        durations = StageDurations()
+        durations.add("outer", 1.0)
+        durations.add("outer", 3.0)
+        with durations.time("inner"):
+            pass
+        means = durations.means()
+        assert means["outer"] == 2.0
+        assert 0 <= means["inner"] < 1
+
+    def test_stage__timing_enabled__times_without_key(self):
+        durations = enable_timing()
+        try:
+            with stage("outer", None):
+                pass
+            add_duration("simulation", 4.0)
+        finally:
+            disable_timing()
+        assert set(durations.means()) == {"outer", "simulation"}
+        assert stage("outer", None) is profiling._NOT_PROFILING
+
+    def test_stage__timing_enabled__skips_stages_without_allocations(self):
+        durations = enable_timing()
+        try:
+            assert stage("per_agent", None, allocations=False) is profiling._NOT_PROFILING
+            add_duration("simulation", 6.0, count=3)
+        finally:
+            disable_timing()
+        assert durations.totals() == {"simulation": (3, 6.0)}
@@ -0,0 +1,114 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import yaml
+
+from scengen import reevaluation
+from scengen.cli import EvaluateOptions, GeneralOptions
+from scengen.evaluator import NAME_ENERGY_EXCHANGE, NAME_ELECTRICITY_PRICE_COLUMN
+from scengen.files import NAME_MANIFEST
+from scengen.reevaluation import reevaluate, evaluate_folder, NAME_EVALUATION, NAME_EVALUATION_CACHE
+
+
+def write_prices(directory: Path, prices: list[float]) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    rows = "".join(f"1;{hour * 3600};{price}\n" for hour, price in enumerate(prices))
+    header = f"AgentId;TimeStep;{NAME_ELECTRICITY_PRICE_COLUMN}\n"
+    Path(directory, f"{NAME_ENERGY_EXCHANGE}.csv").write_text(header + rows)
+
+
+def write_config(path: Path, threshold: float) -> Path:
+    path.write_text(yaml.safe_dump({"evaluation": {"threshold_share_scarcity_hours": threshold}}))
+    return path
+
+
+@pytest.fixture
+def outputs(tmp_path: Path) -> Path:
+    directory = Path(tmp_path, "scenarios")
+    write_prices(Path(directory, "0", "Demo_0"), [50.0] * 9 + [3000.0])
+    write_prices(Path(directory, "0", "Demo_1"), [50.0] * 7 + [3000.0] * 3)
+    manifest = "scenario_number;scenario_path\n0;0/Demo_0.yaml\n1;0/Demo_1.manifest.yaml\n"
+    Path(directory, NAME_MANIFEST).write_text(manifest)
+    return directory
+
+
+@pytest.fixture
+def serial_pool(monkeypatch):
+    """Evaluates folders in this process and records evaluated folder names"""
+    evaluated = []
+
+    class Pool:
+        def __init__(self, **_kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *_args):
+            return False
+
+        @staticmethod
+        def map(function, *iterables, chunksize=1):
+            for arguments in zip(*iterables):
+                evaluated.append(arguments[0].name)
+                yield function(*arguments)
+
+    monkeypatch.setattr(reevaluation, "ProcessPoolExecutor", Pool)
+    return evaluated
+
+
+def run(directory: Path, config: Path) -> pd.DataFrame:
+    options = {
+        EvaluateOptions.CONFIG: config,
+        EvaluateOptions.DIRECTORY: directory,
+        EvaluateOptions.WORKERS: 2,
+        GeneralOptions.LOG_QUEUE: False,
+        GeneralOptions.LOG: "error",
+    }
+    reevaluate(options)
+    return pd.read_csv(Path(directory, NAME_EVALUATION), sep=";")
+
+
+class Test:
+    def test_reevaluate__writes_outcome_per_scenario(self, outputs, tmp_path, serial_pool):
+        table = run(outputs, write_config(Path(tmp_path, "config.yaml"), 0.2))
+        assert table["scenario_number"].tolist() == [0, 1]
+        assert table["folder"].tolist() == ["0/Demo_0", "0/Demo_1"]
+        assert table["passed"].tolist() == [True, False]
+        assert table["failed_checks"].fillna("").tolist() == ["", "scarcity_occurrence"]
+        assert table["scarcity_hours"].tolist() == [1, 3]
+        assert Path(outputs, NAME_EVALUATION_CACHE).exists()
+
+    def test_reevaluate__repeated__uses_cache(self, outputs, tmp_path, serial_pool):
+        config = write_config(Path(tmp_path, "config.yaml"), 0.2)
+        run(outputs, config)
+        serial_pool.clear()
+        table = run(outputs, config)
+        assert serial_pool == []
+        assert table["passed"].tolist() == [True, False]
+
+    def test_reevaluate__changed_threshold__evaluates_again(self, outputs, tmp_path, serial_pool):
+        run(outputs, write_config(Path(tmp_path, "config.yaml"), 0.2))
+        serial_pool.clear()
+        table = run(outputs, write_config(Path(tmp_path, "strict.yaml"), 0.05))
+        assert serial_pool == ["Demo_0", "Demo_1"]
+        assert table["passed"].tolist() == [False, False]
+
+    def test_reevaluate__changed_outputs__evaluates_changed_folder_only(self, outputs, tmp_path, serial_pool):
+        config = write_config(Path(tmp_path, "config.yaml"), 0.2)
+        run(outputs, config)
+        serial_pool.clear()
+        write_prices(Path(outputs, "0", "Demo_1"), [50.0] * 10)
+        table = run(outputs, config)
+        assert serial_pool == ["Demo_1"]
+        assert table["passed"].tolist() == [True, True]
+
+    def test_reevaluate__no_outputs(self, tmp_path, serial_pool):
+        with pytest.raises(Exception):
+            run(tmp_path, write_config(Path(tmp_path, "config.yaml"), 0.2))
+
+    def test_evaluate_folder__unreadable_outputs__returns_error(self, tmp_path):
+        Path(tmp_path, f"{NAME_ENERGY_EXCHANGE}.csv").write_text("AgentId;TimeStep\n1;0\n")
+        outcome = evaluate_folder(tmp_path, ["scarcity_occurrence"], {})
+        assert isinstance(outcome, str)
@@ -0,0 +1,45 @@
+import math
+
+from scengen.results import CampaignResults, load_campaign_results, load_campaign_records, COLUMN_SCENARIO_NUMBER
+
+
+class Test:
+    def test_campaign_results__roundtrip(self, tmp_path):
+        results = CampaignResults(tmp_path)
+        results.append(0, {"a": 1, "b": 2.5})
+        results.append(1, {"a": 3, "b": 4.5})
+        loaded = load_campaign_results(tmp_path)
+        assert list(loaded.columns) == [COLUMN_SCENARIO_NUMBER, "a", "b"]
+        assert loaded["b"].tolist() == [2.5, 4.5]
+
+    def test_campaign_results__fields_of_later_scenarios_are_stored(self, tmp_path):
+        results = CampaignResults(tmp_path)
+        results.append(0, {"a": 1, "b": 2})
+        results.append(1, {"a": 3, "c": 5})
+        loaded = load_campaign_results(tmp_path)
+        assert list(loaded.columns) == [COLUMN_SCENARIO_NUMBER, "a", "b", "c"]
+        assert math.isnan(loaded["b"].iloc[1])
+        assert math.isnan(loaded["c"].iloc[0])
+        assert loaded["c"].iloc[1] == 5
+
+    def test_campaign_results__rows_in_order_of_storage(self, tmp_path):
+        results = CampaignResults(tmp_path)
+        results.append(7, {"a": 1})
+        results.append(2, {"a": 2})
+        assert load_campaign_results(tmp_path)[COLUMN_SCENARIO_NUMBER].tolist() == [7, 2]
+
+    def test_campaign_results__resume(self, tmp_path):
+        CampaignResults(tmp_path).append(0, {"a": 1})
+        CampaignResults(tmp_path).append(1, {"b": 2, "a": 2})
+        loaded = load_campaign_results(tmp_path)
+        assert loaded["a"].tolist() == [1, 2]
+        assert loaded["b"].tolist()[1] == 2
+
+    def test_load_campaign_records__long_format(self, tmp_path):
+        CampaignResults(tmp_path).append(3, {"a": 1, "b": 2})
+        records, fields = load_campaign_records(tmp_path)
+        assert fields == ["a", "b"]
+        assert records.values.tolist() == [[3, 0, 1], [3, 1, 2]]
+
+    def test_load_campaign_results__empty(self, tmp_path):
+        assert load_campaign_results(tmp_path).empty
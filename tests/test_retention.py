@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+
+from scengen import retention
+from scengen.evaluator import read_output, NAME_ENERGY_EXCHANGE, NAME_ELECTRICITY_PRICE_COLUMN
+from scengen.files import wait_for_background_tasks
+from scengen.retention import get_retention_settings, retain_outputs, retain_in_background, KEY_REQUIRED
+
+PRICES = f"AgentId;TimeStep;{NAME_ELECTRICITY_PRICE_COLUMN}\n1;0;50.0\n1;3600;3000.0\n"
+
+
+def write_outputs(directory: Path) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    Path(directory, f"{NAME_ENERGY_EXCHANGE}.csv").write_text(PRICES)
+    Path(directory, "ConventionalPlantOperator.csv").write_text("AgentId;TimeStep;Value\n5;0;1.0\n")
+    Path(directory, "StorageTrader.csv").write_text("AgentId;TimeStep;Value\n7;0;2.0\n")
+    return directory
+
+
+class Test:
+    def test_get_retention_settings__missing_section(self):
+        assert get_retention_settings({}) is None
+
+    def test_get_retention_settings__defaults_and_required_files(self):
+        settings = get_retention_settings({"retention": None})
+        assert settings["format"] == "gzip"
+        assert settings["keep"] is None
+        assert NAME_ENERGY_EXCHANGE in settings[KEY_REQUIRED]
+
+    def test_get_retention_settings__unknown_format(self):
+        with pytest.raises(Exception):
+            get_retention_settings({"retention": {"format": "rar"}})
+
+    @pytest.mark.parametrize("file_format, package", [("parquet", "pyarrow"), ("zstd", "zstandard")])
+    def test_get_retention_settings__missing_package(self, monkeypatch, file_format, package):
+        monkeypatch.setattr(retention, package, None)
+        with pytest.raises(Exception):
+            get_retention_settings({"retention": {"format": file_format}})
+
+    def test_retain_outputs__compresses_and_keeps_matching(self, tmp_path):
+        directory = write_outputs(Path(tmp_path, "Demo_0"))
+        settings = get_retention_settings({"retention": {"keep": ["Conventional*"]}})
+        retain_outputs(directory, settings)
+        assert sorted(path.name for path in directory.iterdir()) == [
+            "ConventionalPlantOperator.csv.gz",
+            f"{NAME_ENERGY_EXCHANGE}.csv.gz",
+        ]
+        prices = read_output(directory, NAME_ENERGY_EXCHANGE, [NAME_ELECTRICITY_PRICE_COLUMN])
+        assert prices[NAME_ELECTRICITY_PRICE_COLUMN].tolist() == [50.0, 3000.0]
+
+    def test_retain_outputs__format_none_only_filters(self, tmp_path):
+        directory = write_outputs(Path(tmp_path, "Demo_0"))
+        retain_outputs(directory, get_retention_settings({"retention": {"format": "none", "keep": []}}))
+        assert [path.name for path in directory.iterdir()] == [f"{NAME_ENERGY_EXCHANGE}.csv"]
+
+    def test_retain_outputs__failed_conversion_keeps_csv(self, monkeypatch, tmp_path):
+        directory = write_outputs(Path(tmp_path, "Demo_0"))
+
+        def fail(*_args):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(retention.shutil, "copyfileobj", fail)
+        retain_outputs(directory, get_retention_settings({"retention": {}}))
+        assert sorted(path.suffix for path in directory.iterdir()) == [".csv"] * 3
+
+    def test_retain_in_background(self, tmp_path):
+        directory = write_outputs(Path(tmp_path, "Demo_0"))
+        retain_in_background(directory, get_retention_settings({"retention": {}}))
+        wait_for_background_tasks()
+        assert sorted(path.suffixes[-1] for path in directory.iterdir()) == [".gz"] * 3
+
+    def test_read_output__missing(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            read_output(tmp_path, NAME_ENERGY_EXCHANGE)
@@ -0,0 +1,202 @@
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+import yaml
+
+from scengen import profiling, runner
+from scengen.cli import CreateOptions, GeneralOptions
+from scengen.evaluator import Evaluation
+from scengen.profiling import STAGE_SIMULATION
+from scengen.files import read_yaml_scalars, copy_yaml_replacing_scalars
+from scengen.runner import (
+    classify_failure,
+    FailureKind,
+    simulate,
+    simulate_timed,
+    shorten_horizon,
+    PREFIX_SHORT_RUN,
+    KEYS_START_TIME,
+    KEYS_STOP_TIME,
+    KEY_SHORT_RUN,
+    get_short_run_settings,
+)
+
+
+def get_options(retries: int) -> dict:
+    return {CreateOptions.RETRIES: retries, CreateOptions.SKIP_EVALUATION: True, "scenario_name": "Test_0"}
+
+
+def get_scenario(start: str = "2018-12-31_23:58:00", stop: str = "2019-12-31_23:58:00") -> dict:
+    return {"GeneralProperties": {"Simulation": {"StartTime": start, "StopTime": stop}}}
+
+
+def get_short_run_options(tmp_path: Path) -> dict:
+    scenario_path = Path(tmp_path, "Test_0.yaml")
+    scenario_path.write_text(yaml.safe_dump(get_scenario()))
+    options = get_options(retries=0)
+    options.update({CreateOptions.SKIP_EVALUATION: False, "scenario_path": scenario_path})
+    options[KEY_SHORT_RUN] = get_short_run_settings({"short_run": {"days": 7}}, options)
+    return options
+
+
+def run_amiris_recording_cwd(options: dict) -> None:
+    Path("input.pb").write_text(options[runner.amiris.RunOptions.SCENARIO].name)
+    time.sleep(0.5)
+    output = Path(options[runner.amiris.RunOptions.OUTPUT])
+    output.mkdir(parents=True)
+    Path(output, "run.txt").write_text(f"{os.getcwd()}\n{Path('input.pb').read_text()}")
+
+
+def get_run_options(directory: Path, name: str) -> dict:
+    options = get_options(retries=0)
+    options.update(
+        {
+            CreateOptions.JAR: Path("amiris.jar"),
+            CreateOptions.SCRATCH: None,
+            CreateOptions.OUTPUT_OPTIONS: "",
+            CreateOptions.NO_CHECKS: True,
+            GeneralOptions.LOG: "error",
+            GeneralOptions.LOGFILE: None,
+            "scenario_name": name,
+            "scenario_path": Path(directory, name + ".yaml"),
+        }
+    )
+    return options
+
+
+class Test:
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            (subprocess.CalledProcessError(137, "java"), FailureKind.TRANSIENT),
+            (subprocess.CalledProcessError(3, "java"), FailureKind.TRANSIENT),
+            (subprocess.CalledProcessError(1, "java"), FailureKind.DETERMINISTIC),
+            (MemoryError(), FailureKind.TRANSIENT),
+            (OSError("disk full"), FailureKind.TRANSIENT),
+            (FileNotFoundError("DayAheadMarketSingleZone.csv"), FailureKind.DETERMINISTIC),
+            (ValueError("invalid scenario"), FailureKind.DETERMINISTIC),
+        ],
+    )
+    def test_classify_failure(self, error, expected):
+        assert classify_failure(error) is expected
+
+    def test_simulate__transient_failure_retried(self, monkeypatch):
+        errors = [OSError("I/O error")]
+
+        def execute(_options):
+            if errors:
+                raise errors.pop()
+
+        monkeypatch.setattr(runner, "execute_scenario", execute)
+        monkeypatch.setattr(runner, "RETRY_BACKOFF_IN_S", 0)
+        evaluation = simulate(get_options(retries=1))
+        assert evaluation.passed and evaluation.failure is None
+
+    def test_simulate_timed__returns_durations_of_simulation_only(self, monkeypatch):
+        monkeypatch.setattr(runner, "execute_scenario", lambda _options: None)
+        evaluation, durations = simulate_timed(get_options(retries=0))
+        assert evaluation.passed
+        assert list(durations) == [STAGE_SIMULATION] and durations[STAGE_SIMULATION][0] == 1
+        assert runner.stage(STAGE_SIMULATION, None) is profiling._NOT_PROFILING
+
+    @pytest.mark.parametrize(
+        "error, retries, expected_calls",
+        [(OSError("I/O error"), 2, 3), (ValueError("invalid scenario"), 2, 1)],
+    )
+    def test_simulate__persistent_failure_rejected(self, monkeypatch, error, retries, expected_calls):
+        calls = []
+
+        def execute(_options):
+            calls.append(1)
+            raise error
+
+        monkeypatch.setattr(runner, "execute_scenario", execute)
+        monkeypatch.setattr(runner, "RETRY_BACKOFF_IN_S", 0)
+        evaluation = simulate(get_options(retries))
+        assert not evaluation.passed
+        assert evaluation.failure.startswith(classify_failure(error).name.lower())
+        assert len(calls) == expected_calls
+
+    @pytest.mark.parametrize(
+        "scenario, days, expected, expected_stop",
+        [
+            (get_scenario(), 7, True, "2019-01-07_23:58:00"),
+            (get_scenario(), 365, False, "2019-12-31_23:58:00"),
+            (get_scenario(start="not a time"), 7, False, "2019-12-31_23:58:00"),
+        ],
+    )
+    def test_shorten_horizon(self, scenario, days, expected, expected_stop):
+        assert shorten_horizon(scenario, days) is expected
+        assert scenario["GeneralProperties"]["Simulation"]["StopTime"] == expected_stop
+
+    def test_shorten_horizon__missing_horizon(self):
+        assert not shorten_horizon({}, 7)
+
+    @pytest.mark.parametrize(
+        "config, skip_evaluation, expected",
+        [
+            ({}, False, None),
+            ({"short_run": None}, False, {"days": 28, "threshold_factor": 1.5}),
+            ({"short_run": {"days": 7}}, False, {"days": 7, "threshold_factor": 1.5}),
+            ({"short_run": {"days": 7}}, True, None),
+        ],
+    )
+    def test_get_short_run_settings(self, config, skip_evaluation, expected):
+        assert get_short_run_settings(config, {CreateOptions.SKIP_EVALUATION: skip_evaluation}) == expected
+
+    def test_copy_yaml_replacing_scalars__changes_only_stop_time(self, tmp_path):
+        scenario = get_scenario()
+        scenario["Agents"] = [{"Id": 1, "Attributes": {"StopTime": "2019-12-31_23:58:00", "Values": [1.5, "a"]}}]
+        scenario["Contracts"] = []
+        source, target = Path(tmp_path, "source.yaml"), Path(tmp_path, "target.yaml")
+        source.write_text(yaml.safe_dump(scenario))
+
+        times = read_yaml_scalars(source, [KEYS_START_TIME, KEYS_STOP_TIME])
+        copy_yaml_replacing_scalars(source, target, {KEYS_STOP_TIME: "2019-01-07_23:58:00"})
+
+        assert times == {KEYS_START_TIME: "2018-12-31_23:58:00", KEYS_STOP_TIME: "2019-12-31_23:58:00"}
+        shorten_horizon(scenario, 7)
+        assert yaml.safe_load(target.read_text()) == scenario
+
+    @pytest.mark.parametrize(
+        "short_run_passes, expected_runs",
+        [(False, ["Test_0_short_run"]), (True, ["Test_0_short_run", "Test_0"])],
+    )
+    def test_simulate__short_run_screens_full_run(self, monkeypatch, tmp_path, short_run_passes, expected_runs):
+        runs = []
+
+        def execute(options):
+            scenario = yaml.safe_load(Path(options["scenario_path"]).read_text())
+            runs.append((options["scenario_name"], scenario["GeneralProperties"]["Simulation"]["StopTime"]))
+
+        def evaluate(options, threshold_factor=1.0):
+            if options["scenario_name"].endswith("_short_run"):
+                assert threshold_factor == 1.5
+                return Evaluation(short_run_passes, [] if short_run_passes else ["scarcity_occurrence"], {})
+            return Evaluation(True, [], {})
+
+        monkeypatch.setattr(runner, "execute_scenario", execute)
+        monkeypatch.setattr(runner, "evaluate", evaluate)
+        options = get_short_run_options(tmp_path)
+        evaluation = simulate(options)
+        assert [name for name, _ in runs] == expected_runs
+        assert runs[0][1] == "2019-01-07_23:58:00"
+        assert evaluation.passed is short_run_passes
+        if not short_run_passes:
+            assert evaluation.failed_checks == [PREFIX_SHORT_RUN + "scarcity_occurrence"]
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["Test_0.yaml"]
+
+    def test_simulate__concurrent_runs_use_separate_working_directories(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(runner.amiris, "run_amiris", run_amiris_recording_cwd)
+        names = ["Test_0", "Test_1"]
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            evaluations = list(pool.map(simulate, [get_run_options(tmp_path, name) for name in names]))
+        assert all(evaluation.passed for evaluation in evaluations)
+        runs = [Path(tmp_path, name, "run.txt").read_text().splitlines() for name in names]
+        assert runs[0][0] != runs[1][0]
+        assert [scenario for _, scenario in runs] == [name + ".yaml" for name in names]
+        assert all(not Path(cwd).exists() and Path(cwd).parent == tmp_path for cwd, _ in runs)
@@ -0,0 +1,131 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+
+from scengen.generation.sampling import LatinHypercube, Sampler, Design, get_design, _sobol_block
+from scengen.stream import ScenarioStream
+
+FIELD = "Agents/0/Attributes/Value"
+
+
+def write_config(directory: Path, sampling: dict) -> Path:
+    agent = {"Type": "B", "Id": "//B", "Attributes": {"Value": "range_float(0; 1)"}}
+    Path(directory, "type_a.yaml").write_text(yaml.safe_dump({"Agent": {"Type": "A", "Id": "//A"}}))
+    Path(directory, "type_b.yaml").write_text(yaml.safe_dump({"Agent": agent}))
+    Path(directory, "template.yaml").write_text(yaml.safe_dump({"Agents": [], "Contracts": []}))
+    config = {
+        "defaults": {"base_name": "Test", "seed": 5},
+        "base_template": "template.yaml",
+        "sampling": sampling,
+        "create": [
+            {"type_template": "type_a.yaml", "this_agent": "A", "count": "range_int(1; 4)"},
+            {"type_template": "type_b.yaml", "this_agent": "B", "count": 1},
+        ],
+    }
+    Path(directory, "config.yaml").write_text(yaml.safe_dump(config))
+    return Path(directory, "config.yaml")
+
+
+def get_values_of_b(config_path: Path, size: int) -> list[float]:
+    scenarios = ScenarioStream(config_path, count=size, directory=config_path.parent)
+    return [
+        next(agent for agent in item.scenario["Agents"] if agent["Type"] == "B")["Attributes"]["Value"]
+        for item in scenarios
+    ]
+
+
+class Test:
+    @pytest.mark.parametrize("size, field", [(10, FIELD), (7, "create/PV/3/Attributes/Value"), (1, "x")])
+    def test_latin_hypercube__one_point_per_stratum(self, size, field):
+        design = LatinHypercube(size, seed=42)
+        strata = sorted(int(design.unit_value(index, field) * size) for index in range(size))
+        assert strata == list(range(size))
+
+    def test_latin_hypercube__reproducible(self):
+        assert LatinHypercube(5, seed=1).unit_value(3, FIELD) == LatinHypercube(5, seed=1).unit_value(3, FIELD)
+
+    def test_latin_hypercube__new_block_after_size(self):
+        design = LatinHypercube(5, seed=1)
+        assert design.unit_value(2, FIELD) != design.unit_value(7, FIELD)
+
+    def test_design__is_abstract(self):
+        with pytest.raises(TypeError):
+            Design(5, seed=1)
+
+    def test_latin_hypercube__stratified_per_field_with_varying_agent_counts(self, tmp_path):
+        size = 8
+        values = get_values_of_b(write_config(tmp_path, {"method": "lhs", "size": size}), size)
+        assert sorted(int(value * size) for value in values) == list(range(size))
+
+    def test_sobol__stratified_per_field_with_varying_agent_counts(self, tmp_path):
+        pytest.importorskip("scipy.stats")
+        size = 8
+        values = get_values_of_b(write_config(tmp_path, {"method": "sobol", "size": size}), size)
+        assert sorted(int(value * size) for value in values) == list(range(size))
+
+    def test_sobol__blocks_continue_sequence(self):
+        pytest.importorskip("scipy.stats")
+        fields = ["a", "b"]
+        design = get_design({"method": "sobol", "dimensions": 2}, seed=3, default_size=4, fields=fields)
+        points = np.array([[design.unit_value(index, field) for field in fields] for index in range(8)])
+        expected = get_design({"method": "sobol", "dimensions": 2, "size": 8}, 3, 8, fields)
+        assert np.array_equal(points, [[expected.unit_value(index, field) for field in fields] for index in range(8)])
+
+    def test_sobol_block__equals_slice_of_full_sequence(self):
+        qmc = pytest.importorskip("scipy.stats").qmc
+        full = qmc.Sobol(d=3, scramble=True, seed=11).random(16)
+        assert np.array_equal(_sobol_block(11, 3, 4, 0), full[:4])
+        assert np.array_equal(_sobol_block(11, 3, 4, 2), full[8:12])
+
+    def test_sobol__field_not_covered(self):
+        pytest.importorskip("scipy.stats")
+        design = get_design({"method": "sobol", "dimensions": 1}, seed=3, default_size=4, fields=["a", "b"])
+        assert design.unit_value(0, "a") is not None
+        assert design.unit_value(0, "b") is None
+
+    def test_sampler__stable_field_of_created_agent(self):
+        sampler = Sampler(seed=1)
+        sampler.alias("Agents/5", "create/B/0")
+        sampler.record("Agents/5/Attributes/Value", "range_float(0; 1)", 0.5)
+        assert sampler.get_field("Agents/4/Attributes/Value") == "Agents/4/Attributes/Value"
+        assert sampler.numeric_values() == {"create/B/0/Attributes/Value": 0.5}
+
+    @pytest.mark.parametrize("size", [0, -1, 2.5])
+    def test_latin_hypercube__invalid_size(self, size):
+        with pytest.raises(Exception):
+            LatinHypercube(size, seed=1)
+
+    def test_sampler__values_within_range(self):
+        design = LatinHypercube(4, seed=3)
+        for index in range(4):
+            sampler = Sampler(seed=1, index=index, design=design)
+            assert 1 <= sampler.randint(1, 3, "a") <= 3
+            assert 2.5 <= sampler.uniform(2.5, 4.0, "b") <= 4.0
+
+    def test_sampler__integer_strata(self):
+        design = LatinHypercube(4, seed=9)
+        values = sorted(Sampler(seed=1, index=index, design=design).randint(0, 3, FIELD) for index in range(4))
+        assert values == [0, 1, 2, 3]
+
+    def test_sampler__reproducible_per_index(self):
+        draws = [Sampler(seed=42, index=7).uniform(0, 1) for _ in range(2)]
+        assert draws[0] == draws[1]
+        assert Sampler(seed=42, index=8).uniform(0, 1) != draws[0]
+
+    def test_sampler__choice_keeps_type(self):
+        assert Sampler(seed=1).choice([5]) == 5
+        assert isinstance(Sampler(seed=1).choice([5]), int)
+
+    @pytest.mark.parametrize("settings", [None, {}, {"method": "random"}])
+    def test_get_design__random(self, settings):
+        assert get_design(settings, seed=1, default_size=10) is None
+
+    def test_get_design__latin_hypercube_default_size(self):
+        design = get_design({"method": "LHS"}, seed=1, default_size=10)
+        assert isinstance(design, LatinHypercube) and design.size == 10
+
+    def test_get_design__unknown_method(self):
+        with pytest.raises(Exception):
+            get_design({"method": "grid"}, seed=1, default_size=10)
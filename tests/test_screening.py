@@ -0,0 +1,70 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from scengen.cli import CreateOptions
+from scengen.generation.sampling import Sampler
+from scengen.screening import LogisticModel, Screening, MIN_EXPLORATION_RATE
+
+FIELD = "Agents/0/Attributes/InstalledPowerInMW"
+
+
+def get_candidate(index: int, capacity: float) -> SimpleNamespace:
+    sampler = Sampler(seed=1, index=index)
+    sampler.record(FIELD, "range_float(0; 100)", capacity)
+    return SimpleNamespace(sampler=sampler, options={"random_seed": 1})
+
+
+def get_screening(tmp_path: Path, settings: dict) -> Screening:
+    screening = Screening({CreateOptions.DIRECTORY: tmp_path}, {"screening": settings})
+    for index, capacity in enumerate(np.linspace(0, 100, 40)):
+        screening.record(get_candidate(index, capacity), passed=capacity > 50)
+    return screening
+
+
+class Test:
+    def test_logistic_model__separates_classes(self):
+        values = np.linspace(0, 100, 50).reshape(-1, 1)
+        model = LogisticModel(["x"])
+        model.fit(values, values[:, 0] > 50)
+        probabilities = model.predict(np.array([[5.0], [95.0], [np.nan]]))
+        assert probabilities[0] < 0.1 < 0.9 < probabilities[1]
+        assert 0.1 < probabilities[2] < 0.9
+
+    def test_screening__disabled_without_section(self, tmp_path):
+        screening = Screening({CreateOptions.DIRECTORY: tmp_path}, {})
+        candidates = [get_candidate(0, 1.0)]
+        assert screening.rank(candidates) == candidates
+
+    def test_screening__too_few_samples_keeps_order(self, tmp_path):
+        screening = get_screening(tmp_path, {"min_samples": 100, "exploration_rate": 0})
+        candidates = [get_candidate(100, 1.0), get_candidate(101, 99.0)]
+        assert screening.rank(candidates) == candidates
+
+    def test_screening__ranks_and_skips_candidates(self, tmp_path):
+        screening = get_screening(tmp_path, {"min_samples": 20, "confidence": 0.9, "exploration_rate": 0})
+        likely, unlikely, hopeless = get_candidate(100, 99.0), get_candidate(101, 52.0), get_candidate(102, 1.0)
+        assert screening.rank([hopeless, unlikely, likely]) == [likely, unlikely]
+        assert Path(tmp_path, "rejections.csv").read_text().splitlines()[1].startswith("102;screening")
+
+    @pytest.mark.parametrize("exploration_rate, expected_count", [(0.5, 5), (1, 10)])
+    def test_screening__exploration_rate(self, tmp_path, exploration_rate, expected_count):
+        screening = get_screening(tmp_path, {"min_samples": 20, "exploration_rate": exploration_rate})
+        candidates = [get_candidate(index, 0.0) for index in range(100, 110)]
+        assert len(screening.rank(candidates)) == pytest.approx(expected_count, abs=3)
+
+    def test_screening__zero_exploration_rate_keeps_some_candidates(self, tmp_path):
+        screening = get_screening(tmp_path, {"min_samples": 20, "exploration_rate": 0})
+        candidates = [get_candidate(index, 0.0) for index in range(100, 1100)]
+        assert 0 < len(screening.rank(candidates)) < 3 * MIN_EXPLORATION_RATE * len(candidates)
+
+    def test_screening__features_keyed_by_stable_field(self, tmp_path):
+        screening = Screening({CreateOptions.DIRECTORY: tmp_path}, {"screening": {"min_samples": 20}})
+        for index, capacity in enumerate(np.linspace(0, 100, 40)):
+            candidate = get_candidate(index, capacity)
+            candidate.sampler.alias("Agents/0", "create/PV/0")
+            screening.record(candidate, passed=capacity > 50)
+        screening.rank([get_candidate(100, 1.0)])
+        assert screening.model.features == ["create/PV/0/Attributes/InstalledPowerInMW"]
@@ -0,0 +1,50 @@
+from pathlib import Path
+from typing import Optional
+
+import pytest
+import yaml
+
+from scengen.stream import ScenarioStream
+
+CONFIG = {"defaults": {"base_name": "Test", "seed": 7}, "base_template": "template.yaml"}
+TEMPLATE = {
+    "Agents": [{"Type": "DemandTrader", "Id": 1, "Attributes": {"ValueOfLostLoad": "range_float(1; 2)"}}],
+    "Contracts": [],
+}
+
+
+def write_config(directory: Path, sampling: Optional[dict] = None) -> Path:
+    Path(directory, "template.yaml").write_text(yaml.safe_dump(TEMPLATE))
+    config_path = Path(directory, "config.yaml")
+    config_path.write_text(yaml.safe_dump({**CONFIG, "sampling": sampling} if sampling else CONFIG))
+    return config_path
+
+
+class Test:
+    def test_scenario_stream__yields_count_scenarios(self, tmp_path):
+        scenarios = list(ScenarioStream(write_config(tmp_path), start=3, count=2, directory=tmp_path))
+        assert [scenario.index for scenario in scenarios] == [3, 4]
+        value = scenarios[0].scenario["Agents"][0]["Attributes"]["ValueOfLostLoad"]
+        assert scenarios[0].parameters == {"Agents/0/Attributes/ValueOfLostLoad": value}
+        assert 1 <= value <= 2
+
+    def test_scenario_stream__reproducible_by_index(self, tmp_path):
+        config_path = write_config(tmp_path)
+        first = list(ScenarioStream(config_path, count=3, directory=tmp_path))
+        second = list(ScenarioStream(config_path, start=2, count=1, directory=tmp_path))
+        assert first[2] == second[0]
+
+    def test_scenario_stream__writes_nothing(self, tmp_path):
+        config_path = write_config(tmp_path)
+        list(ScenarioStream(config_path, count=2, directory=tmp_path))
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["config.yaml", "template.yaml"]
+
+    def test_scenario_stream__design_covers_design_size(self, tmp_path):
+        config_path = write_config(tmp_path, {"method": "lhs"})
+        scenarios = list(ScenarioStream(config_path, count=4, directory=tmp_path, design_size=4))
+        values = [scenario.parameters["Agents/0/Attributes/ValueOfLostLoad"] for scenario in scenarios]
+        assert sorted(int((value - 1) * 4) for value in values) == [0, 1, 2, 3]
+
+    def test_scenario_stream__design_without_size_raises(self, tmp_path):
+        with pytest.raises(Exception):
+            ScenarioStream(write_config(tmp_path, {"method": "lhs"}), count=4, directory=tmp_path)
@@ -0,0 +1,95 @@
+import math
+import os
+from pathlib import Path
+
+import pytest
+
+from scengen.timeseries import (
+    get_series_info,
+    validate_series,
+    get_transformed_series,
+    release_series,
+    pin_series,
+    clear_cache,
+)
+
+
+def write_series(path: Path, values: list) -> None:
+    lines = [f"2019-01-01_{i:02d}:00:00;{value}" for i, value in enumerate(values)]
+    path.write_text("\n".join(lines))
+
+
+class Test:
+    def test_get_series_info__existing(self, tmp_path):
+        write_series(Path(tmp_path, "series.csv"), [3, 1.5, 7])
+        info = get_series_info(Path(tmp_path, "series.csv"))
+        assert info.exists
+        assert (info.rows, info.minimum, info.maximum) == (3, 1.5, 7)
+
+    def test_get_series_info__missing(self, tmp_path):
+        info = get_series_info(Path(tmp_path, "missing.csv"))
+        assert not info.exists
+        assert math.isnan(info.maximum)
+
+    def test_get_series_info__cached_until_modified(self, tmp_path):
+        path = Path(tmp_path, "series.csv")
+        write_series(path, [1, 2])
+        assert get_series_info(path) is get_series_info(path)
+
+    def test_validate_series__valid(self, tmp_path):
+        write_series(Path(tmp_path, "series.csv"), [1, 2])
+        validate_series(["series.csv", "series.csv"], tmp_path, expected_rows=2)
+
+    def test_get_series_info__empty_file_raises(self, tmp_path):
+        Path(tmp_path, "series.csv").write_text("")
+        with pytest.raises(Exception, match="no valid numeric values"):
+            get_series_info(Path(tmp_path, "series.csv"))
+
+    @pytest.mark.parametrize("content", [None, "a;b\nc;d", ""])
+    def test_validate_series__invalid(self, tmp_path, content):
+        if content:
+            Path(tmp_path, "series.csv").write_text(content)
+        with pytest.raises(Exception):
+            validate_series(["series.csv"], tmp_path)
+
+    def test_get_transformed_series__values(self, tmp_path):
+        write_series(Path(tmp_path, "series.csv"), [1, 2])
+        target = get_transformed_series(Path(tmp_path, "series.csv"), 2, 0.5, Path(tmp_path, "cache"))
+        assert target.read_text().splitlines() == ["2019-01-01_00:00:00;2.5", "2019-01-01_01:00:00;4.5"]
+
+    def test_get_transformed_series__cached_by_content(self, tmp_path):
+        write_series(Path(tmp_path, "a.csv"), [1, 2])
+        write_series(Path(tmp_path, "b.csv"), [1, 2])
+        first = get_transformed_series(Path(tmp_path, "a.csv"), 2, 0, Path(tmp_path, "cache"))
+        second = get_transformed_series(Path(tmp_path, "b.csv"), 2, 0, Path(tmp_path, "cache"))
+        other = get_transformed_series(Path(tmp_path, "b.csv"), 3, 0, Path(tmp_path, "cache"))
+        assert first == second != other
+
+    def test_get_transformed_series__evicts_least_recently_used(self, tmp_path):
+        write_series(Path(tmp_path, "series.csv"), [1, 2])
+        cache_dir = Path(tmp_path, "cache")
+        old = get_transformed_series(Path(tmp_path, "series.csv"), 2, 0, cache_dir)
+        os.utime(old, ns=(0, 0))
+        new = get_transformed_series(Path(tmp_path, "series.csv"), 3, 0, cache_dir, limit_in_mb=1e-6)
+        assert new.exists() and not old.exists()
+
+    def test_get_transformed_series__keeps_series_referenced_by_other_scenario(self, tmp_path):
+        write_series(Path(tmp_path, "series.csv"), [1, 2])
+        cache_dir = Path(tmp_path, "cache")
+        scenario_a = get_transformed_series(Path(tmp_path, "series.csv"), 2, 0, cache_dir, owner=0)
+        os.utime(scenario_a, ns=(0, 0))
+        scenario_b = get_transformed_series(Path(tmp_path, "series.csv"), 3, 0, cache_dir, 1e-6, owner=1)
+        assert scenario_a.exists() and scenario_b.exists()
+        release_series(cache_dir, 0)
+        get_transformed_series(Path(tmp_path, "series.csv"), 4, 0, cache_dir, 1e-6, owner=2)
+        assert not scenario_a.exists() and scenario_b.exists()
+
+    def test_get_transformed_series__keeps_pinned_series(self, tmp_path):
+        write_series(Path(tmp_path, "series.csv"), [1, 2])
+        cache_dir = Path(tmp_path, "cache")
+        accepted = get_transformed_series(Path(tmp_path, "series.csv"), 2, 0, cache_dir, owner=0)
+        pin_series(cache_dir, 0)
+        clear_cache()
+        os.utime(accepted, ns=(0, 0))
+        get_transformed_series(Path(tmp_path, "series.csv"), 3, 0, cache_dir, 1e-6, owner=1)
+        assert accepted.exists()